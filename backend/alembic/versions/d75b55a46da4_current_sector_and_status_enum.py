@@ -0,0 +1,115 @@
+"""current sector and status enum
+
+Revision ID: d75b55a46da4
+Revises: 94be84b6f815
+Create Date: 2026-10-17 15:34:47.609884
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd75b55a46da4'
+down_revision: Union[str, None] = '94be84b6f815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+STATUSES = (
+    "PENDING",
+    "PENDING_DOCS",
+    "CHECKLIST_OK",
+    "PENDING_SECTOR",
+    "APPROVED",
+    "REJECTED",
+    "REJECTED_TIMEOUT",
+    "REJECTED_NO_SECTOR",
+    "FINALIZED",
+)
+request_status = sa.Enum(*STATUSES, native_enum=False, length=32, create_constraint=True, name="request_status")
+
+processes = sa.table("processes", sa.column("id", sa.Integer), sa.column("name", sa.String))
+sectors = sa.table("sectors", sa.column("id", sa.Integer), sa.column("name", sa.String))
+sector_approval = sa.table("sector_approval", sa.column("sector_id", sa.Integer), sa.column("process_id", sa.Integer))
+credit_requests = sa.table(
+    "credit_requests",
+    sa.column("id", sa.Integer),
+    sa.column("status", sa.String),
+    sa.column("current_process_id", sa.Integer),
+    sa.column("current_sector_id", sa.Integer),
+)
+sla_deadlines = sa.table("sla_deadlines", sa.column("status", sa.String))
+
+
+def _legacy_statuses(bind):
+    """
+    Status antigos "PENDING_<PROCESSO>_<SETOR>" gerados pelo roteamento -> (processo, setor).
+    """
+    rows = bind.execute(
+        sa.select(processes.c.id, processes.c.name, sectors.c.id, sectors.c.name)
+        .select_from(processes)
+        .join(sector_approval, sector_approval.c.process_id == processes.c.id)
+        .join(sectors, sectors.c.id == sector_approval.c.sector_id)
+    )
+    return {
+        f"PENDING_{process_name.upper()}_{sector_name.upper()}": (process_id, sector_id)
+        for process_id, process_name, sector_id, sector_name in rows
+    }
+
+
+def _is_legacy_pending(column):
+    return sa.and_(column.like("PENDING\\_%", escape="\\"), column.notin_(["PENDING_DOCS", "PENDING_SECTOR"]))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('credit_requests', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('current_sector_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_credit_requests_current_sector_id_sectors', 'sectors', ['current_sector_id'], ['id'])
+
+    # Backfill: o setor sai do status e o status passa a ser PENDING_SECTOR
+    bind = op.get_bind()
+    for legacy, (process_id, sector_id) in _legacy_statuses(bind).items():
+        bind.execute(
+            credit_requests.update()
+            .where(credit_requests.c.status == legacy, credit_requests.c.current_process_id == process_id)
+            .values(status="PENDING_SECTOR", current_sector_id=sector_id)
+        )
+    # Status de setores que não existem mais: continuam pendentes, sem setor conhecido
+    bind.execute(credit_requests.update().where(_is_legacy_pending(credit_requests.c.status)).values(status="PENDING_SECTOR"))
+    bind.execute(sla_deadlines.update().where(_is_legacy_pending(sla_deadlines.c.status)).values(status="PENDING_SECTOR"))
+    unknown = bind.execute(
+        sa.select(credit_requests.c.status).where(credit_requests.c.status.notin_(STATUSES)).distinct()
+    ).scalars().all()
+    if unknown:
+        raise RuntimeError(f"Status fora do enum request_status em credit_requests: {unknown}")
+
+    with op.batch_alter_table('credit_requests', schema=None) as batch_op:
+        batch_op.alter_column('status', existing_type=sa.String(), type_=request_status, existing_nullable=True)
+        batch_op.create_index('ix_credit_requests_status_sector_updated', ['status', 'current_sector_id', 'updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    with op.batch_alter_table('credit_requests', schema=None) as batch_op:
+        batch_op.drop_index('ix_credit_requests_status_sector_updated')
+        batch_op.alter_column('status', existing_type=request_status, type_=sa.String(), existing_nullable=True)
+
+    for legacy, (process_id, sector_id) in _legacy_statuses(bind).items():
+        bind.execute(
+            credit_requests.update()
+            .where(
+                credit_requests.c.status == "PENDING_SECTOR",
+                credit_requests.c.current_process_id == process_id,
+                credit_requests.c.current_sector_id == sector_id,
+            )
+            .values(status=legacy)
+        )
+
+    with op.batch_alter_table('credit_requests', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_credit_requests_current_sector_id_sectors', type_='foreignkey')
+        batch_op.drop_column('current_sector_id')
@@ -0,0 +1,57 @@
+"""credit_requests updated_at not null
+
+Revision ID: f15e427c67cc
+Revises: 80eb937e493e
+Create Date: 2026-10-17 18:02:44.518207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f15e427c67cc'
+down_revision: Union[str, None] = '80eb937e493e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+STATUSES = (
+    "PENDING",
+    "PENDING_DOCS",
+    "CHECKLIST_OK",
+    "PENDING_SECTOR",
+    "APPROVED",
+    "REJECTED",
+    "REJECTED_TIMEOUT",
+    "REJECTED_NO_SECTOR",
+    "FINALIZED",
+)
+# O SQLite não reflete CHECK constraints: o batch recria a tabela com a do enum
+request_status = sa.Enum(*STATUSES, native_enum=False, length=32, create_constraint=True, name="request_status")
+
+credit_requests = sa.table(
+    "credit_requests",
+    sa.column("created_at", sa.DateTime),
+    sa.column("updated_at", sa.DateTime),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Pedidos nunca alterados: a última alteração é a criação
+    op.execute(
+        credit_requests.update()
+        .where(credit_requests.c.updated_at.is_(None))
+        .values(updated_at=sa.func.coalesce(credit_requests.c.created_at, sa.func.current_timestamp()))
+    )
+    with op.batch_alter_table('credit_requests', schema=None, reflect_args=[sa.Column('status', request_status)]) as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('credit_requests', schema=None, reflect_args=[sa.Column('status', request_status)]) as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,148 @@
+"""
+Benchmark de carga dos endpoints de leitura: caminho síncrono (Session no threadpool)
+versus caminho assíncrono (AsyncSession no event loop).
+
+Uso:
+    python benchmarks/bench_async_reads.py --requests 2000 --concurrency 30
+
+Com concorrência acima do threadpool (40) somado ao pool de conexões, o caminho síncrono
+passa a esperar o timeout do pool e as falhas aparecem na coluna de erros.
+"""
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+os.environ.setdefault("TESTING", "true")
+os.environ.setdefault("ENV", "bench")
+os.environ["DATABASE_AUTO_MIGRATE"] = "false"
+_tmpdir = tempfile.mkdtemp(prefix="bank_credit_bench_")
+os.environ["DATABASE_CONNECTION_URI"] = f"sqlite:///{Path(_tmpdir) / 'bench.db'}"
+
+import httpx  # noqa: E402
+from fastapi import APIRouter, Depends, FastAPI  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from bank_credit.app import models, schemas  # noqa: E402
+from bank_credit.app.database import SessionLocal, dispose_async_engine, get_db, init_db  # noqa: E402
+from bank_credit.app.main import app  # noqa: E402
+from bank_credit.app.routers.auth import create_access_token, get_current_active_user  # noqa: E402
+from bank_credit.app.views import auth as auth_view  # noqa: E402
+from bank_credit.app.views import credit_request as credit_view  # noqa: E402
+
+logging.disable(logging.WARNING)
+
+# Versão síncrona do endpoint, como era antes do caminho assíncrono
+legacy_router = APIRouter()
+
+
+@legacy_router.get("/requests/", response_model=List[schemas.CreditRequest])
+def list_my_requests_sync(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+    client = auth_view.get_client_by_user_id(db, current_user.id)
+    return credit_view.list_client_requests(db, client.id)
+
+
+legacy_app = FastAPI()
+legacy_app.include_router(legacy_router)
+
+
+def seed(n_requests: int) -> str:
+    init_db()
+    db = SessionLocal()
+    user = models.User(full_name="Bench", phone="11999999999", email="bench@cliente.com", hashed_password="x", created_at=datetime.now())
+    client = models.Client(
+        user=user,
+        cnpj="00000000000100",
+        nome_fantasia="Bench",
+        razao_social="Bench LTDA",
+        cnae_principal="6201-5/01",
+        cnae_principal_desc="Desenvolvimento de programas de computador sob encomenda",
+        natureza_juridica="2062",
+        natureza_juridica_desc="Sociedade Empresária Limitada",
+        logradouro="Rua A",
+        numero="1",
+        cep="01001000",
+        bairro="Centro",
+        municipio="São Paulo",
+        uf="SP",
+    )
+    db.add(client)
+    db.add_all(
+        models.CreditRequest(
+            client=client,
+            amount=1000.0 + i,
+            purpose="Capital de giro",
+            term=30,
+            deliver_date=datetime.now() + timedelta(days=7),
+        )
+        for i in range(n_requests)
+    )
+    db.commit()
+    db.close()
+    return create_access_token(data={"sub": "bench@cliente.com"})
+
+
+async def run_load(target_app, path: str, token: str, total: int, concurrency: int):
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+    # Erros viram 500 em vez de exceções: o caminho síncrono esgota o pool sob alta concorrência
+    transport = httpx.ASGITransport(app=target_app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                latencies.append(time.perf_counter() - started)
+                errors += response.status_code != 200
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "rps": total / elapsed,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark sync x async dos endpoints de leitura")
+    parser.add_argument("--requests", type=int, default=2000, help="Total de requisições por cenário")
+    parser.add_argument("--concurrency", type=int, default=30, help="Requisições simultâneas")
+    parser.add_argument("--rows", type=int, default=20, help="Pedidos de crédito do cliente")
+    args = parser.parse_args()
+
+    token = seed(args.rows)
+    asyncio.run(run_scenarios(token, args.requests, args.concurrency))
+
+
+async def run_scenarios(token: str, total: int, concurrency: int):
+    scenarios = (
+        ("sync  GET /requests/", legacy_app, "/requests/"),
+        ("async GET /requests/", app, "/requests/"),
+        ("async GET /notifications/unread-count", app, "/notifications/unread-count"),
+    )
+    # Todos os cenários no mesmo event loop: o pool assíncrono fica preso ao loop em que foi criado
+    for name, target_app, path in scenarios:
+        result = await run_load(target_app, path, token, total, concurrency)
+        print(
+            f"{name:<40} p50 {result['p50_ms']:8.1f} ms  p99 {result['p99_ms']:8.1f} ms  "
+            f"{result['rps']:8.1f} req/s  {result['errors']} erros"
+        )
+    await dispose_async_engine()
+
+
+if __name__ == "__main__":
+    main()
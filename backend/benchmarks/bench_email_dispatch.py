@@ -0,0 +1,92 @@
+"""
+Benchmark de envio de uma rajada de emails contra o servidor SMTP falso.
+
+Compara o envio antigo (`fastmail.send_message`, uma conexão + login por mensagem)
+com o `MailDispatcher` (pool de conexões, agrupamento de emails idênticos).
+
+Uso:
+    python benchmarks/bench_email_dispatch.py --emails 300 --latency-ms 10 --pool 4
+"""
+import asyncio
+import os
+import time
+from argparse import ArgumentParser
+
+# A configuração de produção exige MAIL_*; o benchmark usa a sua própria, apontada para o servidor falso
+os.environ.setdefault("TESTING", "true")
+
+from fastapi_mail import ConnectionConfig, FastMail, MessageSchema  # noqa: E402
+
+from bank_credit.app.email import MailDispatcher  # noqa: E402
+from bank_credit.scripts.fake_smtp import FakeSmtpServer  # noqa: E402
+
+
+def settings_for(server):
+    return ConnectionConfig(
+        MAIL_USERNAME="bench",
+        MAIL_PASSWORD="bench",
+        MAIL_FROM="noreply@example.com",
+        MAIL_FROM_NAME="Benchmark",
+        MAIL_PORT=server.port,
+        MAIL_SERVER=server.host,
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=True,
+    )
+
+
+def build_emails(n, identical_ratio):
+    """
+    `identical_ratio` dos emails compartilham assunto e corpo (ex.: alertas de SLA em massa).
+    """
+    identical = int(n * identical_ratio)
+    emails = [(f"client{i}@example.com", "Alerta de SLA próximo do vencimento", "<p>Seu pedido vencerá o SLA em breve.</p>") for i in range(identical)]
+    emails += [(f"client{i}@example.com", f"Pedido #{i} atualizado", f"<p>Status do pedido #{i}: APPROVED</p>") for i in range(identical, n)]
+    return emails
+
+
+async def send_legacy(settings, emails):
+    fastmail = FastMail(settings)
+    for to, subject, body in emails:
+        await fastmail.send_message(MessageSchema(subject=subject, recipients=[to], body=body, subtype="html"))
+
+
+async def send_dispatcher(settings, emails, pool, rate):
+    dispatcher = MailDispatcher(settings, pool_size=pool, rate_limit=rate)
+    errors = await dispatcher.send(emails)
+    await dispatcher.close()
+    assert not any(errors), errors
+    return dispatcher
+
+
+def measure(label, latency, coroutine_factory, emails):
+    with FakeSmtpServer(connect_latency=latency, data_latency=latency) as server:
+        started = time.perf_counter()
+        asyncio.run(coroutine_factory(settings_for(server)))
+        elapsed = time.perf_counter() - started
+        delivered = len(server.recipients)
+        print(
+            f"{label:<36} {elapsed * 1000:9.1f} ms  {len(emails) / elapsed:8.1f} emails/s  "
+            f"{server.connections:5d} conexões  {len(server.messages):5d} mensagens  {delivered:5d} entregues"
+        )
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark de envio de emails em rajada")
+    parser.add_argument("--emails", type=int, default=300, help="Quantidade de emails da rajada")
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="Latência simulada do servidor (handshake e DATA)")
+    parser.add_argument("--identical", type=float, default=0.5, help="Fração de emails com mesmo assunto e corpo")
+    parser.add_argument("--pool", type=int, default=4, help="Conexões do pool do dispatcher")
+    parser.add_argument("--rate", type=float, default=0, help="Limite de mensagens/s do dispatcher (0 = sem limite)")
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    emails = build_emails(args.emails, args.identical)
+    unique = build_emails(args.emails, 0)
+    measure("fastmail.send_message", latency, lambda s: send_legacy(s, emails), emails)
+    measure(f"MailDispatcher (pool={args.pool}, sem grupos)", latency, lambda s: send_dispatcher(s, unique, args.pool, args.rate), unique)
+    measure(f"MailDispatcher (pool={args.pool})", latency, lambda s: send_dispatcher(s, emails, args.pool, args.rate), emails)
+
+
+if __name__ == "__main__":
+    main()
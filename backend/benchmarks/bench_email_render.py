@@ -0,0 +1,66 @@
+"""
+Benchmark de renderização dos emails.
+
+Compara o HTML montado com f-string a cada chamada (comportamento antigo), o template
+Jinja2 pré-compilado sem cache de renderização e o template com cache, em uma rajada
+de alertas idênticos (mesmo contexto) e de emails distintos (um contexto por pedido).
+
+Uso:
+    python benchmarks/bench_email_render.py --emails 20000
+"""
+import time
+from argparse import ArgumentParser
+from html import escape
+
+from bank_credit.app.email_templates import EmailTemplates
+
+
+def legacy_status_email(request_id, status):
+    subject = f"Atualização da Solicitação de Crédito #{request_id}"
+    body = f"""
+    <html>
+        <body>
+            <h2>Atualização de Status</h2>
+            <p>Sua solicitação de crédito #{request_id} foi atualizada.</p>
+            <p>Novo status: <strong>{escape(status)}</strong></p>
+            <p>Para mais detalhes, acesse sua área do cliente.</p>
+        </body>
+    </html>
+    """
+    return subject, body
+
+
+def measure(label, render, contexts):
+    started = time.perf_counter()
+    for context in contexts:
+        render(**context)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40} {elapsed / len(contexts) * 1e6:8.2f} µs/email")
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark de renderização de emails")
+    parser.add_argument("--emails", type=int, default=20000, help="Emails renderizados por cenário")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    cached = EmailTemplates()
+    compiled = cached.precompile()
+    print(f"precompile: {compiled} templates em {(time.perf_counter() - started) * 1000:.1f} ms")
+    uncached = EmailTemplates(cache_size=0)
+    uncached.precompile()
+
+    scenarios = {
+        "idênticos": [{"request_id": 1, "status": "PENDING_SECTOR"}] * args.emails,
+        "distintos": [{"request_id": i, "status": "APPROVED"} for i in range(args.emails)],
+    }
+    for scenario, contexts in scenarios.items():
+        print(f"--- {scenario}")
+        measure("f-string por chamada", legacy_status_email, contexts)
+        measure("Jinja2 pré-compilado", lambda **c: uncached.render("credit_request_status", reason=None, **c), contexts)
+        cached.clear_cache()
+        measure("Jinja2 pré-compilado + cache", lambda **c: cached.render("credit_request_status", reason=None, **c), contexts)
+
+
+if __name__ == "__main__":
+    main()
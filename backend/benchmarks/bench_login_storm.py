@@ -0,0 +1,157 @@
+"""
+Teste de carga: latência de outros endpoints durante um pico de logins.
+
+Enquanto `--logins` logins rodam com `--concurrency` simultâneos, uma sonda chama em
+sequência um endpoint assíncrono (GET /notifications/unread-count) e um síncrono
+(GET /auth/me) e mede a latência. Cenários de login:
+
+- bcrypt no event loop: handler async chamando o bcrypt direto (trava o loop inteiro);
+- síncrono: handler `def` como antes (bcrypt ocupa o threadpool compartilhado das rotas);
+- password_pool: handler atual (bcrypt no pool dedicado e limitado).
+
+Uso:
+    python benchmarks/bench_login_storm.py --logins 40 --concurrency 20
+"""
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from argparse import ArgumentParser
+from datetime import datetime
+from pathlib import Path
+
+os.environ.setdefault("TESTING", "true")
+os.environ.setdefault("ENV", "bench")
+os.environ["DATABASE_AUTO_MIGRATE"] = "false"
+_tmpdir = tempfile.mkdtemp(prefix="bank_credit_bench_")
+os.environ["DATABASE_CONNECTION_URI"] = f"sqlite:///{Path(_tmpdir) / 'bench.db'}"
+
+import httpx  # noqa: E402
+from fastapi import APIRouter, Depends, FastAPI, HTTPException  # noqa: E402
+from fastapi.security import OAuth2PasswordRequestForm  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from bank_credit.app import models  # noqa: E402
+from bank_credit.app.database import SessionLocal, dispose_async_engine, get_db, init_db  # noqa: E402
+from bank_credit.app.main import app  # noqa: E402
+from bank_credit.app.password_pool import password_pool  # noqa: E402
+from bank_credit.app.routers.auth import create_access_token  # noqa: E402
+from bank_credit.app.views import auth as auth_view  # noqa: E402
+
+logging.disable(logging.WARNING)
+
+EMAIL, PASSWORD = "bench@cliente.com", "bench-password"
+
+# Versões antigas do login, montadas à frente das rotas da aplicação
+legacy_router = APIRouter()
+
+
+@legacy_router.post("/legacy/token-sync")
+def login_sync(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = auth_view.get_user_by_email(db, form_data.username)
+    if not user or not auth_view.verify_password(form_data.password, user.hashed_password):
+        raise HTTPException(status_code=401)
+    return {"access_token": create_access_token(data={"sub": user.email}), "token_type": "bearer"}
+
+
+@legacy_router.post("/legacy/token-blocking")
+async def login_blocking(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = auth_view.get_user_by_email(db, form_data.username)
+    if not user or not auth_view.verify_password(form_data.password, user.hashed_password):
+        raise HTTPException(status_code=401)
+    return {"access_token": create_access_token(data={"sub": user.email}), "token_type": "bearer"}
+
+
+bench_app = FastAPI()
+bench_app.include_router(legacy_router)
+bench_app.mount("/", app)
+
+
+def seed() -> str:
+    init_db()
+    db = SessionLocal()
+    user = models.User(
+        full_name="Bench", phone="11999999999", email=EMAIL, hashed_password=auth_view.get_password_hash(PASSWORD), created_at=datetime.now()
+    )
+    db.add(user)
+    db.commit()
+    db.close()
+    return create_access_token(data={"sub": EMAIL})
+
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    if not latencies:
+        return "sem amostras"
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+    return f"p50 {statistics.median(latencies) * 1000:7.1f} ms  p99 {p99 * 1000:7.1f} ms  max {latencies[-1] * 1000:7.1f} ms"
+
+
+async def run_storm(client: httpx.AsyncClient, login_path, token: str, logins: int, concurrency: int):
+    headers = {"Authorization": f"Bearer {token}"}
+    probes = {"/notifications/unread-count": [], "/auth/me": []}
+    done = asyncio.Event()
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = []
+
+    async def login():
+        async with semaphore:
+            response = await client.post(login_path, data={"username": EMAIL, "password": PASSWORD})
+            statuses.append(response.status_code)
+
+    async def probe():
+        while not done.is_set():
+            for path, latencies in probes.items():
+                started = time.perf_counter()
+                await client.get(path, headers=headers)
+                latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.01)
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    if login_path:
+        await asyncio.gather(*(login() for _ in range(logins)))
+    else:
+        await asyncio.sleep(2)
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+    return probes, elapsed, statuses
+
+
+async def run_scenarios(token: str, logins: int, concurrency: int):
+    scenarios = (
+        ("sem logins", None),
+        ("bcrypt no event loop", "/legacy/token-blocking"),
+        ("login síncrono (threadpool)", "/legacy/token-sync"),
+        ("login com password_pool", "/auth/token"),
+    )
+    transport = httpx.ASGITransport(app=bench_app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name, login_path in scenarios:
+            password_pool.reset_metrics()
+            probes, elapsed, statuses = await run_storm(client, login_path, token, logins, concurrency)
+            ok = sum(code == 200 for code in statuses)
+            print(f"--- {name}: {ok}/{len(statuses)} logins em {elapsed:.1f}s")
+            for path, latencies in probes.items():
+                print(f"    {path:<30} {summarize(latencies)}")
+            if login_path == "/auth/token":
+                print(f"    password_pool: {password_pool.metrics()}")
+    password_pool.shutdown()
+    await dispose_async_engine()
+
+
+def main():
+    parser = ArgumentParser(description="Latência de outros endpoints durante um pico de logins")
+    parser.add_argument("--logins", type=int, default=40, help="Total de logins do pico")
+    parser.add_argument("--concurrency", type=int, default=20, help="Logins simultâneos")
+    args = parser.parse_args()
+
+    token = seed()
+    asyncio.run(run_scenarios(token, args.logins, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Vazão do cadastro de clientes (POST /auth/register/client).
+
+Compara o cadastro antigo (a rota hasheava a senha e `create_user` hasheava o hash de
+novo: dois bcrypt por cadastro e um hash que não confere com a senha original) com o
+atual (um único bcrypt, no `password_pool`). Para cada cenário mostra cadastros por
+segundo, latência e se o login com a senha original funciona.
+
+Uso:
+    python benchmarks/bench_registration.py --registrations 40 --concurrency 8
+"""
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+os.environ.setdefault("TESTING", "true")
+os.environ.setdefault("ENV", "bench")
+os.environ["DATABASE_AUTO_MIGRATE"] = "false"
+_tmpdir = tempfile.mkdtemp(prefix="bank_credit_bench_")
+os.environ["DATABASE_CONNECTION_URI"] = f"sqlite:///{Path(_tmpdir) / 'bench.db'}"
+
+import httpx  # noqa: E402
+from faker import Faker  # noqa: E402
+from fastapi import APIRouter, Depends, FastAPI  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from bank_credit.app import schemas  # noqa: E402
+from bank_credit.app.database import dispose_async_engine, get_db, init_db  # noqa: E402
+from bank_credit.app.main import app  # noqa: E402
+from bank_credit.app.password_pool import password_pool  # noqa: E402
+from bank_credit.app.views import auth as auth_view  # noqa: E402
+
+# O login recusado do cenário antigo loga um erro esperado
+logging.disable(logging.ERROR)
+
+PASSWORD = "bench-password"
+faker = Faker("pt_BR")
+
+# Versão antiga do cadastro, montada à frente das rotas da aplicação
+legacy_router = APIRouter()
+
+
+@legacy_router.post("/legacy/register/client")
+def register_client_double_hash(client: schemas.ClientCreate, db: Session = Depends(get_db)):
+    client.user.password = auth_view.get_password_hash(client.user.password)
+    db_client = auth_view.create_client(db, client)
+    return {"id": db_client.id}
+
+
+bench_app = FastAPI()
+bench_app.include_router(legacy_router)
+bench_app.mount("/", app)
+
+
+def client_payload() -> dict:
+    return {
+        "cnpj": faker.unique.cnpj(),
+        "nome_fantasia": faker.company(),
+        "razao_social": faker.company_suffix(),
+        "cnae_principal": "6201-5/01",
+        "cnae_principal_desc": "Desenvolvimento de programas de computador sob encomenda",
+        "natureza_juridica": "2062",
+        "natureza_juridica_desc": "Sociedade Empresária Limitada",
+        "logradouro": faker.street_name(),
+        "numero": faker.building_number(),
+        "cep": faker.postcode().replace("-", ""),
+        "bairro": faker.bairro(),
+        "municipio": faker.city(),
+        "uf": faker.estado_sigla(),
+        "user": {
+            "full_name": faker.name(),
+            "phone": faker.msisdn()[0:11],
+            "email": faker.unique.email(),
+            "password": PASSWORD,
+            "groups": [],
+        },
+    }
+
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+    return f"p50 {statistics.median(latencies) * 1000:7.1f} ms  p99 {p99 * 1000:7.1f} ms"
+
+
+async def run_registrations(client: httpx.AsyncClient, path: str, registrations: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses, emails = [], [], []
+
+    async def register():
+        payload = client_payload()
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post(path, json=payload)
+            latencies.append(time.perf_counter() - started)
+        statuses.append(response.status_code)
+        emails.append(payload["user"]["email"])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(register() for _ in range(registrations)))
+    elapsed = time.perf_counter() - started
+    login = await client.post("/auth/token", data={"username": emails[0], "password": PASSWORD})
+    return latencies, statuses, elapsed, login.status_code
+
+
+async def run_scenarios(registrations: int, concurrency: int):
+    scenarios = (
+        ("hash duplo (antigo)", "/legacy/register/client"),
+        ("hash único (password_pool)", "/auth/register/client"),
+    )
+    print(f"bcrypt com custo {auth_view.PASSWORD_BCRYPT_ROUNDS}")
+    transport = httpx.ASGITransport(app=bench_app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name, path in scenarios:
+            latencies, statuses, elapsed, login_status = await run_registrations(client, path, registrations, concurrency)
+            ok = sum(code == 200 for code in statuses)
+            print(f"--- {name}: {ok}/{len(statuses)} cadastros em {elapsed:.2f}s ({ok / elapsed:.1f}/s)")
+            print(f"    latência {summarize(latencies)}")
+            print(f"    login com a senha original: {'ok' if login_status == 200 else f'falhou ({login_status})'}")
+    password_pool.shutdown()
+    await dispose_async_engine()
+
+
+def main():
+    parser = ArgumentParser(description="Vazão do cadastro de clientes com hash duplo e único")
+    parser.add_argument("--registrations", type=int, default=40, help="Cadastros por cenário")
+    parser.add_argument("--concurrency", type=int, default=8, help="Cadastros simultâneos")
+    args = parser.parse_args()
+
+    init_db()
+    asyncio.run(run_scenarios(args.registrations, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark de inicialização e de overhead por requisição da sessão do banco.
+
+Compara o comportamento antigo (create_all a cada get_db) com o atual
+(migrações no lifespan e get_db apenas abrindo a sessão).
+
+Uso:
+    python benchmarks/bench_startup.py --requests 2000
+"""
+import os
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+os.environ.setdefault("TESTING", "true")
+_tmpdir = tempfile.mkdtemp(prefix="bank_credit_bench_")
+os.environ["DATABASE_CONNECTION_URI"] = f"sqlite:///{Path(_tmpdir) / 'bench.db'}"
+
+from sqlalchemy import event, text  # noqa: E402
+
+from bank_credit.app import models  # noqa: E402,F401
+from bank_credit.app.database import Base, SessionLocal, engine, get_db, init_db  # noqa: E402
+
+
+def legacy_get_db():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def measure_requests(dependency, n):
+    statements = []
+
+    def _count(*args):
+        statements.append(1)
+
+    event.listen(engine, "before_cursor_execute", _count)
+    started = time.perf_counter()
+    for _ in range(n):
+        gen = dependency()
+        db = next(gen)
+        db.execute(text("SELECT 1"))
+        gen.close()
+    elapsed = time.perf_counter() - started
+    event.remove(engine, "before_cursor_execute", _count)
+    return elapsed / n * 1e6, len(statements) / n
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark de startup e overhead por requisição")
+    parser.add_argument("--requests", type=int, default=2000, help="Quantidade de checkouts de sessão")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    init_db()
+    cold = time.perf_counter() - started
+    started = time.perf_counter()
+    init_db()
+    warm = time.perf_counter() - started
+    print(f"startup: migrações (banco vazio)      {cold * 1000:8.1f} ms")
+    print(f"startup: migrações (banco atualizado) {warm * 1000:8.1f} ms")
+
+    for name, dependency in (("create_all por requisição", legacy_get_db), ("get_db (só sessão)", get_db)):
+        per_request_us, statements = measure_requests(dependency, args.requests)
+        print(f"request: {name:<28} {per_request_us:8.1f} µs/req  {statements:5.1f} SQL/req")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,173 @@
 # app/database.py
 
+import importlib.util
+import logging
 import os
+import threading
+import time
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, func, inspect, select
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 # Carrega as variáveis de ambiente
 load_dotenv()
 
+logger = logging.getLogger("bank_credit.database")
+
 # URL de conexão do banco de dados
 DATABASE_CONNECTION_URI = os.getenv("DATABASE_CONNECTION_URI")
 
+# Configuração do pool de conexões
+POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DATABASE_POOL_RECYCLE", "1800"))
+POOL_PRE_PING = os.getenv("DATABASE_POOL_PRE_PING", "true").lower() == "true"
+# Tempo máximo por statement no Postgres, em ms (0 desativa)
+STATEMENT_TIMEOUT_MS = int(os.getenv("DATABASE_STATEMENT_TIMEOUT_MS", "0"))
+APPLICATION_NAME = os.getenv("DATABASE_APPLICATION_NAME", "bank-credit")
+# Esperas por conexão acima deste valor (s) são registradas no log
+SLOW_CHECKOUT_SECONDS = float(os.getenv("DATABASE_SLOW_CHECKOUT_SECONDS", "0.5"))
+
+
+class PoolMetrics:
+    """
+    Contadores do pool de conexões, alimentados pelos eventos do SQLAlchemy.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.wait_count = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+        if seconds >= SLOW_CHECKOUT_SECONDS:
+            logger.warning(f"Espera de {seconds:.3f}s por uma conexão do pool")
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self, pool=None) -> dict:
+        with self._lock:
+            data = {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": (self.wait_total / self.wait_count * 1000) if self.wait_count else 0.0,
+                "wait_max_ms": self.wait_max * 1000,
+            }
+        if isinstance(pool, QueuePool):
+            data.update(
+                pool_size=pool.size(),
+                checked_in=pool.checkedin(),
+                checked_out=pool.checkedout(),
+                overflow=pool.overflow(),
+            )
+        return data
+
+
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool que mede quanto tempo cada checkout esperou por uma conexão.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - started)
+        return conn
+
+
+def build_engine_options(url: str) -> dict:
+    """
+    Monta os argumentos do create_engine para a URL informada, conforme o backend.
+    """
+    url = make_url(url)
+    options = {}
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # Banco em memória: mantém o pool padrão do SQLAlchemy (uma conexão por thread)
+        return options
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=POOL_PRE_PING,
+    )
+    if url.get_backend_name() == "postgresql":
+        connect_args = {"application_name": APPLICATION_NAME}
+        if STATEMENT_TIMEOUT_MS:
+            connect_args["options"] = f"-c statement_timeout={STATEMENT_TIMEOUT_MS}"
+        options["connect_args"] = connect_args
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+def create_db_engine(url: str) -> Engine:
+    """
+    Cria o engine com o pool configurado pelo ambiente e o ajuste específico do backend
+    (WAL + synchronous=NORMAL no SQLite, statement_timeout/application_name no Postgres).
+    """
+    new_engine = create_engine(url, **build_engine_options(url))
+    if new_engine.dialect.name == "sqlite" and new_engine.url.database not in (None, "", ":memory:"):
+        event.listen(new_engine, "connect", _set_sqlite_pragmas)
+    event.listen(new_engine, "connect", lambda *args: pool_metrics.increment("connects"))
+    event.listen(new_engine, "checkout", lambda *args: pool_metrics.increment("checkouts"))
+    event.listen(new_engine, "checkin", lambda *args: pool_metrics.increment("checkins"))
+    event.listen(new_engine, "invalidate", lambda *args: pool_metrics.increment("invalidations"))
+    return new_engine
+
+
+def get_pool_metrics() -> dict:
+    """
+    Retorna as métricas de checkout/espera do pool do engine da aplicação.
+    """
+    return pool_metrics.snapshot(engine.pool)
+
+
 # Cria o engine do SQLAlchemy
-engine = create_engine(DATABASE_CONNECTION_URI)
+engine = create_db_engine(DATABASE_CONNECTION_URI)
 
 # Cria uma classe SessionLocal que gerencia as sessões do banco
 SessionLocal = sessionmaker(autocommit=False, autoflush=True, bind=engine)
@@ -20,14 +175,25 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=True, bind=engine)
 # Base declarativa para todos os modelos
 Base = declarative_base()
 
+# Configuração do Alembic. Sem ALEMBIC_CONFIG, usa o alembic.ini da raiz do backend quando a
+# aplicação roda do checkout; um pacote instalado não traz as migrações e exige a variável.
+_CHECKOUT_ALEMBIC_CONFIG = Path(__file__).resolve().parents[3] / "alembic.ini"
+ALEMBIC_CONFIG = os.getenv("ALEMBIC_CONFIG") or (str(_CHECKOUT_ALEMBIC_CONFIG) if _CHECKOUT_ALEMBIC_CONFIG.is_file() else None)
+
+# Chave do advisory lock do Postgres que serializa as migrações entre processos
+MIGRATION_LOCK_KEY = 7_263_120_001
+
+# Revisão inicial, equivalente ao schema criado antes pelo create_all
+BASELINE_REVISION = "689dad032a9d"
+
 
 def get_db():
     """
     Dependência do FastAPI para obter uma sessão do banco de dados.
     Use em endpoints com:
         db: Session = Depends(get_db)
+    O schema é gerenciado pelas migrações (veja `init_db`), não aqui.
     """
-    Base.metadata.create_all(bind=engine)
     db = SessionLocal()
 
     try:
@@ -36,8 +202,110 @@ def get_db():
         db.close()
 
 
-def init_db():
+# Drivers assíncronos usados para cada backend síncrono
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+# Pacote de cada driver assíncrono (asyncpg vem no extra `postgres`)
+ASYNC_DRIVER_MODULES = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
+
+_async_engine: AsyncEngine | None = None
+_async_session_factory: async_sessionmaker | None = None
+
+
+def to_async_url(url: str) -> str:
+    """
+    Converte a URL síncrona (ex.: sqlite:///x.db) na equivalente com driver assíncrono.
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Backend sem driver assíncrono configurado: {backend}")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def check_async_driver(url: str = None):
+    """
+    Verifica, na inicialização, se o driver assíncrono do backend está instalado; sem ele,
+    o primeiro endpoint assíncrono falharia com ModuleNotFoundError.
+    """
+    backend = make_url(url or DATABASE_CONNECTION_URI).get_backend_name()
+    module = ASYNC_DRIVER_MODULES.get(backend)
+    if module and importlib.util.find_spec(module) is None:
+        raise RuntimeError(
+            f"Driver assíncrono '{module}' não instalado para o backend {backend}: instale bank-credit[postgres] ou `pip install {module}`"
+        )
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Engine assíncrono da aplicação, criado na primeira utilização com as mesmas
+    configurações de pool do engine síncrono.
+    """
+    global _async_engine
+    if _async_engine is None:
+        url = to_async_url(DATABASE_CONNECTION_URI)
+        options = build_engine_options(DATABASE_CONNECTION_URI)
+        if options.pop("poolclass", None):
+            options["poolclass"] = AsyncAdaptedQueuePool
+        _async_engine = create_async_engine(url, **options)
+        if _async_engine.dialect.name == "sqlite" and _async_engine.url.database not in (None, "", ":memory:"):
+            event.listen(_async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return _async_engine
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    global _async_session_factory
+    if _async_session_factory is None:
+        _async_session_factory = async_sessionmaker(get_async_engine(), expire_on_commit=False)
+    return _async_session_factory
+
+
+async def get_async_db():
+    """
+    Dependência do FastAPI para obter uma sessão assíncrona do banco de dados.
+    Use em endpoints async de leitura com:
+        db: AsyncSession = Depends(get_async_db)
+    Toda relação serializada precisa ser carregada antecipadamente (não há lazy load).
+    """
+    async with get_async_session_factory()() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _async_session_factory = None
+
+
+def get_alembic_config() -> Config:
+    if not ALEMBIC_CONFIG:
+        raise RuntimeError("Migrações indisponíveis: defina ALEMBIC_CONFIG com o caminho do alembic.ini")
+    config = Config(ALEMBIC_CONFIG)
+    config.set_main_option("script_location", str(Path(ALEMBIC_CONFIG).parent / "alembic"))
+    return config
+
+
+def init_db(bind=None):
     """
-    Inicializa o banco de dados, criando todas as tabelas.
+    Inicializa o banco de dados aplicando as migrações pendentes do Alembic.
+    Bancos criados pelo antigo create_all (sem alembic_version) são marcados
+    na revisão inicial antes do upgrade. No Postgres, um advisory lock da transação
+    garante que processos iniciando juntos migrem um de cada vez.
     """
-    Base.metadata.create_all(bind=engine)
+    bind = bind or engine
+    config = get_alembic_config()
+    with bind.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(select(func.pg_advisory_xact_lock(MIGRATION_LOCK_KEY)))
+        config.attributes["connection"] = connection
+        tables = inspect(connection).get_table_names()
+        if "alembic_version" not in tables and "users" in tables:
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
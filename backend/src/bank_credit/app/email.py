@@ -1,10 +1,29 @@
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+from fastapi_mail import FastMail, ConnectionConfig
 from pydantic import EmailStr
+from typing import Dict, List, Optional, Tuple
+import aiosmtplib
+import asyncio
+import logging
 import os
+import socket
+import time
 from dotenv import load_dotenv
 
+from bank_credit.app.email_templates import email_templates
+
 load_dotenv()
 
+logger = logging.getLogger("bank_credit.email")
+
+# Conexões SMTP autenticadas mantidas abertas pelo dispatcher
+MAIL_POOL_SIZE = int(os.getenv("MAIL_POOL_SIZE", "4"))
+# Limite de mensagens (transações SMTP) por segundo; 0 desativa
+MAIL_RATE_LIMIT = float(os.getenv("MAIL_RATE_LIMIT", "0"))
+# Destinatários por mensagem quando vários emails têm o mesmo assunto e corpo
+MAIL_MAX_RECIPIENTS = int(os.getenv("MAIL_MAX_RECIPIENTS", "50"))
+
 # Configuração condicional para ambiente de teste
 is_testing = os.getenv("TESTING", "false").lower() == "true"
 
@@ -30,66 +49,219 @@ else:
         MAIL_PORT=int(os.getenv("MAIL_PORT", "587")),
         MAIL_SERVER=os.getenv("MAIL_SERVER", ""),
         MAIL_FROM_NAME=os.getenv("MAIL_FROM_NAME", "Sistema de Crédito Bancário"),
-        MAIL_STARTTLS=True,
-        MAIL_SSL_TLS=False,
+        MAIL_STARTTLS=os.getenv("MAIL_STARTTLS", "true").lower() == "true",
+        MAIL_SSL_TLS=os.getenv("MAIL_SSL_TLS", "false").lower() == "true",
         USE_CREDENTIALS=True,
     )
 
 fastmail = FastMail(conf)
 
 
+class MailDispatcher:
+    """
+    Envia lotes de emails por um pool de até `pool_size` conexões SMTP autenticadas, que
+    continuam abertas entre lotes (sem TLS + login a cada mensagem como `fastmail.send_message`).
+    Emails com o mesmo assunto e corpo viram uma única mensagem com vários destinatários no
+    envelope (até `max_recipients`), e o total de mensagens por segundo respeita `rate_limit`.
+    As conexões pertencem ao event loop em que foram abertas; em outro loop, as ociosas são
+    fechadas e o pool recomeça.
+    """
+
+    def __init__(
+        self,
+        settings: ConnectionConfig = None,
+        pool_size: int = MAIL_POOL_SIZE,
+        rate_limit: float = MAIL_RATE_LIMIT,
+        max_recipients: int = MAIL_MAX_RECIPIENTS,
+    ):
+        self.settings = settings or conf
+        self.pool_size = pool_size
+        self.rate_limit = rate_limit
+        self.max_recipients = max_recipients
+        self.connections_opened = 0
+        self.messages_sent = 0
+        self._idle: List[aiosmtplib.SMTP] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._next_slot = 0.0
+
+    @property
+    def sender(self) -> str:
+        return f"{self.settings.MAIL_FROM_NAME} <{self.settings.MAIL_FROM}>"
+
+    async def send(self, emails: List[Tuple[str, str, str]]) -> List[Optional[Exception]]:
+        """
+        Envia os emails (destinatário, assunto, corpo) e retorna, na mesma ordem, None para os
+        enviados e a exceção para os que falharam (conexão, mensagem ou destinatário recusado).
+        """
+        results: List[Optional[Exception]] = [None] * len(emails)
+        if self.settings.SUPPRESS_SEND or not emails:
+            return results
+        if self._loop is not asyncio.get_running_loop():
+            # Conexões de outro loop não podem ser usadas aqui
+            self._close_stale()
+            self._loop = asyncio.get_running_loop()
+
+        # Agrupa emails idênticos: uma mensagem por (assunto, corpo) e bloco de destinatários
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        for index, (_, subject, body) in enumerate(emails):
+            groups.setdefault((subject, body), []).append(index)
+        jobs: asyncio.Queue = asyncio.Queue()
+        for (subject, body), indexes in groups.items():
+            for i in range(0, len(indexes), self.max_recipients):
+                jobs.put_nowait((subject, body, indexes[i:i + self.max_recipients]))
+
+        throttle = asyncio.Lock()
+
+        async def _worker():
+            session = None
+            while not jobs.empty():
+                subject, body, indexes = jobs.get_nowait()
+                recipients = [emails[i][0] for i in indexes]
+                try:
+                    if session is None:
+                        session = await self._acquire()
+                    try:
+                        refused = await self._send_message(session, throttle, subject, body, recipients)
+                    except aiosmtplib.SMTPServerDisconnected:
+                        # Conexão do pool derrubada pelo servidor enquanto ociosa: reconecta uma vez
+                        session = await self._acquire()
+                        refused = await self._send_message(session, throttle, subject, body, recipients)
+                    for i, recipient in zip(indexes, recipients):
+                        if recipient in refused:
+                            results[i] = aiosmtplib.SMTPRecipientRefused(refused[recipient].code, refused[recipient].message, recipient)
+                except Exception as e:
+                    logger.warning(f"[MailDispatcher] Falha ao enviar '{subject}' para {len(recipients)} destinatários: {e}")
+                    for i in indexes:
+                        results[i] = e
+                    if session is not None and not session.is_connected:
+                        session = None
+            if session is not None:
+                self._idle.append(session)
+
+        await asyncio.gather(*(_worker() for _ in range(min(self.pool_size, jobs.qsize()))))
+        return results
+
+    async def close(self):
+        """
+        Encerra as conexões ociosas do pool.
+        """
+        idle, self._idle = self._idle, []
+        for session in idle:
+            try:
+                await session.quit()
+            except Exception:
+                session.close()
+
+    def _close_stale(self):
+        """
+        Fecha as conexões ociosas abertas em outro event loop (sem QUIT: o transporte só
+        pode ser usado no loop de origem).
+        """
+        idle, loop, self._idle = self._idle, self._loop, []
+        for session in idle:
+            try:
+                if loop is not None and loop.is_running():
+                    loop.call_soon_threadsafe(session.close)
+                else:
+                    session.close()
+            except RuntimeError:
+                # Loop de origem já encerrado: derruba a conexão pelo socket
+                transport = session.transport
+                sock = transport.get_extra_info("socket") if transport is not None else None
+                if sock is not None:
+                    try:
+                        sock.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+        if idle:
+            logger.info(f"[MailDispatcher] {len(idle)} conexões de outro event loop encerradas")
+
+    async def _acquire(self) -> aiosmtplib.SMTP:
+        while self._idle:
+            session = self._idle.pop()
+            if session.is_connected:
+                return session
+        settings = self.settings
+        session = aiosmtplib.SMTP(
+            hostname=settings.MAIL_SERVER,
+            timeout=settings.TIMEOUT,
+            port=settings.MAIL_PORT,
+            use_tls=settings.MAIL_SSL_TLS,
+            start_tls=settings.MAIL_STARTTLS,
+            validate_certs=settings.VALIDATE_CERTS,
+        )
+        await session.connect()
+        if settings.USE_CREDENTIALS:
+            await session.login(settings.MAIL_USERNAME, settings.MAIL_PASSWORD)
+        self.connections_opened += 1
+        return session
+
+    async def _throttle(self, lock: asyncio.Lock):
+        if not self.rate_limit:
+            return
+        async with lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1 / self.rate_limit
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _send_message(self, session: aiosmtplib.SMTP, lock: asyncio.Lock, subject: str, body: str, recipients: List[str]):
+        message = EmailMessage()
+        message["Subject"] = subject
+        message["From"] = self.sender
+        # O cabeçalho To não expõe os outros destinatários de uma mensagem agrupada
+        message["To"] = recipients[0] if len(recipients) == 1 else "undisclosed-recipients:;"
+        message["Date"] = formatdate(localtime=True)
+        message["Message-ID"] = make_msgid()
+        message.set_content(body, subtype="html")
+        await self._throttle(lock)
+        refused, _ = await session.send_message(message, recipients=recipients)
+        self.messages_sent += 1
+        return refused
+
+
+mail_dispatcher = MailDispatcher()
+
+
 async def send_notification_email(email_to: EmailStr, subject: str, body: str):
     """
     Envia um email de notificação para o usuário
     """
     if is_testing:
         # Em ambiente de teste, apenas simula o envio
-        print(f"[TEST] Email would be sent to {email_to}: {subject}")
+        logger.info(f"[TEST] Email would be sent to {email_to}: {subject}")
         return
 
-    message = MessageSchema(subject=subject, recipients=[email_to], body=body, subtype="html")
+    error = (await mail_dispatcher.send([(email_to, subject, body)]))[0]
+    if error:
+        raise error
+
 
-    await fastmail.send_message(message)
+async def send_email_batch(emails: List[Tuple[str, str, str]]) -> List[Optional[Exception]]:
+    """
+    Envia vários emails (destinatário, assunto, corpo) pelo pool de conexões do `mail_dispatcher`.
+    Retorna, na mesma ordem, None para os enviados e a exceção para os que falharam.
+    """
+    if is_testing:
+        for email_to, subject, _ in emails:
+            logger.info(f"[TEST] Email would be sent to {email_to}: {subject}")
+        return [None] * len(emails)
+
+    return await mail_dispatcher.send(emails)
 
 
-async def send_credit_request_status_email(email_to: EmailStr, request_id: int, status: str):
+async def send_credit_request_status_email(email_to: EmailStr, request_id: int, status: str, locale: Optional[str] = None):
     """
     Envia um email sobre a atualização do status de uma solicitação de crédito
     """
-    subject = f"Atualização da Solicitação de Crédito #{request_id}"
-    body = f"""
-    <html>
-        <body>
-            <h2>Atualização de Status</h2>
-            <p>Sua solicitação de crédito #{request_id} foi atualizada.</p>
-            <p>Novo status: <strong>{status}</strong></p>
-            <p>Para mais detalhes, acesse sua área do cliente.</p>
-        </body>
-    </html>
-    """
-
+    subject, body = email_templates.render("credit_request_status", locale, request_id=request_id, status=status, reason=None)
     await send_notification_email(email_to, subject, body)
 
 
-async def send_welcome_email(email_to: EmailStr, username: str):
+async def send_welcome_email(email_to: EmailStr, username: str, locale: Optional[str] = None):
     """
     Envia um email de boas-vindas para novos usuários
     """
-    subject = "Bem-vindo ao Sistema de Crédito Bancário"
-    body = f"""
-    <html>
-        <body>
-            <h2>Bem-vindo, {username}!</h2>
-            <p>Sua conta foi criada com sucesso no nosso sistema de crédito bancário.</p>
-            <p>Agora você pode:</p>
-            <ul>
-                <li>Solicitar crédito</li>
-                <li>Acompanhar suas solicitações</li>
-                <li>Receber notificações importantes</li>
-            </ul>
-            <p>Qualquer dúvida, estamos à disposição.</p>
-        </body>
-    </html>
-    """
-
+    subject, body = email_templates.render("welcome", locale, username=username)
     await send_notification_email(email_to, subject, body)
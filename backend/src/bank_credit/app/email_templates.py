@@ -0,0 +1,90 @@
+# app/email_templates.py
+
+import logging
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple
+
+from jinja2 import BaseLoader, ChoiceLoader, Environment, FileSystemLoader, select_autoescape
+
+logger = logging.getLogger("bank_credit.email_templates")
+
+DEFAULT_TEMPLATES_DIR = Path(__file__).parent / "templates" / "email"
+# Diretório com templates que substituem os padrões (os não encontrados nele vêm do pacote)
+EMAIL_TEMPLATES_DIR = os.getenv("EMAIL_TEMPLATES_DIR")
+EMAIL_DEFAULT_LOCALE = os.getenv("EMAIL_DEFAULT_LOCALE", "pt_BR")
+# Renderizações (template, idioma, contexto) guardadas em memória
+EMAIL_RENDER_CACHE_SIZE = int(os.getenv("EMAIL_RENDER_CACHE_SIZE", "1024"))
+
+
+class EmailTemplates:
+    """
+    Templates Jinja2 dos emails, em `<idioma>/<nome>.html`. Cada template define a variável
+    `subject` e o corpo HTML (com autoescape). Os templates são compilados uma vez por
+    `precompile()` na inicialização e ficam no cache do Environment; renderizações com o mesmo
+    contexto (ex.: o mesmo alerta para vários clientes) saem do cache de renderização.
+    """
+
+    def __init__(
+        self,
+        loader: Optional[BaseLoader] = None,
+        default_locale: str = EMAIL_DEFAULT_LOCALE,
+        cache_size: int = EMAIL_RENDER_CACHE_SIZE,
+    ):
+        if loader is None:
+            loaders = [FileSystemLoader(DEFAULT_TEMPLATES_DIR)]
+            if EMAIL_TEMPLATES_DIR:
+                loaders.insert(0, FileSystemLoader(EMAIL_TEMPLATES_DIR))
+            loader = ChoiceLoader(loaders)
+        self.default_locale = default_locale
+        self.env = Environment(
+            loader=loader,
+            autoescape=select_autoescape(["html"]),
+            trim_blocks=True,
+            lstrip_blocks=True,
+            # Templates não mudam com o processo rodando: sem stat() a cada get_template
+            auto_reload=False,
+            cache_size=-1,
+        )
+        self._render_cached = lru_cache(maxsize=cache_size)(self._render)
+
+    def precompile(self) -> int:
+        """
+        Compila todos os templates de email. Retorna quantos foram compilados.
+        """
+        names = self.env.list_templates(extensions=["html"])
+        for name in names:
+            self.env.get_template(name)
+        logger.info(f"[EmailTemplates] {len(names)} templates compilados")
+        return len(names)
+
+    def render(self, name: str, locale: Optional[str] = None, **context) -> Tuple[str, str]:
+        """
+        Renderiza o template `name` no idioma `locale` (ou no padrão, se não houver tradução)
+        e retorna (assunto, corpo HTML).
+        """
+        items = tuple(sorted(context.items()))
+        try:
+            hash(items)
+        except TypeError:
+            # Contexto com valores mutáveis (listas, dicts) não entra no cache
+            return self._render(name, locale or self.default_locale, items)
+        return self._render_cached(name, locale or self.default_locale, items)
+
+    def clear_cache(self):
+        self._render_cached.cache_clear()
+
+    def cache_info(self):
+        return self._render_cached.cache_info()
+
+    def _render(self, name: str, locale: str, items: tuple) -> Tuple[str, str]:
+        template = self.env.select_template([f"{locale}/{name}.html", f"{self.default_locale}/{name}.html"])
+        module = template.make_module(dict(items))
+        subject = getattr(module, "subject", None)
+        if subject is None:
+            raise ValueError(f"O template {template.name} não define `subject`")
+        return str(subject).strip(), str(module).strip()
+
+
+email_templates = EmailTemplates()
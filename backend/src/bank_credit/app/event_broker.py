@@ -0,0 +1,159 @@
+# app/event_broker.py
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Set
+
+logger = logging.getLogger("bank_credit.event_broker")
+
+# Eventos recentes (de todos os clientes) guardados para retomar streams com Last-Event-ID
+EVENT_HISTORY_SIZE = int(os.getenv("EVENT_HISTORY_SIZE", "10000"))
+# Eventos pendentes por conexão; uma conexão que não consome é encerrada e retoma pelo histórico
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "256"))
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    client_id: int
+    type: str
+    data: dict
+
+    def encode(self) -> str:
+        """
+        Evento no formato Server-Sent Events.
+        """
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, default=str)}\n\n"
+
+
+@dataclass(eq=False)
+class Subscription:
+    client_id: int
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue
+    # Eventos perdidos desde o Last-Event-ID, entregues antes dos novos
+    backlog: List[Event] = field(default_factory=list)
+    # O Last-Event-ID é mais antigo que o histórico: o cliente deve recarregar o estado pela API
+    resync: bool = False
+    closed: bool = False
+
+    def _deliver(self, event: Optional[Event]):
+        if self.closed:
+            return
+        if event is None:
+            self.closed = True
+            self.queue.put_nowait(None)
+            return
+        if self.queue.qsize() >= EVENT_QUEUE_SIZE:
+            # Conexão lenta: encerra; o cliente reconecta com Last-Event-ID e recebe o que faltou
+            self.closed = True
+            self.queue.put_nowait(None)
+            logger.warning(f"[Subscription] Fila cheia para o cliente {self.client_id}, conexão encerrada")
+            return
+        self.queue.put_nowait(event)
+
+
+class EventBroker:
+    """
+    Pub/sub em memória para o stream de eventos (SSE). `publish` pode ser chamado de
+    qualquer thread (rotas síncronas, agendadores) e entrega o evento às conexões abertas
+    do cliente no event loop de cada uma. Os ids crescem também entre reinícios (partem do
+    relógio), então um Last-Event-ID de antes de um reinício é reconhecido como antigo.
+    Só enxerga eventos publicados neste processo.
+    """
+
+    def __init__(self, history_size: int = EVENT_HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self._history: Deque[Event] = deque(maxlen=history_size)
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._last_id = time.time_ns() // 1000
+        # Eventos com id até aqui podem ter se perdido (anteriores ao processo ou já fora do histórico)
+        self._floor_id = self._last_id
+        self.published = 0
+        self.delivered = 0
+
+    def publish(self, client_id: int, type: str, data: dict) -> Event:
+        with self._lock:
+            self._last_id = max(self._last_id + 1, time.time_ns() // 1000)
+            event = Event(self._last_id, client_id, type, data)
+            if len(self._history) == self._history.maxlen:
+                self._floor_id = self._history[0].id
+            self._history.append(event)
+            subscribers = self._open_subscriptions(client_id)
+            self.published += 1
+            self.delivered += len(subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+            except RuntimeError:
+                # Loop já encerrado: a conexão caiu sem cancelar a inscrição
+                self.unsubscribe(subscription)
+        logger.debug(f"[EventBroker] Evento {event.id} ({type}) para o cliente {client_id}: {len(subscribers)} conexões")
+        return event
+
+    def _open_subscriptions(self, client_id: int) -> List[Subscription]:
+        # Descarta conexões já encerradas (fila cheia) que não chegaram a cancelar a inscrição
+        subscriptions = self._subscribers.get(client_id)
+        if not subscriptions:
+            return []
+        closed = [s for s in subscriptions if s.closed]
+        for subscription in closed:
+            subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscribers[client_id]
+        return list(subscriptions)
+
+    def subscribe(self, client_id: int, last_event_id: Optional[int] = None) -> Subscription:
+        """
+        Inscreve uma conexão do cliente (chamar de dentro do event loop da conexão). Com
+        `last_event_id`, os eventos posteriores ainda no histórico vêm em `backlog`.
+        """
+        subscription = Subscription(client_id, asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            if last_event_id is not None:
+                subscription.resync = last_event_id < self._floor_id
+                subscription.backlog = [
+                    event for event in self._history if event.client_id == client_id and event.id > last_event_id
+                ]
+            self._subscribers.setdefault(client_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.client_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[subscription.client_id]
+
+    def close_all(self):
+        """
+        Encerra todas as conexões abertas (ex.: no desligamento da aplicação).
+        """
+        with self._lock:
+            subscriptions = [s for subscriptions in self._subscribers.values() for s in subscriptions]
+            self._subscribers.clear()
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, None)
+            except RuntimeError:
+                pass
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "clients": len(self._subscribers),
+                "connections": sum(len(s) for s in self._subscribers.values()),
+                "published": self.published,
+                "delivered": self.delivered,
+                "history": len(self._history),
+            }
+
+
+event_broker = EventBroker()
@@ -1,29 +1,74 @@
 # app/main.py
+from contextlib import asynccontextmanager
+import logging
+import os
+import time
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from bank_credit.app.routers.auth import router as auth_router
 from bank_credit.app.routers.credit_request import router as credit_router
 from bank_credit.app.routers.graph import router as graph_router
+from bank_credit.app.routers.metrics import router as metrics_router
 from bank_credit.app.routers.notification import router as notification_router
+from bank_credit.app.database import check_async_driver, dispose_async_engine, engine, init_db
+from bank_credit.app.email import mail_dispatcher
+from bank_credit.app.email_templates import email_templates
+from bank_credit.app.event_broker import event_broker
+from bank_credit.app.outbox_worker import OUTBOX_WORKER_ENABLED, outbox_worker
+from bank_credit.app.password_pool import password_pool
+from bank_credit.app.sla_scheduler import SLA_SCHEDULER_ENABLED, sla_scheduler
+from bank_credit.app.unread_reconciler import UNREAD_RECONCILER_ENABLED, unread_reconciler
 import uvicorn
 
-# Cria todas as tabelas no banco de dados
-# Base.metadata.create_all(bind=engine)
-# @asynccontextmanager
-# async def lifespan(app: FastAPI):
-#     """
-#     Gerenciador de contexto para o ciclo de vida da aplicação.
-#     Cria as tabelas no banco de dados ao iniciar a aplicação.
-#     """
-#     # Cria todas as tabelas no banco de dados
-#     Base.metadata.create_all(bind=engine)
-#     yield
-#     # Aqui você pode adicionar lógica para limpar ou fechar conexões, se necessário
+logger = logging.getLogger("bank_credit.main")
+
+# Aplica as migrações na inicialização (DATABASE_AUTO_MIGRATE=true, para desenvolvimento).
+# Por padrão as migrações rodam fora do processo, uma vez por deploy: `alembic upgrade head`
+AUTO_MIGRATE = os.getenv("DATABASE_AUTO_MIGRATE", "false").lower() == "true"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Gerenciador de contexto para o ciclo de vida da aplicação.
+    Ao iniciar: verifica o driver async, aplica as migrações pendentes (com DATABASE_AUTO_MIGRATE), compila os
+    templates de email e inicia o agendador de SLA, o worker da outbox e a reconciliação dos contadores de não lidas.
+    Ao encerrar: fecha as conexões do broker de eventos (SSE), para a reconciliação, o worker da outbox e o
+    agendador, encerra o pool de senhas, fecha as conexões SMTP do dispatcher de email e libera os engines
+    síncrono e async.
+    """
+    check_async_driver()
+    if AUTO_MIGRATE:
+        started = time.perf_counter()
+        init_db()
+        logger.info(f"Migrações aplicadas em {time.perf_counter() - started:.3f}s")
+    email_templates.precompile()
+    if SLA_SCHEDULER_ENABLED:
+        sla_scheduler.start()
+    if OUTBOX_WORKER_ENABLED:
+        outbox_worker.start()
+    if UNREAD_RECONCILER_ENABLED:
+        unread_reconciler.start()
+    yield
+    event_broker.close_all()
+    if UNREAD_RECONCILER_ENABLED:
+        unread_reconciler.stop()
+    if OUTBOX_WORKER_ENABLED:
+        outbox_worker.stop()
+    if SLA_SCHEDULER_ENABLED:
+        sla_scheduler.stop()
+    password_pool.shutdown()
+    # Conexões SMTP abertas no loop da aplicação (envios fora da outbox)
+    await mail_dispatcher.close()
+    engine.dispose()
+    await dispose_async_engine()
+
 
 app = FastAPI(
     title="API de Solicitação de Crédito",
     version="1.0.0",
     description="Simulação de fluxo de solicitação de crédito bancário com checklist, roteamento por grafo, SLAs e notificações",
+    lifespan=lifespan,
 )
 
 # Configuração de CORS para permitir chamadas do frontend
@@ -37,6 +82,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Inclui os routers do projeto
@@ -44,6 +90,7 @@ app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(credit_router, prefix="/requests", tags=["credit_requests"])
 app.include_router(graph_router, prefix="/graph", tags=["process_graph"])
 app.include_router(notification_router, prefix="/notifications", tags=["notifications"])
+app.include_router(metrics_router, prefix="/metrics", tags=["metrics"])
 
 
 @app.get("/")
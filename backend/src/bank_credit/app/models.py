@@ -11,9 +11,12 @@ from sqlalchemy import (
     Boolean,
     Text,
     Date,
+    Enum,
+    Index,
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
+import enum
 from bank_credit.app.database import Base, engine
 
 # Association table: which sectors approve which processes
@@ -156,27 +159,49 @@ class Process(Base):
     sectors = relationship("Sector", secondary=sector_approval, back_populates="processes")
 
 
+class RequestStatus(enum.StrEnum):
+    PENDING = "PENDING"
+    PENDING_DOCS = "PENDING_DOCS"
+    CHECKLIST_OK = "CHECKLIST_OK"
+    # Aguardando o setor indicado em current_sector_id
+    PENDING_SECTOR = "PENDING_SECTOR"
+    APPROVED = "APPROVED"
+    REJECTED = "REJECTED"
+    REJECTED_TIMEOUT = "REJECTED_TIMEOUT"
+    REJECTED_NO_SECTOR = "REJECTED_NO_SECTOR"
+    FINALIZED = "FINALIZED"
+
+
 class CreditRequest(Base):
     def __str__(self):
         return f"CreditRequest {self.id} - {self.client} - {self.amount} - {self.status}"
     __tablename__ = "credit_requests"
+    # Filas por setor e varreduras de SLA: status + setor por igualdade, updated_at por intervalo
+    __table_args__ = (Index("ix_credit_requests_status_sector_updated", "status", "current_sector_id", "updated_at"),)
 
     id = Column(Integer, primary_key=True, index=True)
     client_id = Column(Integer, ForeignKey("clients.id"))
     amount = Column(Float, nullable=False)
     purpose = Column(String, nullable=False)
-    status = Column(String, default="PENDING")
+    status = Column(
+        Enum(RequestStatus, native_enum=False, length=32, create_constraint=True, validate_strings=False, name="request_status"),
+        default=RequestStatus.PENDING,
+    )
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Chave da paginação de GET /requests/all: nunca nula
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     deliver_date = Column(DateTime, nullable=False)
     term = Column(Integer, nullable=False)  # in days
     # Current process pointer
     current_process_id = Column(Integer, ForeignKey("processes.id"), nullable=True)
+    # Setor que está analisando o pedido (status PENDING_SECTOR)
+    current_sector_id = Column(Integer, ForeignKey("sectors.id"), nullable=True)
 
     # Relationships
     client = relationship("Client", back_populates="credit_requests")
     history = relationship("RequestHistory", back_populates="request", cascade="all, delete-orphan")
     current_process = relationship("Process")
+    current_sector = relationship("Sector")
 
 
 class RequestHistory(Base):
@@ -206,5 +231,116 @@ class Notification(Base):
     read = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Definidos depois das colunas porque usam expressões sobre elas
+    __table_args__ = (
+        # GET /notifications: notificações do cliente, mais recentes primeiro, sem ordenar em memória;
+        # o id desempata e completa a chave do cursor de paginação (created_at, id)
+        Index("ix_notifications_client_created", client_id, created_at.desc(), id.desc()),
+        # unread-count e read-all: no PostgreSQL e no SQLite o índice guarda só as não lidas
+        # (a condição tem que aparecer igual nas consultas: `not_(Notification.read)`)
+        Index(
+            "ix_notifications_client_unread",
+            client_id,
+            read,
+            postgresql_where=~read,
+            sqlite_where=~read,
+        ),
+    )
+
     # Removido: client = relationship("Client", back_populates="notifications")
     client = relationship("Client")
+
+
+class NotificationCounter(Base):
+    def __str__(self):
+        return f"NotificationCounter {self.client_id} - {self.unread}"
+    __tablename__ = "notification_counters"
+
+    # Notificações não lidas por cliente, mantido junto com as notificações (views/notification.py)
+    client_id = Column(Integer, ForeignKey("clients.id"), primary_key=True)
+    unread = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+# Tabelas de arquivo (views/retention.py): linhas antigas saem das tabelas quentes para cá.
+# Sem chaves estrangeiras e só com o índice da consulta de leitura; `archive_id` é a chave
+# porque o SQLite pode reutilizar o id de linhas removidas da tabela de origem.
+
+class NotificationArchive(Base):
+    def __str__(self):
+        return f"NotificationArchive {self.id} - {self.client_id} - {self.subject}"
+    __tablename__ = "notifications_archive"
+
+    archive_id = Column(Integer, primary_key=True)
+    id = Column(Integer, nullable=False)
+    client_id = Column(Integer, nullable=False, index=True)
+    subject = Column(String, nullable=False)
+    message = Column(Text, nullable=False)
+    read = Column(Boolean)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, nullable=False)
+
+
+class RequestHistoryArchive(Base):
+    def __str__(self):
+        return f"RequestHistoryArchive {self.id} - {self.request_id} - {self.status} - {self.timestamp}"
+    __tablename__ = "request_history_archive"
+
+    archive_id = Column(Integer, primary_key=True)
+    id = Column(Integer, nullable=False)
+    request_id = Column(Integer, index=True)
+    status = Column(String)
+    timestamp = Column(DateTime)
+    reason = Column(String, nullable=True)
+    archived_at = Column(DateTime, nullable=False)
+
+
+class SlaDeadline(Base):
+    def __str__(self):
+        return f"SlaDeadline {self.id} - {self.request_id} - {self.status} - {self.due_at} - {self.fired_at}"
+    __tablename__ = "sla_deadlines"
+    # O agendador busca os prazos pendentes vencidos por esse índice (fired_at IS NULL, due_at <= agora)
+    __table_args__ = (Index("ix_sla_deadlines_pending", "fired_at", "due_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Um prazo ativo por pedido: um novo roteamento substitui o anterior
+    request_id = Column(Integer, ForeignKey("credit_requests.id"), nullable=False, unique=True)
+    status = Column(String, nullable=False)  # status do pedido quando o prazo foi agendado
+    sla_days = Column(Integer, nullable=False)
+    due_at = Column(DateTime, nullable=False)
+    fired_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    request = relationship("CreditRequest")
+
+
+class EmailOutboxStatus(enum.StrEnum):
+    PENDING = "PENDING"
+    # Reservado por um worker até `next_attempt_at`; se o worker cair, volta a ser elegível
+    SENDING = "SENDING"
+    SENT = "SENT"
+    # Tentativas esgotadas; fica na tabela para inspeção e reenvio manual
+    DEAD = "DEAD"
+
+
+class EmailOutbox(Base):
+    def __str__(self):
+        return f"EmailOutbox {self.id} - {self.recipient} - {self.status} - {self.attempts}"
+    __tablename__ = "email_outbox"
+    # O worker busca os emails elegíveis por esse índice (status, next_attempt_at <= agora)
+    __table_args__ = (Index("ix_email_outbox_due", "status", "next_attempt_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(
+        Enum(EmailOutboxStatus, native_enum=False, length=16, create_constraint=True, validate_strings=False, name="email_outbox_status"),
+        nullable=False,
+        default=EmailOutboxStatus.PENDING,
+    )
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
@@ -0,0 +1,114 @@
+# app/outbox_worker.py
+
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+from bank_credit.app import email as email_service
+from bank_credit.app.database import SessionLocal
+from bank_credit.app.views import outbox as outbox_view
+
+logger = logging.getLogger("bank_credit.outbox_worker")
+
+OUTBOX_WORKER_ENABLED = os.getenv("OUTBOX_WORKER_ENABLED", "true").lower() == "true"
+# Intervalo máximo entre consultas à outbox (enxerga emails gravados por outros processos)
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "2"))
+
+
+class OutboxWorker:
+    """
+    Laço único que drena a tabela email_outbox: reserva um lote de emails elegíveis,
+    envia pelo pool de conexões SMTP do `mail_dispatcher` e grava o resultado (SENT,
+    novo agendamento com backoff ou DEAD). Roda em uma thread própria com seu event
+    loop, então o envio nunca ocupa o loop nem a thread das requisições.
+    """
+
+    def __init__(self, session_factory=SessionLocal, poll_seconds: float = OUTBOX_POLL_SECONDS):
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds
+        self.sent_total = 0
+        self.failed_total = 0
+        self.batches_total = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-worker", daemon=True)
+        self._thread.start()
+        logger.info(f"[OutboxWorker] Iniciado (poll={self.poll_seconds}s)")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        logger.info("[OutboxWorker] Encerrado")
+
+    async def drain_once(self, now: Optional[datetime] = None) -> int:
+        """
+        Envia todos os emails elegíveis até `now`, lote a lote. Retorna quantos foram enviados.
+        """
+        sent = 0
+        with self.session_factory() as db:
+            while not self._stop.is_set():
+                emails = outbox_view.claim_due_emails(db, now)
+                if not emails:
+                    break
+                try:
+                    errors = await email_service.send_email_batch([(e.recipient, e.subject, e.body) for e in emails])
+                except Exception as e:
+                    # Falha ao abrir a conexão: o lote inteiro volta para a fila com backoff
+                    errors = [e] * len(emails)
+                outbox_view.record_delivery(db, emails, errors, now)
+                batch_sent = sum(error is None for error in errors)
+                sent += batch_sent
+                self.sent_total += batch_sent
+                self.failed_total += len(emails) - batch_sent
+                self.batches_total += 1
+                if len(emails) < outbox_view.OUTBOX_BATCH_SIZE or batch_sent == 0:
+                    break
+        return sent
+
+    def seconds_until_next(self, now: Optional[datetime] = None) -> float:
+        with self.session_factory() as db:
+            next_due = outbox_view.next_email_due(db)
+        if next_due is None:
+            return self.poll_seconds
+        delay = (next_due - (now or datetime.now())).total_seconds()
+        return min(max(delay, 0.0), self.poll_seconds)
+
+    def metrics(self) -> dict:
+        with self.session_factory() as db:
+            counts = outbox_view.count_by_status(db)
+        return {
+            "sent_total": self.sent_total,
+            "failed_total": self.failed_total,
+            "batches_total": self.batches_total,
+            "outbox": counts,
+        }
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        try:
+            while not self._stop.is_set():
+                try:
+                    sent = loop.run_until_complete(self.drain_once())
+                    if sent:
+                        logger.info(f"[OutboxWorker] {sent} emails enviados")
+                    delay = self.seconds_until_next()
+                except Exception as e:
+                    logger.error(f"[OutboxWorker] Erro ao drenar a outbox: {e}")
+                    delay = self.poll_seconds
+                self._stop.wait(delay)
+        finally:
+            loop.run_until_complete(email_service.mail_dispatcher.close())
+            loop.close()
+
+
+outbox_worker = OutboxWorker()
@@ -0,0 +1,25 @@
+# app/pagination.py
+
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(moment: datetime, row_id: int) -> str:
+    """
+    Gera um cursor opaco (base64) a partir de (data, id) do último item da página.
+    """
+    raw = json.dumps([moment.isoformat(), row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decodifica um cursor gerado por `encode_cursor`. Levanta ValueError se for inválido.
+    """
+    try:
+        moment, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(moment), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
@@ -0,0 +1,124 @@
+# app/password_pool.py
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from bank_credit.app.views import auth as auth_view
+
+logger = logging.getLogger("bank_credit.password_pool")
+
+# Threads dedicadas ao bcrypt (o hash libera o GIL, então threads usam todos os núcleos)
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Operações aguardando uma thread além das em execução; acima disso a requisição recebe 503
+PASSWORD_POOL_MAX_QUEUE = int(os.getenv("PASSWORD_POOL_MAX_QUEUE", "256"))
+
+
+class PasswordPoolBusy(Exception):
+    """
+    A fila do pool de senhas está cheia.
+    """
+
+
+class PasswordPool:
+    """
+    Pool limitado para hash e verificação de senhas (bcrypt, ~100-300 ms cada). Tira o
+    bcrypt do event loop e do threadpool compartilhado das rotas síncronas, limita quantos
+    rodam ao mesmo tempo a `workers` e recusa novas operações quando há mais de `max_queue`
+    esperando, para que um pico de logins não atrase o resto da API.
+    """
+
+    def __init__(self, workers: int = PASSWORD_POOL_WORKERS, max_queue: int = PASSWORD_POOL_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self.pending = 0
+        self.running = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(self._submit(auth_view.verify_password, plain_password, hashed_password))
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return await asyncio.wrap_future(
+            self._submit(auth_view.verify_and_update_password, plain_password, hashed_password)
+        )
+
+    def hash_sync(self, password: str) -> str:
+        """
+        Para rotas síncronas: a thread da requisição espera, mas o bcrypt respeita o limite do pool.
+        """
+        return self._submit(auth_view.get_password_hash, password).result()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": self.running,
+                "queued": self.pending - self.running,
+                "max_queued": self.max_queued,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": self.wait_total / self.completed * 1000 if self.completed else 0.0,
+                "max_wait_ms": self.wait_max * 1000,
+                "avg_run_ms": self.run_total / self.completed * 1000 if self.completed else 0.0,
+            }
+
+    def reset_metrics(self):
+        with self._lock:
+            pending, running = self.pending, self.running
+            self._reset_counters()
+            self.pending, self.running = pending, running
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
+            logger.info("[PasswordPool] Encerrado")
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        with self._lock:
+            if self.pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                logger.warning(f"[PasswordPool] Fila cheia ({self.pending - self.workers} aguardando)")
+                raise PasswordPoolBusy()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-pool")
+            self.pending += 1
+            self.max_queued = max(self.max_queued, self.pending - self.workers)
+            queued_at = time.perf_counter()
+            return self._executor.submit(self._run, fn, queued_at, *args)
+
+    def _run(self, fn: Callable, queued_at: float, *args):
+        started = time.perf_counter()
+        with self._lock:
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self.running -= 1
+                self.pending -= 1
+                self.completed += 1
+                self.wait_total += started - queued_at
+                self.wait_max = max(self.wait_max, started - queued_at)
+                self.run_total += finished - started
+
+
+password_pool = PasswordPool()
@@ -8,13 +8,14 @@ from dotenv import load_dotenv
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from passlib.context import CryptContext  # ADICIONADO
-
 from bank_credit.app import models, schemas
-from bank_credit.app.database import get_db
+from bank_credit.app.database import get_async_db, get_db
 from bank_credit.app.email import send_welcome_email
+from bank_credit.app.password_pool import PasswordPoolBusy, password_pool
+from bank_credit.app.token_cache import UserSnapshot, token_cache
 from bank_credit.app.views import auth as auth_view
 
 # --- Configuration ---
@@ -24,12 +25,6 @@ SECRET_KEY = os.getenv("SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
 # OAuth2 scheme for token-based authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 router = APIRouter()
@@ -48,65 +43,137 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         logger.debug(f"[create_access_token] Expiração padrão: {expire}")
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    logger.debug(f"[create_access_token] Token criado.")
+    logger.debug("[create_access_token] Token criado.")
     return encoded_jwt
 
 # --- Authentication dependencies ---
 
-async def authenticate_user(db: Session, email: str, password: str) -> Optional[models.User]:
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[models.User]:
+    """
+    Verifica email e senha. O bcrypt roda no `password_pool`, fora do event loop. Se o hash
+    gravado usa um custo diferente do configurado, ele é refeito com a senha já verificada.
+    """
     logger.info(f"[authenticate_user] Autenticando usuário {email}")
-    user = auth_view.get_user_by_email(db, email)
+    user = await auth_view.get_user_by_email_async(db, email)
     if not user:
         logger.debug(f"[authenticate_user] Usuário {email} não encontrado.")
         return False
-    if not auth_view.verify_password(password, user.hashed_password) or not user.is_active:
+    valid, new_hash = await password_pool.verify_and_update(password, user.hashed_password)
+    if not valid or not user.is_active:
         logger.debug(f"[authenticate_user] Senha incorreta ou usuário inativo para {email}.")
         return False
+    if new_hash:
+        user.hashed_password = new_hash
+        try:
+            await db.commit()
+            logger.info(f"[authenticate_user] Hash da senha de {email} atualizado.")
+        except Exception as e:
+            # O login não depende do rehash: o hash antigo continua válido e é refeito no próximo login
+            await db.rollback()
+            logger.warning(f"[authenticate_user] Falha ao atualizar o hash da senha de {email}: {e}")
     logger.debug(f"[authenticate_user] Usuário {email} autenticado com sucesso.")
     return user
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
-    logger.info(f"[get_current_user] Validando token JWT.")
-    credentials_exception = HTTPException(
+def _password_pool_busy_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servidor ocupado, tente novamente em instantes",
+        headers={"Retry-After": "1"},
+    )
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não foi possível validar as credenciais",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_token(token: str) -> dict:
+    """
+    Decodifica o JWT e retorna as claims. Levanta 401 se o token for inválido ou não tiver o email (sub).
+    """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email = payload.get("sub")
-        logger.debug(f"[get_current_user] Payload extraído: {payload}")
-        if email is None:
-            logger.warning(f"[get_current_user] Email não encontrado no token.")
-            raise credentials_exception
+        logger.debug(f"[decode_token] Payload extraído: {payload}")
+        if payload.get("sub") is None:
+            logger.warning("[decode_token] Email não encontrado no token.")
+            raise _credentials_exception()
     except JWTError as e:
-        logger.error(f"[get_current_user] Erro ao decodificar JWT: {e}")
-        raise credentials_exception
-    user = auth_view.get_user_by_email(db, email=email)
+        logger.error(f"[decode_token] Erro ao decodificar JWT: {e}")
+        raise _credentials_exception()
+    return payload
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> UserSnapshot:
+    """
+    Usuário do token. Tokens já verificados saem do `token_cache`, sem decodificar o JWT
+    nem consultar o banco; os demais são verificados e entram no cache.
+    """
+    logger.info("[get_current_user] Validando token JWT.")
+    cached = token_cache.get(token)
+    if cached is not None:
+        logger.debug(f"[get_current_user] Usuário {cached.user.email} validado (cache).")
+        return cached.user
+    claims = decode_token(token)
+    user = auth_view.get_user_by_email(db, email=claims["sub"])
     if user is None:
-        logger.warning(f"[get_current_user] Usuário {email} não encontrado.")
-        raise credentials_exception
-    logger.debug(f"[get_current_user] Usuário {email} validado.")
-    return user
+        logger.warning(f"[get_current_user] Usuário {claims['sub']} não encontrado.")
+        raise _credentials_exception()
+    logger.debug(f"[get_current_user] Usuário {claims['sub']} validado.")
+    return token_cache.put(token, claims, user)
 
 async def get_current_active_user(
-    current_user: models.User = Depends(get_current_user),
-) -> models.User:
+    current_user: UserSnapshot = Depends(get_current_user),
+) -> UserSnapshot:
     logger.info(f"[get_current_active_user] Verificando se usuário {getattr(current_user, 'id', None)} está ativo.")
     if not current_user.is_active:
         logger.warning(f"[get_current_active_user] Usuário {getattr(current_user, 'id', None)} inativo.")
         raise HTTPException(status_code=400, detail="Usuário inativo")
-    logger.debug(f"[get_current_active_user] Usuário ativo.")
+    logger.debug("[get_current_active_user] Usuário ativo.")
     return current_user
 
+# --- Async authentication dependencies (endpoints de leitura com AsyncSession) ---
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> UserSnapshot:
+    logger.info("[get_current_user_async] Validando token JWT.")
+    cached = token_cache.get(token)
+    if cached is not None:
+        logger.debug(f"[get_current_user_async] Usuário {cached.user.email} validado (cache).")
+        return cached.user
+    claims = decode_token(token)
+    user = await auth_view.get_user_by_email_async(db, email=claims["sub"])
+    if user is None:
+        logger.warning(f"[get_current_user_async] Usuário {claims['sub']} não encontrado.")
+        raise _credentials_exception()
+    logger.debug(f"[get_current_user_async] Usuário {claims['sub']} validado.")
+    return token_cache.put(token, claims, user)
+
+async def get_current_active_user_async(
+    current_user: UserSnapshot = Depends(get_current_user_async),
+) -> UserSnapshot:
+    return await get_current_active_user(current_user)
+
+def get_current_employee(
+    current_user: UserSnapshot = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> models.Employee:
+    employee = auth_view.get_employee_by_user_id(db, current_user.id)
+    if not employee:
+        logger.warning(f"[get_current_employee] Usuário {current_user.id} não é funcionário.")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas funcionários podem acessar este recurso.")
+    return employee
+
 # --- Auth endpoints ---
 
 @router.post("/token", response_model=schemas.Token, tags=["auth"])
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     logger.info(f"[POST /auth/token] Login attempt for {form_data.username}")
     logger.debug(f"[POST /auth/token] Login form data: {form_data}")
     try:
-        user = await authenticate_user(db, form_data.username, form_data.password)
+        try:
+            user = await authenticate_user(db, form_data.username, form_data.password)
+        except PasswordPoolBusy:
+            logger.warning(f"[POST /auth/token] Password pool busy, rejecting login for {form_data.username}")
+            raise _password_pool_busy_exception()
         if not user:
             logger.warning(f"[POST /auth/token] Login failed for {form_data.username}")
             raise HTTPException(
@@ -125,7 +192,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         raise
 
 @router.post("/register/client", response_model=schemas.Client, tags=["auth"])
-async def register_client(
+def register_client(
     client: schemas.ClientCreate,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
@@ -139,9 +206,12 @@ async def register_client(
         if db.query(models.User).filter(models.User.email == client.user.email).first():
             logger.warning(f"[POST /auth/register/client] Email {client.user.email} already registered")
             raise HTTPException(status_code=400, detail="Email já cadastrado")
-        # HASH DA SENHA ANTES DE CRIAR O USUÁRIO
-        client.user.password = get_password_hash(client.user.password)
-        db_client = auth_view.create_client(db, client)
+        # Hash único, calculado no pool; create_client grava o hash sem hashear de novo
+        try:
+            hashed_password = password_pool.hash_sync(client.user.password)
+        except PasswordPoolBusy:
+            raise _password_pool_busy_exception()
+        db_client = auth_view.create_client(db, client, hashed_password)
         background_tasks.add_task(send_welcome_email, str(db_client.user.email), str(db_client.user.full_name))
         logger.info(f"[POST /auth/register/client] Client {client.user.email} registered successfully")
         logger.debug(f"[POST /auth/register/client] Client object: {db_client}")
@@ -151,7 +221,7 @@ async def register_client(
         raise
 
 @router.post("/register/employee", response_model=schemas.Employee, tags=["auth"])
-async def register_employee(
+def register_employee(
     employee: schemas.EmployeeCreate,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
@@ -168,9 +238,12 @@ async def register_employee(
         if db.query(models.User).filter(models.User.email == employee.user.email).first():
             logger.warning(f"[POST /auth/register/employee] Email {employee.user.email} already registered")
             raise HTTPException(status_code=400, detail="Email já cadastrado")
-        # HASH DA SENHA ANTES DE CRIAR O USUÁRIO
-        employee.user.password = get_password_hash(employee.user.password)
-        db_employee = auth_view.create_employee(db, employee)
+        # Hash único, calculado no pool; create_employee grava o hash sem hashear de novo
+        try:
+            hashed_password = password_pool.hash_sync(employee.user.password)
+        except PasswordPoolBusy:
+            raise _password_pool_busy_exception()
+        db_employee = auth_view.create_employee(db, employee, hashed_password)
         background_tasks.add_task(send_welcome_email, str(db_employee.user.email), str(db_employee.user.full_name))
         logger.info(f"[POST /auth/register/employee] Employee {employee.user.email} registered successfully")
         logger.debug(f"[POST /auth/register/employee] Employee object: {db_employee}")
@@ -180,7 +253,11 @@ async def register_employee(
         raise
 
 @router.get("/me", response_model=schemas.User, tags=["auth"])
-async def read_users_me(current_user: models.User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+def read_users_me(current_user: UserSnapshot = Depends(get_current_active_user), db: Session = Depends(get_db)):
     logger.info(f"[GET /auth/me] User {current_user.id}")
     logger.debug(f"[GET /auth/me] Getting user info for user_id={current_user.id}")
-    return current_user
\ No newline at end of file
+    # O snapshot do cache não tem grupos, cliente e funcionário: carrega o usuário completo
+    user = db.get(models.User, current_user.id)
+    if user is None:
+        raise _credentials_exception()
+    return user
\ No newline at end of file
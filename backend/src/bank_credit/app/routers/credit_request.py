@@ -1,20 +1,24 @@
 # app/routers/credit_request.py
 
-from bank_credit.app.utils import send_notification
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
+from typing import List, Optional
 import logging
 import os
 
 from bank_credit.app import schemas, models
-from bank_credit.app.database import get_db
-from bank_credit.app.routers.auth import get_current_active_user
-from bank_credit.app.routers.notification import send_notification_email
+from bank_credit.app.database import get_async_db, get_db
+from bank_credit.app.email_templates import email_templates
+from bank_credit.app.event_broker import event_broker
+from bank_credit.app.routers.auth import get_current_active_user, get_current_active_user_async
 from bank_credit.app.views import auth as auth_view
 from bank_credit.app.views import credit_request as credit_view
+from bank_credit.app.views import outbox as outbox_view
 from bank_credit.app.views import routing as routing_view
+from bank_credit.app.views import transition as transition_view
+from bank_credit.app.views import utils as utils_view
 
 # Configuração global de logging
 LOG_LEVEL = logging.DEBUG if os.environ.get("ENV", "dev") == "dev" else logging.INFO
@@ -32,8 +36,22 @@ def log_request_context(request_id=None, user_id=None, action=None, extra=None):
 router = APIRouter()
 
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
 @router.get("/all", response_model=List[schemas.CreditRequest], tags=["requests"])
 def list_all_requests_for_employee(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Cursor retornado no header X-Next-Cursor da página anterior"),
+    limit: Optional[int] = Query(None, ge=1, le=credit_view.MAX_PAGE_SIZE, description="Tamanho da página; sem limit e sem cursor, a lista vem completa"),
+    status_filter: Optional[List[str]] = Query(None, alias="status"),
+    process_id: Optional[int] = None,
+    sector_id: Optional[int] = None,
+    client_id: Optional[int] = None,
+    min_amount: Optional[float] = Query(None, ge=0),
+    max_amount: Optional[float] = Query(None, ge=0),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user),
 ):
@@ -45,8 +63,33 @@ def list_all_requests_for_employee(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Apenas funcionários podem acessar todas as solicitações."
         )
-    requests = credit_view.list_all_requests(db)
-    logger.debug(f"Found {len(requests)} requests in total")
+    # Sem limit nem cursor, a resposta continua completa (clientes que não seguem o X-Next-Cursor)
+    if limit is None and cursor:
+        limit = credit_view.DEFAULT_PAGE_SIZE
+    filters = dict(
+        cursor=cursor,
+        status=status_filter,
+        process_id=process_id,
+        sector_id=sector_id,
+        client_id=client_id,
+        min_amount=min_amount,
+        max_amount=max_amount,
+    )
+    try:
+        if format == "ndjson" or NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+            next_cursor = credit_view.next_page_cursor(db, limit=limit, **filters)
+            rows = credit_view.iter_all_requests(db, limit=limit, **filters)
+            lines = (schemas.CreditRequest.model_validate(row, from_attributes=True).model_dump_json() + "\n" for row in rows)
+            headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+            logger.debug(f"Streaming requests as NDJSON, next_cursor={next_cursor}")
+            return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE, headers=headers)
+        requests, next_cursor = credit_view.list_all_requests(db, limit=limit, **filters)
+    except ValueError as e:
+        logger.warning(f"Invalid listing parameters: {e}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    logger.debug(f"Found {len(requests)} requests in page")
     return requests
 
 
@@ -71,17 +114,17 @@ def create_credit_request(
         raise
 
 @router.get("/", response_model=List[schemas.CreditRequest])
-def list_my_requests(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+async def list_my_requests(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_active_user_async),
 ):
     logger.info(f"[GET /requests] User {current_user.id}")
     try:
-        client = auth_view.get_client_by_user_id(db, current_user.id)
+        client = await auth_view.get_client_by_user_id_async(db, current_user.id)
         if not client:
             logger.warning(f"User {current_user.id} is not a client")
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas clientes podem listar solicitações de crédito.")
-        requests = credit_view.list_client_requests(db, client.id)
+        requests = await credit_view.list_client_requests_async(db, client.id)
         logger.debug(f"Found {len(requests)} requests for user {current_user.id}")
         return requests
     except Exception as e:
@@ -89,21 +132,21 @@ def list_my_requests(
         raise
 
 @router.get("/{request_id}", response_model=schemas.CreditRequest)
-def get_request(
+async def get_request(
     request_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_active_user_async),
 ):
     logger.info(f"[GET /requests/{{request_id}}] User {current_user.id} - Request {request_id}")
     try:
-        req = credit_view.get_credit_request(db, request_id)
-        client = auth_view.get_client_by_user_id(db, current_user.id)
-        employee = auth_view.get_employee_by_user_id(db, current_user.id)
+        req = await credit_view.get_credit_request_async(db, request_id)
+        client = await auth_view.get_client_by_user_id_async(db, current_user.id)
+        employee = await auth_view.get_employee_by_user_id_async(db, current_user.id)
         # Permite acesso se for o cliente dono OU funcionário
         if not req or (not client and not employee) or (client and req.client_id != client.id):
             logger.warning(f"Request {request_id} not found or unauthorized for user {current_user.id}")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pedido não encontrado")
-        logger.debug(f"Request found: {req}")
+        logger.debug(f"Request found: {req.id}")
         return req
     except Exception as e:
         logger.error(f"Error fetching request {request_id}: {e}")
@@ -130,6 +173,37 @@ def route_request_to_next(
         logger.error(f"Error routing request {request_id}: {e}")
         raise
 
+@router.post("/route:batch", response_model=List[schemas.RouteOutcome])
+def route_requests_batch(
+    payload: schemas.RouteBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    logger.info(f"[POST /requests/route:batch] User {current_user.id} - Batch routing")
+    employee = auth_view.get_employee_by_user_id(db, current_user.id)
+    if not employee:
+        logger.warning(f"User {current_user.id} is not an employee")
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Apenas funcionários podem rotear pedidos em lote.",
+        )
+    if payload.request_ids is not None:
+        request_ids = payload.request_ids
+    else:
+        request_ids = credit_view.list_request_ids(db, limit=routing_view.MAX_ROUTE_BATCH_SIZE + 1, **payload.filter.model_dump())
+    if len(request_ids) > routing_view.MAX_ROUTE_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No máximo {routing_view.MAX_ROUTE_BATCH_SIZE} pedidos por lote.",
+        )
+    try:
+        outcomes = routing_view.route_credit_requests(db, request_ids)
+        logger.info(f"Batch routing finished for {len(outcomes)} requests")
+        return outcomes
+    except Exception as e:
+        logger.error(f"Error routing requests in batch: {e}")
+        raise
+
 @router.get("/{request_id}/status", response_model=str)
 def get_request_status(
     request_id: int,
@@ -158,14 +232,18 @@ def get_estimated_time(
 ):
     logger.info(f"[GET /requests/{{request_id}}/estimated-time] User {current_user.id} - Request {request_id}")
     try:
-        from datetime import timedelta
-        req = credit_view.get_credit_request(db, request_id)
         client = auth_view.get_client_by_user_id(db, current_user.id)
         employee = auth_view.get_employee_by_user_id(db, current_user.id)
-        if not req or (not client and not employee) or (client and req.client_id != client.id):
+        if not client and not employee:
+            logger.warning(f"User {current_user.id} is neither client nor employee")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pedido não encontrado")
+        etas = utils_view.get_estimated_times_to_completion(
+            db, [request_id], client_id=None if employee else client.id
+        )
+        if request_id not in etas:
             logger.warning(f"Request {request_id} not found or unauthorized for user {current_user.id}")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pedido não encontrado")
-        eta: timedelta = credit_view.get_estimated_time_to_completion(db, request_id)
+        eta = etas[request_id]
         if eta is None:
             logger.warning(f"Estimated time unavailable for request {request_id}")
             raise HTTPException(
@@ -178,6 +256,32 @@ def get_estimated_time(
         logger.error(f"Error estimating time for request {request_id}: {e}")
         raise
 
+@router.post("/estimated-time:batch", response_model=List[schemas.EstimatedTime])
+def get_estimated_times(
+    payload: schemas.EstimatedTimeBatch,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    logger.info(f"[POST /requests/estimated-time:batch] User {current_user.id} - {len(payload.request_ids)} requests")
+    try:
+        client = auth_view.get_client_by_user_id(db, current_user.id)
+        employee = auth_view.get_employee_by_user_id(db, current_user.id)
+        if not client and not employee:
+            logger.warning(f"User {current_user.id} is neither client nor employee")
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso negado")
+        etas = utils_view.get_estimated_times_to_completion(
+            db, payload.request_ids, client_id=None if employee else client.id
+        )
+        # Pedidos inexistentes ou de outro cliente são omitidos; finalizados vêm com days=None
+        return [
+            schemas.EstimatedTime(request_id=request_id, days=etas[request_id].days if etas[request_id] else None)
+            for request_id in dict.fromkeys(payload.request_ids)
+            if request_id in etas
+        ]
+    except Exception as e:
+        logger.error(f"Error estimating time for requests {payload.request_ids}: {e}")
+        raise
+
 @router.patch("/{request_id}/status", response_model=schemas.CreditRequest)
 def update_request_status(
     request_id: int,
@@ -196,52 +300,42 @@ def update_request_status(
         status_anterior = req.status
         requested_status = status_update["status"]
         reason = status_update.get("reason")
+        if requested_status not in models.RequestStatus.__members__:
+            logger.warning(f"Invalid status {requested_status} for request {request_id}")
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Status inválido")
+        if requested_status == models.RequestStatus.PENDING_SECTOR.value:
+            # Só o roteamento define PENDING_SECTOR, junto com o setor responsável
+            logger.warning(f"Status {requested_status} requested manually for request {request_id}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="O status PENDING_SECTOR só pode ser definido pelo roteamento do pedido"
+            )
         logger.info(f"Atualizando status do pedido {req.id} de {status_anterior} para {requested_status}")
 
-        # --- FIXED LOGIC ---
-        if requested_status == "APPROVED":
-            if req.current_process and req.current_process.next_process_id:
-                # Advance to next process, keep status as PENDING
-                logger.debug(f"Avançando processo de {req.current_process_id} para {req.current_process.next_process_id}")
-                req.current_process_id = req.current_process.next_process_id
-                req.status = "PENDING"
-            elif req.current_process and req.current_process.next_process_id is None:
-                # Last process approved, finish request
-                logger.debug(f"Finalizando processo, não há próximo processo para {req.current_process_id}")
-                req.current_process_id = None
-                req.status = "APPROVED"
-            elif req.current_process is None:
-                # Already finished, do nothing
-                logger.debug(f"Pedido {req.id} já finalizado")
-        elif requested_status == "REJECTED":
-            # On rejection, keep process pointer, set status to REJECTED
-            logger.debug(f"Pedido {req.id} rejeitado no processo {req.current_process_id}")
-            req.status = "REJECTED"
-        elif requested_status == "PENDING":
-            # Resubmission after rejection: keep process pointer, set status to PENDING
-            logger.debug(f"Pedido {req.id} reaberto para análise no processo {req.current_process_id}")
-            req.status = "PENDING"
-        else:
-            # Any other status, set as requested
-            req.status = requested_status
-
-        db.add(req)
-        db.commit()
-        db.refresh(req)
-        logger.debug(f"Registrando histórico: status={req.status}, reason={reason}")
-        history = models.RequestHistory(request_id=req.id, status=req.status, timestamp=datetime.now(), reason=reason)
-        db.add(history)
-        db.commit()
-        # Improved subject and message for notification
-        status_display = req.status.capitalize() if req.status.isupper() else req.status
+        new_status, process_id = transition_view.resolve_requested_status(db, req, requested_status)
+        status_display = new_status.capitalize() if new_status.isupper() else new_status
         subject = f"Your credit request #{req.id} was {status_display.lower()}"
         message = f"The status of your credit request #{req.id} is now {status_display}."
         if reason:
             message += f" Reason: {reason}"
-
-        send_notification_email(current_user.email, subject=subject, body=message)
-        send_notification(db=db, client_id=req.client_id, subject=subject, message=message)
+        # Pedido, histórico, notificação e email (outbox) em um único commit
+        email_subject, email_body = email_templates.render("credit_request_status", request_id=req.id, status=new_status, reason=reason)
+        outbox_view.enqueue_email(db, req.client.user.email, email_subject, email_body)
+        transition_view.transition_request(
+            db, req, new_status, process_id=process_id, reason=reason, notification=(subject, message)
+        )
         logger.info(f"Status atualizado com sucesso para o pedido {req.id}")
+        event_broker.publish(
+            req.client_id,
+            "request_status",
+            {
+                "request_id": req.id,
+                "status": new_status,
+                "previous_status": status_anterior,
+                "reason": reason,
+                "notification": {"subject": subject, "message": message},
+            },
+        )
         return req
     except Exception as e:
         logger.error(f"Error updating status for request {request_id}: {e}")
@@ -261,12 +355,10 @@ def get_request_history(
         if not req or (not client and not employee) or (client and req.client_id != client.id):
             logger.warning(f"Request {request_id} not found or unauthorized for user {current_user.id}")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pedido não encontrado")
-        history = (
-            db.query(models.RequestHistory)
-            .filter(models.RequestHistory.request_id == request_id)
-            .order_by(models.RequestHistory.timestamp.desc())
-            .all()
-        )
+        history = db.query(models.RequestHistory).filter(models.RequestHistory.request_id == request_id).all()
+        # Entradas antigas de pedidos encerrados podem ter ido para o arquivo (views/retention.py)
+        history += db.query(models.RequestHistoryArchive).filter(models.RequestHistoryArchive.request_id == request_id).all()
+        history.sort(key=lambda entry: entry.timestamp, reverse=True)
         logger.debug(f"Found {len(history)} history entries for request {request_id}")
         return history
     except Exception as e:
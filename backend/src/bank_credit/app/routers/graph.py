@@ -1,14 +1,14 @@
 # app/routers/graph.py
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, Response, status
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-import networkx as nx
 import logging
 
 from bank_credit.app.database import get_db
 from bank_credit.app.routers.auth import get_current_active_user
 from bank_credit.app import models
+from bank_credit.app.utils import ProcessGraph
 from bank_credit.app.views import utils as utils_view
 
 logger = logging.getLogger("bank_credit.routers.graph")
@@ -16,35 +16,56 @@ logger = logging.getLogger("bank_credit.routers.graph")
 router = APIRouter()
 
 
+def _etag(graph: ProcessGraph) -> str:
+    return f'"{graph.digest}"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _graph_response(request: Request, graph: ProcessGraph, build_body) -> Response:
+    """
+    Responde 304 se o cliente já tem esta versão do grafo; senão serializa o corpo.
+    """
+    etag = _etag(graph)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _not_modified(request, etag):
+        logger.debug(f"Process graph unchanged ({etag}), returning 304")
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(build_body(graph), headers=headers)
+
+
 @router.get("/", response_class=JSONResponse, status_code=status.HTTP_200_OK)
 def get_process_graph(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: models.Client = Depends(get_current_active_user),
 ):
     logger.info(f"[GET /graph] User {current_user.id}")
     try:
-        G: nx.DiGraph = utils_view.get_process_graph_data(db)
-        nodes = []
-        for pid in G.nodes:
-            proc: models.Process = db.query(models.Process).get(pid)
-            if not proc:
-                logger.warning(f"Process node {pid} not found in DB")
-                continue
-            sectors = [s.name for s in proc.sectors]
-            nodes.append(
+        graph = utils_view.get_process_graph_snapshot(db)
+
+        def build_body(graph: ProcessGraph):
+            nodes = [
                 {
                     "id": proc.id,
                     "name": proc.name,
                     "next_process_id": proc.next_process_id,
-                    "sectors": sectors,
+                    "sectors": [s.name for s in graph.sectors.get(pid, [])],
                 }
-            )
-        edges = []
-        for u, v in G.edges:
-            edges.append({"from": u, "to": v})
-        logger.debug(f"Graph nodes: {nodes}")
-        logger.debug(f"Graph edges: {edges}")
-        return {"nodes": nodes, "edges": edges}
+                for pid, proc in graph.processes.items()
+            ]
+            edges = [{"from": u, "to": v} for u, v in graph.graph.edges]
+            logger.debug(f"Graph nodes: {nodes}")
+            logger.debug(f"Graph edges: {edges}")
+            return {"nodes": nodes, "edges": edges}
+
+        return _graph_response(request, graph, build_body)
     except Exception as e:
         logger.error(f"Error fetching process graph: {e}")
         raise
@@ -52,25 +73,22 @@ def get_process_graph(
 
 @router.get("/visualize", response_class=JSONResponse, status_code=status.HTTP_200_OK)
 def visualize_process_graph(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: models.Client = Depends(get_current_active_user),
 ):
     logger.info(f"[GET /graph/visualize] User {current_user.id}")
     try:
-        G: nx.DiGraph = utils_view.get_process_graph_data(db)
-        vis_nodes = []
-        vis_edges = []
-        for pid in G.nodes:
-            proc: models.Process = db.query(models.Process).get(pid)
-            if not proc:
-                logger.warning(f"Process node {pid} not found in DB")
-                continue
-            vis_nodes.append({"id": proc.id, "label": proc.name})
-        for u, v in G.edges:
-            vis_edges.append({"from": u, "to": v})
-        logger.debug(f"Vis.js nodes: {vis_nodes}")
-        logger.debug(f"Vis.js edges: {vis_edges}")
-        return {"nodes": vis_nodes, "edges": vis_edges}
+        graph = utils_view.get_process_graph_snapshot(db)
+
+        def build_body(graph: ProcessGraph):
+            vis_nodes = [{"id": proc.id, "label": proc.name} for proc in graph.processes.values()]
+            vis_edges = [{"from": u, "to": v} for u, v in graph.graph.edges]
+            logger.debug(f"Vis.js nodes: {vis_nodes}")
+            logger.debug(f"Vis.js edges: {vis_edges}")
+            return {"nodes": vis_nodes, "edges": vis_edges}
+
+        return _graph_response(request, graph, build_body)
     except Exception as e:
         logger.error(f"Error visualizing process graph: {e}")
         raise
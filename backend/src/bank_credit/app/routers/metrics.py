@@ -0,0 +1,57 @@
+# app/routers/metrics.py
+
+from fastapi import APIRouter, Depends
+
+from bank_credit.app.database import get_pool_metrics
+from bank_credit.app.event_broker import event_broker
+from bank_credit.app.outbox_worker import outbox_worker
+from bank_credit.app.password_pool import password_pool
+from bank_credit.app.routers.auth import get_current_employee
+from bank_credit.app.sla_scheduler import sla_scheduler
+from bank_credit.app.token_cache import token_cache
+from bank_credit.app.unread_reconciler import unread_reconciler
+from bank_credit.app.views.sla import get_sla_metrics
+
+# Métricas operacionais: restritas a funcionários
+router = APIRouter(dependencies=[Depends(get_current_employee)])
+
+
+@router.get("/database")
+def read_database_metrics():
+    """
+    Métricas do pool de conexões: checkouts, conexões abertas, tempo de espera e timeouts.
+    """
+    return get_pool_metrics()
+
+
+@router.get("/sla")
+def read_sla_metrics():
+    """
+    Progresso do finalizador de pedidos vencidos e alertas disparados pelo agendador de SLA.
+    """
+    return {**get_sla_metrics(), "scheduler": {"fired_total": sla_scheduler.fired_total}}
+
+
+@router.get("/outbox")
+def read_outbox_metrics():
+    """
+    Emails na outbox por status e totais enviados/falhos pelo worker.
+    """
+    return outbox_worker.metrics()
+
+
+@router.get("/auth")
+def read_auth_metrics():
+    """
+    Cache de tokens verificados e fila do pool de hash/verificação de senhas.
+    """
+    return {"token_cache": token_cache.stats(), "password_pool": password_pool.metrics()}
+
+
+@router.get("/notifications")
+def read_notification_metrics():
+    """
+    Execuções da reconciliação dos contadores de não lidas e quantos contadores ela corrigiu,
+    e conexões abertas/eventos publicados no stream (GET /notifications/stream).
+    """
+    return {"unread_reconciler": unread_reconciler.metrics(), "stream": event_broker.metrics()}
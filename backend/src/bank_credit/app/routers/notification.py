@@ -1,26 +1,37 @@
 # app/routers/notification.py
 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime, UTC
+import asyncio
 import logging
+import os
 from sqlalchemy import not_
 
-from bank_credit.app.database import get_db
-from bank_credit.app.routers.auth import get_current_active_user
+from bank_credit.app.database import get_async_db, get_db
+from bank_credit.app.event_broker import Subscription, event_broker
+from bank_credit.app.routers.auth import get_current_active_user, get_current_active_user_async
 from bank_credit.app import models, schemas
-from bank_credit.app.email import send_notification_email
+from bank_credit.app.views import auth as auth_view
+from bank_credit.app.views import notification as notification_view
+from bank_credit.app.views import outbox as outbox_view
 
 logger = logging.getLogger("bank_credit.routers.notification")
 
 router = APIRouter()
 
+# Intervalo entre heartbeats (comentários SSE) que mantêm a conexão aberta em proxies
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+# Espera sugerida ao navegador antes de reconectar
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
+
 
 @router.post("/", response_model=schemas.NotificationRead)
-async def create_notification(
+def create_notification(
     notification_in: schemas.NotificationCreate,
-    background_tasks: BackgroundTasks,
     current_user: models.Client = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
@@ -35,41 +46,120 @@ async def create_notification(
             created_at=datetime.now(),
         )
         db.add(notification)
+        # O email vai para a outbox na mesma transação da notificação
+        outbox_view.enqueue_email(db, current_user.email, notification.subject, notification.message)
         db.commit()
         db.refresh(notification)
         logger.info(f"Notification {notification.id} created for client {current_user.id}")
+        # O stream é por cliente (Client.id), como as notificações dos pedidos
+        client = auth_view.get_client_by_user_id(db, current_user.id)
+        if client:
+            event_broker.publish(client.id, "notification", notification_view.notification_event(notification))
     except Exception as e:
         logger.error(f"Error creating notification: {e}")
         raise
-    # Enviar email em background
-    background_tasks.add_task(
-        send_notification_email,
-        current_user.email,
-        notification.subject,
-        notification.message,
-    )
-
     return notification
 
 
+async def _list_notifications(response: Response, db: AsyncSession, client_id: int, **params):
+    try:
+        notifications, next_cursor = await notification_view.list_notifications(db, client_id, **params)
+    except ValueError as e:
+        logger.warning(f"Invalid listing parameters: {e}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    logger.debug(f"Found {len(notifications)} notifications in page for user {client_id}")
+    return notifications
+
+
 @router.get("/", response_model=List[schemas.NotificationRead])
-def get_notifications(
-    current_user: models.Client = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+async def get_notifications(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Cursor retornado no header X-Next-Cursor da página anterior"),
+    limit: int = Query(notification_view.DEFAULT_PAGE_SIZE, ge=1, le=notification_view.MAX_PAGE_SIZE),
+    unread_only: bool = False,
+    since: Optional[datetime] = Query(None, description="Apenas notificações criadas depois deste instante"),
+    current_user: models.Client = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    logger.info(f"[GET /notifications] User {current_user.id}")
+    logger.info(f"[GET /notifications] User {current_user.id} - cursor={cursor} unread_only={unread_only} since={since}")
+    return await _list_notifications(
+        response, db, current_user.id, cursor=cursor, limit=limit, unread_only=unread_only, since=since
+    )
+
+
+@router.get("/summary", response_model=List[schemas.NotificationSummary])
+async def get_notifications_summary(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Cursor retornado no header X-Next-Cursor da página anterior"),
+    limit: int = Query(notification_view.DEFAULT_PAGE_SIZE, ge=1, le=notification_view.MAX_PAGE_SIZE),
+    unread_only: bool = False,
+    since: Optional[datetime] = Query(None, description="Apenas notificações criadas depois deste instante"),
+    current_user: models.Client = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Mesma listagem de GET /notifications/, sem o corpo das mensagens (para listas e badges).
+    """
+    logger.info(f"[GET /notifications/summary] User {current_user.id} - cursor={cursor} unread_only={unread_only} since={since}")
+    return await _list_notifications(
+        response, db, current_user.id, cursor=cursor, limit=limit, unread_only=unread_only, since=since, summary=True
+    )
+
+
+async def _event_stream(subscription: Subscription, heartbeat_seconds: float):
     try:
-        notifications = (
-            db.query(models.Notification)
-            .filter(models.Notification.client_id == current_user.id)
-            .order_by(models.Notification.created_at.desc())
-            .all()
-        )
-        logger.debug(f"Found {len(notifications)} notifications for user {current_user.id}")
-        return notifications
-    except Exception as e:
-        logger.error(f"Error fetching notifications: {e}")
-        raise
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        if subscription.resync:
+            # Eventos podem ter se perdido: o cliente recarrega notificações e pedidos pela API
+            yield "event: resync\ndata: {}\n\n"
+        for event in subscription.backlog:
+            yield event.encode()
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            if event is None:
+                break
+            yield event.encode()
+    finally:
+        event_broker.unsubscribe(subscription)
+
+
+@router.get("/stream")
+async def stream_events(
+    last_event_id: Optional[str] = Header(None),
+    current_user: models.Client = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Stream (Server-Sent Events) de notificações (`notification`) e mudanças de status dos
+    pedidos (`request_status`) do cliente, com heartbeat a cada SSE_HEARTBEAT_SECONDS.
+    Ao reconectar com o cabeçalho Last-Event-ID, os eventos perdidos são reenviados; se
+    já saíram do histórico, chega um evento `resync`.
+    """
+    logger.info(f"[GET /notifications/stream] User {current_user.id} - Last-Event-ID {last_event_id}")
+    # Os eventos são publicados por Client.id (pedidos e notificações do cliente)
+    client = await auth_view.get_client_by_user_id_async(db, current_user.id)
+    if not client:
+        logger.warning(f"User {current_user.id} is not a client")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas clientes podem acompanhar o stream de eventos.")
+    # A conexão fica aberta por muito tempo: devolve a conexão do banco ao pool antes do stream
+    await db.close()
+    try:
+        last_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        # Id que não é deste servidor: trata como perda de eventos
+        last_id = 0
+    subscription = event_broker.subscribe(client.id, last_id)
+    return StreamingResponse(
+        _event_stream(subscription, SSE_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/{notification_id:int}", response_model=schemas.NotificationRead)
@@ -126,11 +216,12 @@ def mark_all_notifications_as_read(
 ):
     logger.info(f"[PATCH /notifications/read-all] User {current_user.id} - Mark all as read")
     try:
-        db.refresh(current_user)
         updated = db.query(models.Notification).filter(
             models.Notification.client_id == current_user.id,
             not_(models.Notification.read),
         ).update({"read": True}, synchronize_session="fetch")
+        # UPDATE em massa não passa pelos eventos do ORM: o contador é ajustado aqui, na mesma transação
+        notification_view.adjust_unread_counters(db.connection(), {current_user.id: -updated})
         db.commit()
         logger.debug(f"Marked {updated} notifications as read for user {current_user.id}")
         return {"message": "Todas as notificações foram marcadas como lidas"}
@@ -140,16 +231,14 @@ def mark_all_notifications_as_read(
 
 
 @router.get("/unread-count")
-def get_unread_notifications_count(
-    current_user: models.Client = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+async def get_unread_notifications_count(
+    current_user: models.Client = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     logger.info(f"[GET /notifications/unread-count] User {current_user.id}")
     try:
-        count = db.query(models.Notification).filter(
-            models.Notification.client_id == current_user.id,
-            not_(models.Notification.read),
-        ).count()
+        # Contador materializado (notification_counters): leitura pela chave primária
+        count = await notification_view.get_unread_count(db, current_user.id)
         logger.debug(f"User {current_user.id} has {count} unread notifications")
         return dict(count=count)
     except Exception as e:
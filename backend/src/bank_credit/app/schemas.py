@@ -1,7 +1,7 @@
 # app/schemas.py
 
 from __future__ import annotations
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import BaseModel, EmailStr, Field, model_validator, validator
 from typing import Optional, List
 from datetime import date, datetime
 import re
@@ -132,6 +132,17 @@ class NotificationRead(NotificationBase):
     created_at: datetime
 
 
+class NotificationSummary(BaseModel):
+    """
+    Notificação sem o corpo da mensagem, para listagens.
+    """
+    id: int
+    client_id: int
+    subject: str
+    read: bool
+    created_at: datetime
+
+
 # --- Credit request models ---
 
 
@@ -156,6 +167,45 @@ class CreditRequest(CreditRequestBase):
     created_at: datetime
     updated_at: datetime
     current_process_id: Optional[int] = None
+    current_sector_id: Optional[int] = None
+
+
+class EstimatedTimeBatch(BaseModel):
+    request_ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+
+class EstimatedTime(BaseModel):
+    request_id: int
+    days: Optional[int] = None
+
+
+class RouteBatchFilter(BaseModel):
+    status: Optional[List[str]] = None
+    process_id: Optional[int] = None
+    sector_id: Optional[int] = None
+    client_id: Optional[int] = None
+    min_amount: Optional[float] = Field(None, ge=0)
+    max_amount: Optional[float] = Field(None, ge=0)
+
+
+class RouteBatchRequest(BaseModel):
+    request_ids: Optional[List[int]] = Field(None, min_length=1)
+    filter: Optional[RouteBatchFilter] = None
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        if (self.request_ids is None) == (self.filter is None):
+            raise ValueError("Informe request_ids ou filter (apenas um deles)")
+        return self
+
+
+class RouteOutcome(BaseModel):
+    request_id: int
+    outcome: str
+    status: Optional[str] = None
+    current_process_id: Optional[int] = None
+    current_sector_id: Optional[int] = None
+    detail: Optional[str] = None
 
 
 # --- Request History Schemas ---
@@ -0,0 +1,85 @@
+# app/sla_scheduler.py
+
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+from bank_credit.app.database import SessionLocal
+from bank_credit.app.views import sla as sla_view
+
+logger = logging.getLogger("bank_credit.sla_scheduler")
+
+SLA_SCHEDULER_ENABLED = os.getenv("SLA_SCHEDULER_ENABLED", "true").lower() == "true"
+# Intervalo máximo entre consultas ao próximo prazo (enxerga prazos criados por outros workers)
+SLA_SCHEDULER_POLL_SECONDS = float(os.getenv("SLA_SCHEDULER_POLL_SECONDS", "60"))
+
+
+class SlaScheduler:
+    """
+    Laço único que dispara os alertas de SLA gravados em sla_deadlines.
+    Dorme até o próximo prazo pendente (limitado a `poll_seconds`) e dispara os
+    vencidos em lotes, então o número de threads e a memória não dependem de
+    quantos pedidos estão em andamento. Como os prazos ficam no banco, nada se
+    perde ao reiniciar; com vários workers, cada lote é travado com SKIP LOCKED.
+    """
+
+    def __init__(self, session_factory=SessionLocal, poll_seconds: float = SLA_SCHEDULER_POLL_SECONDS):
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds
+        self.fired_total = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sla-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"[SlaScheduler] Iniciado (poll={self.poll_seconds}s)")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        logger.info("[SlaScheduler] Encerrado")
+
+    def run_once(self, now: Optional[datetime] = None) -> int:
+        """
+        Dispara todos os prazos vencidos até `now`, lote a lote. Retorna quantos foram processados.
+        """
+        fired = 0
+        with self.session_factory() as db:
+            while not self._stop.is_set():
+                count = sla_view.fire_due_sla_alerts(db, now)
+                fired += count
+                if count < sla_view.SLA_ALERT_BATCH_SIZE:
+                    break
+        self.fired_total += fired
+        return fired
+
+    def seconds_until_next(self, now: Optional[datetime] = None) -> float:
+        with self.session_factory() as db:
+            next_due = sla_view.next_sla_deadline(db)
+        if next_due is None:
+            return self.poll_seconds
+        delay = (next_due - (now or datetime.now())).total_seconds()
+        return min(max(delay, 0.0), self.poll_seconds)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                fired = self.run_once()
+                if fired:
+                    logger.info(f"[SlaScheduler] {fired} prazos de SLA processados")
+                delay = self.seconds_until_next()
+            except Exception as e:
+                logger.error(f"[SlaScheduler] Erro ao processar prazos de SLA: {e}")
+                delay = self.poll_seconds
+            self._stop.wait(delay)
+
+
+sla_scheduler = SlaScheduler()
@@ -0,0 +1,153 @@
+# app/token_cache.py
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+from sqlalchemy import event, inspect
+
+from bank_credit.app import models
+
+logger = logging.getLogger("bank_credit.token_cache")
+
+# Tokens verificados mantidos em memória (os menos usados saem primeiro)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+# Tempo máximo de uma entrada, mesmo que o `exp` do token seja maior; limita quanto
+# tempo outro processo pode servir um usuário alterado (a invalidação é local)
+TOKEN_CACHE_MAX_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_MAX_TTL_SECONDS", "300"))
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """
+    Dados do usuário autenticado que as rotas usam; os relacionamentos ficam no banco.
+    """
+    id: int
+    email: str
+    full_name: str
+    is_active: bool
+    is_superuser: bool
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            is_active=bool(user.is_active),
+            is_superuser=bool(user.is_superuser),
+        )
+
+
+@dataclass(frozen=True)
+class CachedToken:
+    claims: dict
+    user: UserSnapshot
+    expires_at: float  # epoch (segundos)
+
+
+class TokenCache:
+    """
+    Cache LRU de tokens JWT já verificados, indexado pelo SHA-256 do token (o token em si
+    não fica em memória). Cada entrada vale até o `exp` do token, limitado a `max_ttl`,
+    e é removida quando o usuário é alterado (ex.: desativado) por este processo.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE, max_ttl: float = TOKEN_CACHE_MAX_TTL_SECONDS):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[str, CachedToken]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[CachedToken]:
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.time():
+                self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, token: str, claims: dict, user: models.User) -> UserSnapshot:
+        snapshot = UserSnapshot.from_user(user)
+        if self.max_size <= 0:
+            return snapshot
+        expires_at = time.time() + self.max_ttl
+        if isinstance(claims.get("exp"), (int, float)):
+            expires_at = min(expires_at, claims["exp"])
+        key = self.key(token)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = CachedToken(claims, snapshot, expires_at)
+            self._by_user.setdefault(snapshot.id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))
+        return snapshot
+
+    def invalidate_user(self, user_id: int) -> int:
+        """
+        Remove todas as entradas do usuário. Retorna quantas foram removidas.
+        """
+        with self._lock:
+            keys = self._by_user.pop(user_id, set())
+            for key in keys:
+                self._entries.pop(key, None)
+        if keys:
+            logger.debug(f"[TokenCache] {len(keys)} tokens do usuário {user_id} invalidados")
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+    def _discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._by_user.get(entry.user.id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_user[entry.user.id]
+
+
+token_cache = TokenCache()
+
+# Campos do snapshot: se algum mudar (ex.: usuário desativado), os tokens do usuário saem do cache
+_SNAPSHOT_FIELDS = ("email", "full_name", "is_active", "is_superuser")
+
+
+@event.listens_for(models.User, "after_update")
+def _invalidate_updated_user(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in _SNAPSHOT_FIELDS):
+        token_cache.invalidate_user(target.id)
+
+
+@event.listens_for(models.User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target):
+    token_cache.invalidate_user(target.id)
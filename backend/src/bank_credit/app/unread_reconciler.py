@@ -0,0 +1,83 @@
+# app/unread_reconciler.py
+
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+from bank_credit.app.database import SessionLocal
+from bank_credit.app.views import notification as notification_view
+
+logger = logging.getLogger("bank_credit.unread_reconciler")
+
+UNREAD_RECONCILER_ENABLED = os.getenv("UNREAD_RECONCILER_ENABLED", "true").lower() == "true"
+# Intervalo entre reconciliações dos contadores de não lidas
+UNREAD_RECONCILER_INTERVAL_SECONDS = float(os.getenv("UNREAD_RECONCILER_INTERVAL_SECONDS", "3600"))
+
+
+class UnreadReconciler:
+    """
+    Laço que recalcula periodicamente os contadores de notificações não lidas
+    (notification_counters) e corrige os que divergiram das notificações, por exemplo
+    após escritas feitas fora da aplicação. Roda uma vez ao iniciar e depois a cada
+    `interval_seconds`.
+    """
+
+    def __init__(self, session_factory=SessionLocal, interval_seconds: float = UNREAD_RECONCILER_INTERVAL_SECONDS):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self.runs = 0
+        self.repaired_total = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="unread-reconciler", daemon=True)
+        self._thread.start()
+        logger.info(f"[UnreadReconciler] Iniciado (intervalo={self.interval_seconds}s)")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        logger.info("[UnreadReconciler] Encerrado")
+
+    def run_once(self) -> int:
+        """
+        Reconcilia os contadores. Retorna quantos foram corrigidos.
+        """
+        with self.session_factory() as db:
+            repaired = notification_view.reconcile_unread_counters(db)
+        self.runs += 1
+        self.repaired_total += repaired
+        self.last_run_at = datetime.now()
+        self.last_error = None
+        return repaired
+
+    def metrics(self) -> dict:
+        return {
+            "runs": self.runs,
+            "repaired_total": self.repaired_total,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_error": self.last_error,
+            "interval_seconds": self.interval_seconds,
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"[UnreadReconciler] Erro ao reconciliar contadores de não lidas: {e}")
+            self._stop.wait(self.interval_seconds)
+
+
+unread_reconciler = UnreadReconciler()
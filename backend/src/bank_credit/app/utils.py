@@ -1,17 +1,29 @@
 # app/utils.py
 
+import hashlib
+import json
+import os
 import threading
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
 from datetime import datetime, UTC, timedelta
+from typing import Dict, List, Optional, Tuple
 import networkx as nx
+from sqlalchemy import delete, event, insert
 from sqlalchemy.orm import Session
 
 from bank_credit.app.database import SessionLocal
 from bank_credit.app import models
+# Importar o módulo também registra os eventos que mantêm o contador de não lidas
+from bank_credit.app.views import notification as notification_view
 
 
 def send_notification(db: Session, client_id: int, subject: str, message: str):
     """
-    Cria uma nova notificação para o cliente informado.
+    Cria uma nova notificação para o cliente informado. O contador de não lidas do
+    cliente é atualizado no mesmo commit (eventos em views/notification.py) e, depois do
+    commit, a notificação vai para as conexões abertas em GET /notifications/stream.
     """
     notif = models.Notification(
         client_id=client_id,
@@ -22,52 +34,207 @@ def send_notification(db: Session, client_id: int, subject: str, message: str):
     )
     db.add(notif)
     db.commit()
+    notification_view.publish_notifications([notif])
+
+
+# --- Process graph cache ---
+
+# Revalida o grafo após este intervalo (s), para enxergar alterações feitas por outros workers
+PROCESS_GRAPH_TTL_SECONDS = float(os.getenv("PROCESS_GRAPH_TTL_SECONDS", "60"))
+
+
+@dataclass(frozen=True)
+class ProcessInfo:
+    id: int
+    name: str
+    next_process_id: Optional[int]
+
+
+@dataclass(frozen=True)
+class SectorInfo:
+    id: int
+    name: str
+    limit: float
+    sla_days: int
+
+
+@dataclass
+class ProcessGraph:
+    """
+    Fotografia imutável do fluxo de processos: o grafo, os processos e os setores
+    que aprovam cada processo, na versão em que foi construída.
+    """
+
+    version: int
+    graph: nx.DiGraph
+    processes: Dict[int, ProcessInfo]
+    sectors: Dict[int, List[SectorInfo]]
+    built_at: float = field(default_factory=time.monotonic)
+    digest: str = ""
+
+    def __post_init__(self):
+        # Resumo do conteúdo, igual em todos os workers para o mesmo grafo (usado como ETag)
+        content = [
+            (info.id, info.name, info.next_process_id, [(s.id, s.name, s.limit, s.sla_days) for s in self.sectors.get(pid, [])])
+            for pid, info in sorted(self.processes.items())
+        ]
+        self.digest = hashlib.sha1(json.dumps(content).encode()).hexdigest()
+
+    @property
+    def start_nodes(self) -> List[int]:
+        return [n for n, d in self.graph.in_degree() if d == 0]
+
+    def successors(self, process_id: int) -> List[int]:
+        return list(self.graph.successors(process_id))
+
+    def sla_days(self, process_id: int) -> int:
+        # Mesmo critério da estimativa original: o menor SLA entre os setores do processo
+        return min([s.sla_days or 0 for s in self.sectors.get(process_id, [])] or [0])
+
+    @cached_property
+    def remaining_sla_days(self) -> Dict[int, int]:
+        """
+        Dias de SLA restantes de cada processo até o fim do fluxo (incluindo o próprio),
+        pelo caminho crítico. Calculado uma vez por versão do grafo, numa passada
+        em ordem topológica reversa. Processos em ciclo (ou que levam a um) ficam de fora.
+        """
+        cyclic = {n for component in nx.strongly_connected_components(self.graph) if len(component) > 1 for n in component}
+        cyclic |= {n for n in self.graph if self.graph.has_edge(n, n)}
+        acyclic = self.graph.subgraph(n for n in self.graph if n not in cyclic)
+        remaining: Dict[int, int] = {}
+        for pid in reversed(list(nx.topological_sort(acyclic))):
+            successors = self.successors(pid)
+            if any(succ not in remaining for succ in successors):
+                continue
+            remaining[pid] = self.sla_days(pid) + max((remaining[succ] for succ in successors), default=0)
+        return remaining
+
+    def remaining_time(self, process_id: Optional[int]) -> Optional[timedelta]:
+        days = self.remaining_sla_days.get(process_id)
+        return timedelta(days=days) if days is not None else None
+
+
+_graph_lock = threading.Lock()
+_graph_version = 0
+_graph_cache: Optional[ProcessGraph] = None
+
+
+def get_process_graph_version() -> int:
+    return _graph_version
+
+
+def invalidate_process_graph():
+    """
+    Incrementa a versão do grafo; a próxima leitura reconstrói o cache.
+    """
+    global _graph_version
+    with _graph_lock:
+        _graph_version += 1
+
+
+def _load_process_graph(db: Session, version: int) -> ProcessGraph:
+    G = nx.DiGraph()
+    processes = {}
+    for proc_id, name, next_process_id in db.query(models.Process.id, models.Process.name, models.Process.next_process_id):
+        processes[proc_id] = ProcessInfo(proc_id, name, next_process_id)
+        G.add_node(proc_id)
+    for info in processes.values():
+        if info.next_process_id is not None:
+            G.add_edge(info.id, info.next_process_id)
+    sectors = {proc_id: [] for proc_id in processes}
+    rows = (
+        db.query(
+            models.sector_approval.c.process_id,
+            models.Sector.id,
+            models.Sector.name,
+            models.Sector.limit,
+            models.Sector.sla_days,
+        )
+        .join(models.Sector, models.Sector.id == models.sector_approval.c.sector_id)
+    )
+    for proc_id, sector_id, name, limit, sla_days in rows:
+        sectors.setdefault(proc_id, []).append(SectorInfo(sector_id, name, limit, sla_days))
+    return ProcessGraph(version=version, graph=nx.freeze(G), processes=processes, sectors=sectors)
+
+
+def get_process_graph(db: Session) -> ProcessGraph:
+    """
+    Retorna o grafo de processos em cache, compartilhado entre as requisições do worker.
+    É reconstruído quando a versão muda (alteração em Process, Sector ou sector_approval)
+    ou quando o TTL expira.
+    """
+    global _graph_cache
+    if _is_fresh(_graph_cache):
+        return _graph_cache
+    with _graph_lock:
+        if not _is_fresh(_graph_cache):
+            _graph_cache = _load_process_graph(db, _graph_version)
+        return _graph_cache
+
+
+def _is_fresh(cached: Optional[ProcessGraph]) -> bool:
+    return (
+        cached is not None
+        and cached.version == _graph_version
+        and time.monotonic() - cached.built_at < PROCESS_GRAPH_TTL_SECONDS
+    )
 
 
 def build_process_graph(db: Session) -> nx.DiGraph:
     """
-    Constrói e retorna um grafo direcionado (networkx.DiGraph)
+    Retorna o grafo direcionado (networkx.DiGraph, somente leitura)
     a partir das definições de Processos e seus next_process_id.
     """
-    close_db = False
-    G = nx.DiGraph()
-    processes = db.query(models.Process).all()
-    for proc in processes:
-        G.add_node(proc.id)
-        if proc.next_process_id is not None:
-            G.add_edge(proc.id, proc.next_process_id)
+    return get_process_graph(db).graph
+
+
+@event.listens_for(Session, "after_flush")
+def _track_process_graph_changes(session, flush_context):
+    changed = session.new | session.dirty | session.deleted
+    if any(isinstance(obj, (models.Process, models.Sector)) for obj in changed):
+        session.info["process_graph_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_process_graph_on_commit(session):
+    if session.info.pop("process_graph_changed", False):
+        invalidate_process_graph()
 
-    if close_db:
-        db.close()
-    return G
 
+@event.listens_for(Session, "after_rollback")
+def _discard_process_graph_changes(session):
+    session.info.pop("process_graph_changed", None)
 
-def schedule_sla_alert(db: Session, request_id: int, sla_days: int):
+
+def schedule_sla_alerts(db: Session, deadlines: List[Tuple[int, str, int]], now: Optional[datetime] = None):
     """
-    Agenda um alerta para verificar SLA ultrapassado após `sla_days` dias.
-    Será executado em background via threading.Timer.
+    Registra o prazo de SLA de cada pedido (request_id, status, sla_days) na tabela
+    sla_deadlines, substituindo o prazo anterior. Não faz commit: o prazo é gravado na
+    mesma transação do roteamento e disparado depois pelo agendador (sla_scheduler).
     """
+    if not deadlines:
+        return
+    now = now or datetime.now()
+    request_ids = [request_id for request_id, _, _ in deadlines]
+    db.execute(delete(models.SlaDeadline).where(models.SlaDeadline.request_id.in_(request_ids)))
+    db.execute(
+        insert(models.SlaDeadline),
+        [
+            {
+                "request_id": request_id,
+                "status": status,
+                "sla_days": sla_days,
+                "due_at": now + timedelta(days=sla_days),
+                "created_at": now,
+            }
+            for request_id, status, sla_days in deadlines
+        ],
+    )
+
 
-    def _alert():
-        try:
-            req = db.query(models.CreditRequest).get(request_id)
-            if not req:
-                return
-
-            # Se ainda estiver pendente em algum setor, dispara notificação
-            if req.status.startswith("PENDING_"):
-                deadline = req.updated_at + timedelta(days=sla_days)
-                if datetime.now() >= deadline:
-                    send_notification(
-                        client_id=req.client_id,
-                        subject="Alerta de SLA ultrapassado",
-                        message=f"Seu pedido #{request_id} ultrapassou o SLA de {sla_days} dias no setor.",
-                    )
-        finally:
-            db.close()
-
-    # agenda execução após sla_days dias (em segundos)
-    delay = sla_days * 24 * 3600
-    timer = threading.Timer(delay, _alert)
-    timer.daemon = True
-    timer.start()
+def schedule_sla_alert(db: Session, request_id: int, status: str, sla_days: int):
+    """
+    Agenda o alerta de SLA ultrapassado para daqui a `sla_days` dias, se o pedido
+    ainda estiver com o mesmo `status`.
+    """
+    schedule_sla_alerts(db, [(request_id, status, sla_days)])
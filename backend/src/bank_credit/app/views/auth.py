@@ -1,26 +1,44 @@
-from typing import Optional
+from typing import Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from bank_credit.app import models, schemas
 from datetime import datetime
 from passlib.context import CryptContext
 import logging
+import os
 
 logger = logging.getLogger("bank_credit.views.auth")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Custo do bcrypt (2^rounds iterações). Hashes gravados com outro custo são refeitos no próximo login
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+# Único contexto de senhas da aplicação: rotas, pool de senhas e scripts usam as funções abaixo
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=PASSWORD_BCRYPT_ROUNDS)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    logger.debug(f"[verify_password] Verificando senha para usuário.")
+    logger.debug("[verify_password] Verificando senha para usuário.")
     result = pwd_context.verify(plain_password, hashed_password)
     logger.debug(f"[verify_password] Resultado: {result}")
     return result
 
 def get_password_hash(password: str) -> str:
-    logger.debug(f"[get_password_hash] Gerando hash para senha.")
+    logger.debug("[get_password_hash] Gerando hash para senha.")
     hash_ = pwd_context.hash(password)
-    logger.debug(f"[get_password_hash] Hash gerado.")
+    logger.debug("[get_password_hash] Hash gerado.")
     return hash_
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica a senha e, se o hash estiver desatualizado (custo diferente de
+    PASSWORD_BCRYPT_ROUNDS ou esquema obsoleto), retorna também o novo hash a gravar.
+    Custa um único bcrypt quando o hash já está atualizado.
+    """
+    logger.debug("[verify_and_update_password] Verificando senha para usuário.")
+    valid, new_hash = pwd_context.verify_and_update(plain_password, hashed_password)
+    logger.debug(f"[verify_and_update_password] Resultado: {valid}, rehash: {new_hash is not None}")
+    return valid, new_hash
+
 def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
     logger.debug(f"Buscando usuário por email: {email}")
     user = db.query(models.User).filter(models.User.email == email).first()
@@ -47,13 +65,17 @@ def get_employee_by_email(db: Session, email: str) -> Optional[models.Employee]:
     logger.debug(f"Resultado: {employee}")
     return employee
 
-def create_user(db: Session, user_in: schemas.UserCreate) -> models.User:
+def create_user(db: Session, user_in: schemas.UserCreate, hashed_password: Optional[str] = None) -> models.User:
+    """
+    Cria o usuário. `hashed_password` é o hash já calculado (ex.: no `password_pool`);
+    sem ele, a senha em `user_in.password` é hasheada aqui. A senha nunca é hasheada duas vezes.
+    """
     logger.info(f"Criando usuário: {user_in.email}")
     db_user = models.User(
         full_name=user_in.full_name,
         phone=user_in.phone,
         email=user_in.email,
-        hashed_password=get_password_hash(user_in.password),  # CORRIGIDO: agora hasheia a senha
+        hashed_password=hashed_password or get_password_hash(user_in.password),
         is_active=True,
         is_superuser=user_in.is_superuser or False,
         created_at=datetime.now(),
@@ -72,9 +94,9 @@ def create_user(db: Session, user_in: schemas.UserCreate) -> models.User:
     logger.info(f"Usuário {db_user.id} salvo com grupos")
     return db_user
 
-def create_client(db: Session, client_in: schemas.ClientCreate) -> models.Client:
+def create_client(db: Session, client_in: schemas.ClientCreate, hashed_password: Optional[str] = None) -> models.Client:
     logger.info(f"Criando cliente para usuário: {client_in.user.email}")
-    db_user = create_user(db, client_in.user)
+    db_user = create_user(db, client_in.user, hashed_password)
     db_client = models.Client(
         user_id=db_user.id,
         cnpj=client_in.cnpj,
@@ -100,9 +122,9 @@ def create_client(db: Session, client_in: schemas.ClientCreate) -> models.Client
     logger.info(f"Cliente criado: {db_client}")
     return db_client
 
-def create_employee(db: Session, employee_in: schemas.EmployeeCreate) -> models.Employee:
+def create_employee(db: Session, employee_in: schemas.EmployeeCreate, hashed_password: Optional[str] = None) -> models.Employee:
     logger.info(f"Criando funcionário para usuário: {employee_in.user.email}")
-    db_user = create_user(db, employee_in.user)
+    db_user = create_user(db, employee_in.user, hashed_password)
     db_employee = models.Employee(
         user_id=db_user.id,
         matricula=employee_in.matricula,
@@ -136,4 +158,28 @@ def get_user_by_employee_id(db: Session, employee_id: int) -> Optional[models.Us
     logger.debug(f"Buscando usuário por employee_id: {employee_id}")
     user = db.query(models.User).join(models.Employee).filter(models.Employee.id == employee_id).first()
     logger.debug(f"Resultado: {user}")
-    return user
\ No newline at end of file
+    return user
+
+
+# --- Consultas assíncronas (AsyncSession) ---
+
+async def get_user_by_email_async(db: AsyncSession, email: str) -> Optional[models.User]:
+    logger.debug(f"Buscando usuário por email (async): {email}")
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    user = result.scalars().first()
+    logger.debug(f"Resultado: {user}")
+    return user
+
+async def get_client_by_user_id_async(db: AsyncSession, user_id: int) -> Optional[models.Client]:
+    logger.debug(f"Buscando cliente por user_id (async): {user_id}")
+    result = await db.execute(select(models.Client).where(models.Client.user_id == user_id))
+    client = result.scalars().first()
+    logger.debug(f"Resultado: cliente {client.id if client else None}")
+    return client
+
+async def get_employee_by_user_id_async(db: AsyncSession, user_id: int) -> Optional[models.Employee]:
+    logger.debug(f"Buscando funcionário por user_id (async): {user_id}")
+    result = await db.execute(select(models.Employee).where(models.Employee.user_id == user_id))
+    employee = result.scalars().first()
+    logger.debug(f"Resultado: funcionário {employee.id if employee else None}")
+    return employee
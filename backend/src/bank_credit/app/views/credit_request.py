@@ -1,45 +1,213 @@
 # Credit request-related CRUD logic (migrated from crud.py)
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query, Session, joinedload, selectinload
 from bank_credit.app import models, schemas, utils
+from bank_credit.app.pagination import decode_cursor, encode_cursor
 from bank_credit.app.utils import send_notification, build_process_graph
+from bank_credit.app.views import transition
 import logging
 from bank_credit.app import models
 
 
 logger = logging.getLogger("bank_credit.views.credit_request")
 
-def list_all_requests(db):
-    return db.query(models.CreditRequest).all()
+# --- Query options ---
+# Grafo de carregamento antecipado exigido por cada schema de resposta. Sem ele, serializar
+# N pedidos dispara lazy loads de client -> user -> groups/client/employee para cada linha.
+
+
+def user_options(relationship=None):
+    """
+    Carregamento necessário para serializar `schemas.User` (groups, client, employee e role).
+    Se `relationship` for informado, as opções são encadeadas a partir dele.
+    """
+    loaders = (
+        selectinload(models.User.groups),
+        joinedload(models.User.client),
+        joinedload(models.User.employee),
+    )
+    if relationship is None:
+        return loaders
+    return (relationship.options(*loaders),)
+
+
+def client_user_options(relationship=None):
+    """
+    Carregamento necessário para serializar `schemas.ClientUser` (cliente + usuário).
+    """
+    loader = relationship.joinedload(models.Client.user) if relationship is not None else joinedload(models.Client.user)
+    return user_options(loader)
+
+
+def credit_request_options():
+    """
+    Carregamento necessário para serializar `schemas.CreditRequest`. O cliente é carregado por
+    selectin para que pedidos do mesmo cliente compartilhem uma única linha.
+    """
+    return client_user_options(selectinload(models.CreditRequest.client))
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def query_all_requests(
+    db: Session,
+    cursor: Optional[str] = None,
+    status: Optional[List[str]] = None,
+    process_id: Optional[int] = None,
+    sector_id: Optional[int] = None,
+    client_id: Optional[int] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+) -> Query:
+    """
+    Monta a consulta de todos os pedidos, filtrada e ordenada por (updated_at, id) decrescente.
+    A paginação é por keyset: o cursor aponta para o último item já entregue.
+    """
+    CreditRequest = models.CreditRequest
+    query = db.query(CreditRequest)
+    if status:
+        query = query.filter(CreditRequest.status.in_(status))
+    if process_id is not None:
+        query = query.filter(CreditRequest.current_process_id == process_id)
+    if sector_id is not None:
+        query = query.filter(CreditRequest.current_sector_id == sector_id)
+    if client_id is not None:
+        query = query.filter(CreditRequest.client_id == client_id)
+    if min_amount is not None:
+        query = query.filter(CreditRequest.amount >= min_amount)
+    if max_amount is not None:
+        query = query.filter(CreditRequest.amount <= max_amount)
+    if cursor:
+        last_updated_at, last_id = decode_cursor(cursor)
+        query = query.filter(
+            or_(
+                CreditRequest.updated_at < last_updated_at,
+                and_(CreditRequest.updated_at == last_updated_at, CreditRequest.id < last_id),
+            )
+        )
+    return query.order_by(CreditRequest.updated_at.desc(), CreditRequest.id.desc())
+
+
+def list_request_ids(db: Session, limit: Optional[int] = None, **filters) -> List[int]:
+    """
+    Retorna apenas os ids dos pedidos que atendem aos filtros, na mesma ordem de query_all_requests.
+    """
+    query = query_all_requests(db, **filters).with_entities(models.CreditRequest.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return [request_id for (request_id,) in query]
+
+
+def list_all_requests(db: Session, limit: Optional[int] = DEFAULT_PAGE_SIZE, **filters) -> Tuple[List[models.CreditRequest], Optional[str]]:
+    """
+    Retorna uma página de pedidos e o cursor da próxima página (None se for a última).
+    Com `limit=None`, retorna todos os pedidos a partir do cursor, sem próxima página.
+    """
+    logger.info(f"[list_all_requests] Listando pedidos (limit={limit})")
+    logger.debug(f"[list_all_requests] Filtros: {filters}")
+    query = query_all_requests(db, **filters).options(*credit_request_options())
+    if limit is None:
+        rows = query.all()
+        logger.debug(f"[list_all_requests] Encontrados {len(rows)} pedidos (sem paginação)")
+        return rows, None
+    rows = query.limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1].updated_at, rows[limit - 1].id) if len(rows) > limit else None
+    logger.debug(f"[list_all_requests] Encontrados {len(rows[:limit])} pedidos, next_cursor={next_cursor}")
+    return rows[:limit], next_cursor
+
+
+def next_page_cursor(db: Session, limit: Optional[int] = DEFAULT_PAGE_SIZE, **filters) -> Optional[str]:
+    """
+    Calcula o cursor da próxima página lendo apenas as colunas da chave (updated_at, id),
+    sem materializar os pedidos da página. Usado pelo modo de streaming.
+    """
+    if limit is None:
+        return None
+    keys = (
+        query_all_requests(db, **filters)
+        .with_entities(models.CreditRequest.updated_at, models.CreditRequest.id)
+        .offset(limit - 1)
+        .limit(2)
+        .all()
+    )
+    return encode_cursor(*keys[0]) if len(keys) > 1 else None
+
+
+def iter_all_requests(db: Session, limit: Optional[int] = DEFAULT_PAGE_SIZE, chunk_size: int = 100, **filters) -> Iterator[models.CreditRequest]:
+    """
+    Itera sobre uma página de pedidos buscando as linhas do banco em blocos de `chunk_size`,
+    para que a página inteira nunca precise estar carregada em memória.
+    """
+    logger.info(f"[iter_all_requests] Transmitindo pedidos (limit={limit}, chunk_size={chunk_size})")
+    query = query_all_requests(db, **filters).options(*credit_request_options())
+    yield from query.limit(limit).yield_per(chunk_size)
 
 def get_credit_request(db: Session, request_id: int) -> Optional[models.CreditRequest]:
     logger.info(f"[get_credit_request] Buscando pedido de crédito {request_id}")
     logger.debug(f"[get_credit_request] Parâmetros: request_id={request_id}")
-    req = db.query(models.CreditRequest).filter(models.CreditRequest.id == request_id).first()
+    req = (
+        db.query(models.CreditRequest)
+        .options(*credit_request_options())
+        .filter(models.CreditRequest.id == request_id)
+        .first()
+    )
     logger.debug(f"[get_credit_request] Resultado: {req}")
     return req
 
 def list_credit_requests(db: Session, skip: int = 0, limit: int = 100) -> List[models.CreditRequest]:
     logger.info(f"[list_credit_requests] Listando pedidos de crédito")
     logger.debug(f"[list_credit_requests] Parâmetros: skip={skip}, limit={limit}")
-    result = db.query(models.CreditRequest).offset(skip).limit(limit).all()
+    result = db.query(models.CreditRequest).options(*credit_request_options()).offset(skip).limit(limit).all()
     logger.debug(f"[list_credit_requests] Encontrados {len(result)} pedidos")
     return result
 
 def list_client_requests(db: Session, client_id: int) -> List[models.CreditRequest]:
     logger.info(f"[list_client_requests] Listando pedidos do cliente {client_id}")
     logger.debug(f"[list_client_requests] Parâmetros: client_id={client_id}")
-    result = db.query(models.CreditRequest).filter(models.CreditRequest.client_id == client_id).all()
+    result = (
+        db.query(models.CreditRequest)
+        .options(*credit_request_options())
+        .filter(models.CreditRequest.client_id == client_id)
+        .all()
+    )
     logger.debug(f"[list_client_requests] Encontrados {len(result)} pedidos para o cliente {client_id}")
     return result
 
+async def get_credit_request_async(db: AsyncSession, request_id: int) -> Optional[models.CreditRequest]:
+    logger.info(f"[get_credit_request_async] Buscando pedido de crédito {request_id}")
+    result = await db.execute(
+        select(models.CreditRequest)
+        .options(*credit_request_options())
+        .where(models.CreditRequest.id == request_id)
+    )
+    req = result.scalars().first()
+    logger.debug(f"[get_credit_request_async] Encontrado: {req is not None}")
+    return req
+
+async def list_client_requests_async(db: AsyncSession, client_id: int) -> List[models.CreditRequest]:
+    logger.info(f"[list_client_requests_async] Listando pedidos do cliente {client_id}")
+    result = await db.execute(
+        select(models.CreditRequest)
+        .options(*credit_request_options())
+        .where(models.CreditRequest.client_id == client_id)
+    )
+    requests = result.scalars().all()
+    logger.debug(f"[list_client_requests_async] Encontrados {len(requests)} pedidos para o cliente {client_id}")
+    return requests
+
 def record_history(db: Session, request: models.CreditRequest, status: str):
+    """
+    Adiciona o registro de histórico à sessão; o commit fica com quem chama.
+    """
     logger.info(f"[record_history] Registrando histórico para pedido {request.id}: status={status}")
     logger.debug(f"[record_history] Parâmetros: request_id={request.id}, status={status}")
     hist = models.RequestHistory(request_id=request.id, status=status, timestamp=datetime.now())
     db.add(hist)
-    db.commit()
     logger.debug(f"[record_history] Histórico registrado: {hist}")
 
 def create_credit_request(db: Session, client: models.Client, req_in: schemas.CreditRequestCreate) -> models.CreditRequest:
@@ -73,6 +241,8 @@ def create_credit_request(db: Session, client: models.Client, req_in: schemas.Cr
     db_req = models.CreditRequest(
         client_id=client.id,
         amount=float(req_in.amount),
+        purpose=req_in.purpose,
+        term=req_in.term,
         status=status,
         created_at=now,
         updated_at=now,
@@ -80,35 +250,23 @@ def create_credit_request(db: Session, client: models.Client, req_in: schemas.Cr
         current_process_id=first_process.id,
     )
     db.add(db_req)
+    db.flush()
+    record_history(db, db_req, status)
     db.commit()
     db.refresh(db_req)
     logger.info(f"[create_credit_request] Pedido de crédito {db_req.id} criado para cliente {client.id}")
-    record_history(db, db_req, status)
     logger.debug(f"[create_credit_request] Pedido criado: {db_req}")
     return db_req
 
 def update_request_status(db: Session, request: models.CreditRequest, new_status: str) -> models.CreditRequest:
     logger.info(f"[update_request_status] Atualizando status do pedido {request.id} para {new_status}")
     logger.debug(f"[update_request_status] Parâmetros: request_id={request.id}, new_status={new_status}")
-    request.status = new_status
-    request.updated_at = datetime.now()
-    if new_status == "APPROVED" and request.current_process and request.current_process.next_process_id:
-        logger.debug(f"[update_request_status] Avançando processo de {request.current_process_id} para {request.current_process.next_process_id}")
-        request.current_process_id = request.current_process.next_process_id
-        db.add(request)
-        db.commit()
-        db.refresh(request)  # Ensure relationships are up-to-date
-    elif new_status == "APPROVED":
-        logger.debug(f"[update_request_status] Finalizando processo, não há próximo processo para {request.current_process_id}")
-        request.current_process_id = None
-        db.add(request)
-        db.commit()
-        db.refresh(request)
-    else:
-        db.add(request)
-        db.commit()
-        db.refresh(request)
-    record_history(db, request, new_status)
+    process_id = transition.UNCHANGED
+    if new_status == "APPROVED":
+        # Avança para o próximo processo ou, no último, conclui o fluxo
+        process_id = transition.next_process_id(db, request)
+        logger.debug(f"[update_request_status] Processo de {request.current_process_id} para {process_id}")
+    transition.transition_request(db, request, new_status, process_id=process_id)
     logger.info(f"[update_request_status] Status atualizado para {request.status} no pedido {request.id}")
-    logger.debug(f"[update_request_status] Pedido atualizado: {request}")
     return request
+
@@ -0,0 +1,212 @@
+# Listagem de notificações e contador materializado de não lidas por cliente (notification_counters)
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Iterable, List, Mapping, Optional, Tuple
+from sqlalchemy import Connection, and_, event, func, insert, inspect, not_, or_, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import logging
+
+from bank_credit.app import models
+from bank_credit.app.event_broker import event_broker
+from bank_credit.app.pagination import decode_cursor, encode_cursor
+
+logger = logging.getLogger("bank_credit.views.notification")
+
+NotificationCounter = models.NotificationCounter
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Colunas da listagem resumida (sem o corpo da mensagem)
+SUMMARY_COLUMNS = (
+    models.Notification.id,
+    models.Notification.client_id,
+    models.Notification.subject,
+    models.Notification.read,
+    models.Notification.created_at,
+)
+
+# Colunas devolvidas (RETURNING) pelas inserções em massa para publicar no stream
+EVENT_COLUMNS = (
+    models.Notification.id,
+    models.Notification.client_id,
+    models.Notification.subject,
+    models.Notification.message,
+    models.Notification.read,
+    models.Notification.created_at,
+)
+
+
+async def list_notifications(
+    db: AsyncSession,
+    client_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    unread_only: bool = False,
+    since: Optional[datetime] = None,
+    summary: bool = False,
+) -> Tuple[List, Optional[str]]:
+    """
+    Retorna uma página das notificações do cliente, da mais recente para a mais antiga,
+    e o cursor da próxima página (None se for a última). A paginação é por keyset em
+    (created_at, id), coberta por ix_notifications_client_created. `since` limita às
+    criadas depois do instante informado (sincronização incremental). Com `summary`,
+    lê apenas as colunas de SUMMARY_COLUMNS. Levanta ValueError se o cursor for inválido.
+    """
+    Notification = models.Notification
+    query = select(*SUMMARY_COLUMNS) if summary else select(Notification)
+    query = query.where(Notification.client_id == client_id)
+    if unread_only:
+        query = query.where(not_(Notification.read))
+    if since is not None:
+        if since.tzinfo is not None:
+            # created_at é gravado no horário local, sem fuso
+            since = since.astimezone().replace(tzinfo=None)
+        query = query.where(Notification.created_at > since)
+    if cursor:
+        last_created_at, last_id = decode_cursor(cursor)
+        query = query.where(
+            or_(
+                Notification.created_at < last_created_at,
+                and_(Notification.created_at == last_created_at, Notification.id < last_id),
+            )
+        )
+    query = query.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit + 1)
+    result = await db.execute(query)
+    rows = result.all() if summary else result.scalars().all()
+    next_cursor = encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+    logger.debug(f"[list_notifications] Cliente {client_id}: {len(rows[:limit])} notificações, next_cursor={next_cursor}")
+    return rows[:limit], next_cursor
+
+
+def adjust_unread_counters(conn: Connection, deltas: Mapping[int, int]):
+    """
+    Soma `deltas[client_id]` ao contador de não lidas de cada cliente, na transação de
+    `conn` (o commit fica com quem chama, junto com a alteração das notificações).
+    Uma instrução por valor de delta distinto, em ordem de client_id (evita deadlocks).
+    """
+    by_delta = defaultdict(list)
+    for client_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(client_id)
+    now = datetime.now()
+    dialect = conn.dialect.name
+    for delta, client_ids in by_delta.items():
+        client_ids.sort()
+        if dialect in ("postgresql", "sqlite"):
+            upsert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+            # Sem contador ainda: começa em max(delta, 0); a reconciliação corrige se o cliente já tinha não lidas
+            conn.execute(
+                upsert(NotificationCounter)
+                .values([{"client_id": client_id, "unread": max(delta, 0), "updated_at": now} for client_id in client_ids])
+                .on_conflict_do_update(
+                    index_elements=[NotificationCounter.client_id],
+                    set_={"unread": NotificationCounter.unread + delta, "updated_at": now},
+                )
+            )
+            continue
+        conn.execute(
+            update(NotificationCounter)
+            .where(NotificationCounter.client_id.in_(client_ids))
+            .values(unread=NotificationCounter.unread + delta, updated_at=now)
+        )
+        existing = set(conn.scalars(select(NotificationCounter.client_id).where(NotificationCounter.client_id.in_(client_ids))))
+        missing = [client_id for client_id in client_ids if client_id not in existing]
+        if missing:
+            conn.execute(
+                insert(NotificationCounter),
+                [{"client_id": client_id, "unread": max(delta, 0), "updated_at": now} for client_id in missing],
+            )
+
+def add_unread(db: Session, client_ids: Iterable[int]):
+    """
+    Conta uma notificação não lida nova para cada item de `client_ids` (inserções em massa).
+    """
+    adjust_unread_counters(db.connection(), Counter(client_ids))
+
+def notification_event(notification: models.Notification) -> dict:
+    """
+    Dados do evento `notification` do stream (GET /notifications/stream).
+    """
+    return {
+        "id": notification.id,
+        "subject": notification.subject,
+        "message": notification.message,
+        "read": notification.read,
+        "created_at": notification.created_at,
+    }
+
+def publish_notifications(notifications: Iterable):
+    """
+    Envia cada notificação já gravada (objeto ORM ou linha com EVENT_COLUMNS) às conexões
+    do seu cliente em GET /notifications/stream. Chamar depois do commit.
+    """
+    for notification in notifications:
+        event_broker.publish(notification.client_id, "notification", notification_event(notification))
+
+async def get_unread_count(db: AsyncSession, client_id: int) -> int:
+    """
+    Não lidas do cliente: leitura do contador pela chave primária.
+    """
+    count = await db.scalar(select(NotificationCounter.unread).where(NotificationCounter.client_id == client_id))
+    return max(count or 0, 0)
+
+def reconcile_unread_counters(db: Session) -> int:
+    """
+    Recalcula os contadores a partir das notificações e corrige os que divergem (incluindo
+    clientes sem contador). Retorna quantos contadores foram corrigidos.
+    """
+    Notification = models.Notification
+    actual = (
+        select(Notification.client_id, func.count().label("unread"))
+        .where(not_(Notification.read))
+        .group_by(Notification.client_id)
+        .subquery()
+    )
+    actual_unread = func.coalesce(actual.c.unread, 0)
+    # Uma única consulta (um único snapshot): contadores divergentes e clientes sem contador
+    drifted = union_all(
+        select(NotificationCounter.client_id, actual_unread - NotificationCounter.unread)
+        .outerjoin(actual, actual.c.client_id == NotificationCounter.client_id)
+        .where(actual_unread != NotificationCounter.unread),
+        select(actual.c.client_id, actual.c.unread).where(
+            ~select(NotificationCounter.client_id).where(NotificationCounter.client_id == actual.c.client_id).exists()
+        ),
+    )
+    deltas = dict(db.execute(drifted).all())
+    # Correção relativa (unread + delta): notificações gravadas depois da consulta não se perdem
+    adjust_unread_counters(db.connection(), deltas)
+    db.commit()
+    if deltas:
+        logger.warning(f"[reconcile_unread_counters] {len(deltas)} contadores de não lidas corrigidos")
+    return len(deltas)
+
+
+# Notificações criadas, lidas ou removidas pelo ORM (uma a uma) atualizam o contador na
+# mesma transação. Inserções e UPDATEs em massa não disparam esses eventos e chamam
+# `add_unread`/`adjust_unread_counters` diretamente.
+
+@event.listens_for(models.Notification, "after_insert")
+def _count_inserted_notification(mapper, connection, target):
+    if target.read is False:
+        adjust_unread_counters(connection, {target.client_id: 1})
+
+
+@event.listens_for(models.Notification, "after_update")
+def _count_read_notification(mapper, connection, target):
+    history = inspect(target).attrs.read.history
+    if not history.has_changes():
+        return
+    was_unread = any(value is False for value in history.deleted)
+    is_unread = target.read is False
+    if was_unread != is_unread:
+        adjust_unread_counters(connection, {target.client_id: 1 if is_unread else -1})
+
+
+@event.listens_for(models.Notification, "after_delete")
+def _count_deleted_notification(mapper, connection, target):
+    if target.read is False:
+        adjust_unread_counters(connection, {target.client_id: -1})
@@ -0,0 +1,129 @@
+# Transactional outbox de emails: gravados junto com a mudança que os originou, enviados pelo worker
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence
+import os
+from sqlalchemy import Row, func, select, update
+from sqlalchemy.orm import Session
+import logging
+
+from bank_credit.app import models
+
+logger = logging.getLogger("bank_credit.views.outbox")
+
+# Emails reservados e enviados por conexão SMTP
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+# Tentativas antes de o email ir para DEAD
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+# Espera após a 1ª falha; dobra a cada nova falha até OUTBOX_BACKOFF_MAX_SECONDS
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "30"))
+OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", "3600"))
+# Tempo que um lote fica reservado (SENDING) antes de voltar a ser elegível
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+
+Status = models.EmailOutboxStatus
+
+
+def enqueue_email(db: Session, recipient: str, subject: str, body: str) -> models.EmailOutbox:
+    """
+    Adiciona o email à outbox na sessão atual; o commit fica com quem chama, para que o
+    email só exista se a mudança que o originou também for gravada.
+    """
+    logger.debug(f"[enqueue_email] Email para {recipient}: {subject}")
+    email = models.EmailOutbox(
+        recipient=recipient,
+        subject=subject,
+        body=body,
+        status=Status.PENDING,
+        attempts=0,
+        next_attempt_at=datetime.now(),
+    )
+    db.add(email)
+    return email
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    """
+    Espera antes da próxima tentativa após `attempts` falhas (exponencial, com teto).
+    """
+    return timedelta(seconds=min(OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1), OUTBOX_BACKOFF_MAX_SECONDS))
+
+
+def claim_due_emails(db: Session, now: Optional[datetime] = None, limit: Optional[int] = None) -> List[Row]:
+    """
+    Reserva até `limit` emails elegíveis (PENDING, ou SENDING com a reserva expirada) com um
+    UPDATE ... RETURNING, marcando-os como SENDING até now + OUTBOX_LEASE_SECONDS, e faz o commit.
+    Com vários workers, cada lote é travado com SKIP LOCKED; se o worker cair no meio do envio,
+    o lote volta a ser elegível quando a reserva expira.
+    Retorna linhas (id, recipient, subject, body, attempts).
+    """
+    now = now or datetime.now()
+    EmailOutbox = models.EmailOutbox
+    due_ids = (
+        select(EmailOutbox.id)
+        .where(
+            EmailOutbox.status.in_([Status.PENDING, Status.SENDING]),
+            EmailOutbox.next_attempt_at <= now,
+        )
+        .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+        .limit(limit or OUTBOX_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(due_ids))
+        .values(status=Status.SENDING, next_attempt_at=now + timedelta(seconds=OUTBOX_LEASE_SECONDS))
+        .returning(EmailOutbox.id, EmailOutbox.recipient, EmailOutbox.subject, EmailOutbox.body, EmailOutbox.attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return sorted(claimed, key=lambda email: email.id)
+
+
+def record_delivery(db: Session, emails: Sequence[Row], errors: Sequence[Optional[Exception]], now: Optional[datetime] = None):
+    """
+    Grava o resultado do envio de um lote (UPDATE em massa por id, um commit): enviados viram SENT;
+    os que falharam são reagendados com backoff ou, após OUTBOX_MAX_ATTEMPTS tentativas, vão para DEAD.
+    """
+    now = now or datetime.now()
+    changes = []
+    for email, error in zip(emails, errors):
+        attempts = email.attempts + 1
+        if error is None:
+            changes.append({"id": email.id, "status": Status.SENT, "attempts": attempts, "sent_at": now, "last_error": None})
+        elif attempts >= OUTBOX_MAX_ATTEMPTS:
+            changes.append({"id": email.id, "status": Status.DEAD, "attempts": attempts, "last_error": str(error)})
+            logger.error(f"[record_delivery] Email {email.id} para {email.recipient} descartado após {attempts} tentativas: {error}")
+        else:
+            changes.append({
+                "id": email.id,
+                "status": Status.PENDING,
+                "attempts": attempts,
+                "next_attempt_at": now + backoff_delay(attempts),
+                "last_error": str(error),
+            })
+            logger.warning(f"[record_delivery] Falha ao enviar email {email.id} (tentativa {attempts}): {error}")
+    if changes:
+        db.execute(update(models.EmailOutbox), changes)
+    db.commit()
+
+
+def next_email_due(db: Session) -> Optional[datetime]:
+    """
+    Momento em que o próximo email fica elegível (None se a outbox estiver vazia).
+    """
+    EmailOutbox = models.EmailOutbox
+    return db.scalar(
+        select(func.min(EmailOutbox.next_attempt_at)).where(EmailOutbox.status.in_([Status.PENDING, Status.SENDING]))
+    )
+
+
+def count_by_status(db: Session) -> dict:
+    """
+    Quantidade de emails na outbox por status.
+    """
+    EmailOutbox = models.EmailOutbox
+    counts = {status.value: 0 for status in Status}
+    for status, count in db.execute(select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)):
+        counts[str(status)] = count
+    return counts
+
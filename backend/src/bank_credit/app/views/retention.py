@@ -0,0 +1,137 @@
+# Retenção: move linhas antigas das tabelas quentes para as tabelas de arquivo
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+import os
+from sqlalchemy import ColumnElement, delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+import logging
+
+from bank_credit.app import models
+
+logger = logging.getLogger("bank_credit.views.retention")
+
+# Notificações lidas mais antigas que isso são arquivadas (0 desativa)
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "90"))
+# Histórico de pedidos já encerrados mais antigo que isso é arquivado (0 desativa)
+REQUEST_HISTORY_RETENTION_DAYS = int(os.getenv("REQUEST_HISTORY_RETENTION_DAYS", "365"))
+# Linhas movidas por transação
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+
+CLOSED_STATUSES = [
+    models.RequestStatus.FINALIZED,
+    models.RequestStatus.REJECTED,
+    models.RequestStatus.REJECTED_TIMEOUT,
+    models.RequestStatus.REJECTED_NO_SECTOR,
+]
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    table: str
+    model: type
+    archive_model: type
+    days: int
+    # Condição das linhas arquivadas, dado o instante de corte (agora - days)
+    eligible: Callable[[datetime], ColumnElement]
+
+
+def _read_notification(cutoff: datetime) -> ColumnElement:
+    # Só as lidas: o contador de não lidas (notification_counters) não muda
+    Notification = models.Notification
+    return Notification.read.is_(True) & (Notification.created_at < cutoff)
+
+
+def _closed_request_history(cutoff: datetime) -> ColumnElement:
+    # Pedidos em andamento mantêm o histórico inteiro na tabela quente
+    RequestHistory = models.RequestHistory
+    closed = select(models.CreditRequest.id).where(models.CreditRequest.status.in_(CLOSED_STATUSES))
+    return (RequestHistory.timestamp < cutoff) & RequestHistory.request_id.in_(closed)
+
+
+def default_policies(
+    notification_days: int = NOTIFICATION_RETENTION_DAYS,
+    request_history_days: int = REQUEST_HISTORY_RETENTION_DAYS,
+) -> List[RetentionPolicy]:
+    """
+    Políticas configuradas; tabelas com retenção 0 ficam de fora.
+    """
+    policies = [
+        RetentionPolicy("notifications", models.Notification, models.NotificationArchive, notification_days, _read_notification),
+        RetentionPolicy(
+            "request_history",
+            models.RequestHistory,
+            models.RequestHistoryArchive,
+            request_history_days,
+            _closed_request_history,
+        ),
+    ]
+    return [policy for policy in policies if policy.days > 0]
+
+
+def count_eligible(db: Session, policy: RetentionPolicy, now: Optional[datetime] = None) -> int:
+    """
+    Quantas linhas a política arquivaria agora.
+    """
+    cutoff = (now or datetime.now()) - timedelta(days=policy.days)
+    return db.scalar(select(func.count()).select_from(policy.model).where(policy.eligible(cutoff)))
+
+
+def archive_policy(
+    db: Session,
+    policy: RetentionPolicy,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> int:
+    """
+    Copia as linhas elegíveis para a tabela de arquivo e as remove da tabela quente, em
+    lotes de `batch_size` (uma transação por lote, em ordem de id, retomando depois do
+    último id do lote anterior). Retorna quantas linhas foram arquivadas.
+    """
+    now = now or datetime.now()
+    cutoff = now - timedelta(days=policy.days)
+    model, archive = policy.model, policy.archive_model
+    columns = [column.name for column in model.__table__.columns]
+    archived = batches = 0
+    last_id = 0
+    while max_batches is None or batches < max_batches:
+        ids = db.scalars(
+            select(model.id).where(policy.eligible(cutoff), model.id > last_id).order_by(model.id).limit(batch_size)
+        ).all()
+        if not ids:
+            break
+        db.execute(
+            insert(archive).from_select(
+                columns + ["archived_at"],
+                select(*model.__table__.columns, literal(now)).where(model.id.in_(ids)),
+            )
+        )
+        # DELETE em massa: não passa pelos eventos do ORM (as notificações arquivadas já estão lidas)
+        db.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+        db.commit()
+        archived += len(ids)
+        batches += 1
+        last_id = ids[-1]
+        logger.debug(f"[archive_policy] {policy.table}: lote de {len(ids)} linhas arquivado (até o id {last_id})")
+        if len(ids) < batch_size:
+            break
+    logger.info(f"[archive_policy] {policy.table}: {archived} linhas anteriores a {cutoff:%Y-%m-%d} arquivadas em {batches} lotes")
+    return archived
+
+
+def run_retention(
+    db: Session,
+    policies: Optional[Iterable[RetentionPolicy]] = None,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> Dict[str, int]:
+    """
+    Aplica cada política (padrão: `default_policies()`). Retorna as linhas arquivadas por tabela.
+    """
+    policies = default_policies() if policies is None else policies
+    return {
+        policy.table: archive_policy(db, policy, batch_size=batch_size, max_batches=max_batches, now=now)
+        for policy in policies
+    }
@@ -1,47 +1,142 @@
 # Routing / Graph-based process flow (migrated from crud.py)
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import os
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from bank_credit.app import models, utils
-from .credit_request import update_request_status, record_history
+from .credit_request import update_request_status
+from .transition import transition_request
 import logging
 
 logger = logging.getLogger("bank_credit.views.routing")
 
 THRESHOLD_CREDIT_LIMIT_DAYS = timedelta(days=45)
 
-def route_credit_request(db: Session, request: models.CreditRequest):
-    logger.info(f"Roteando pedido {request.id} (processo atual: {request.current_process_id})")
+# Pedidos por commit no roteamento em lote
+ROUTE_BATCH_CHUNK_SIZE = int(os.getenv("ROUTE_BATCH_CHUNK_SIZE", "500"))
+MAX_ROUTE_BATCH_SIZE = 10000
+
+@dataclass(frozen=True)
+class RouteDecision:
+    outcome: str  # "routed", "finalized" ou "rejected"
+    status: models.RequestStatus
+    process_id: Optional[int]
+    sector_id: Optional[int] = None
+    sla_days: Optional[int] = None
+
+
+def plan_route(graph: utils.ProcessGraph, request: models.CreditRequest, now: datetime) -> RouteDecision:
+    """
+    Decide o próximo passo do pedido a partir da fotografia do grafo, sem tocar no banco.
+    """
     # Recusa automática se o tempo de requisição exceder o threshold
-    if datetime.now() - request.created_at >= THRESHOLD_CREDIT_LIMIT_DAYS:
+    if now - request.created_at >= THRESHOLD_CREDIT_LIMIT_DAYS:
         logger.warning(f"Pedido {request.id} excedeu o tempo limite de {THRESHOLD_CREDIT_LIMIT_DAYS.days} dias. Recusando automaticamente.")
-        return update_request_status(db, request, "REJECTED_TIMEOUT")
-    G = utils.build_process_graph(db)
+        return RouteDecision("rejected", models.RequestStatus.REJECTED_TIMEOUT, request.current_process_id)
     if request.current_process_id is None:
         logger.debug("Processo inicial, buscando start node")
-        start_nodes = [n for n, d in G.in_degree() if d == 0]
-        next_proc = db.query(models.Process).get(start_nodes[0])
+        next_proc = graph.processes[graph.start_nodes[0]]
     else:
         logger.debug(f"Buscando sucessores do processo {request.current_process_id}")
-        successors = list(G.successors(request.current_process_id))
+        successors = graph.successors(request.current_process_id)
         if not successors:
             logger.info(f"Pedido {request.id} chegou ao final do fluxo")
-            return update_request_status(db, request, "FINALIZED")
-        next_proc = db.query(models.Process).get(successors[0])
-    sectors = next_proc.sectors
+            return RouteDecision("finalized", models.RequestStatus.FINALIZED, request.current_process_id)
+        next_proc = graph.processes[successors[0]]
+    sectors = graph.sectors[next_proc.id]
     # Agora o limite é o valor mínimo necessário
     eligible_sectors = [s for s in sectors if request.amount >= s.limit]
     logger.debug(f"Setores elegíveis: {eligible_sectors}")
     if not eligible_sectors:
         logger.warning(f"Nenhum setor elegível para o pedido {request.id}")
-        return update_request_status(db, request, "REJECTED_NO_SECTOR")
+        return RouteDecision("rejected", models.RequestStatus.REJECTED_NO_SECTOR, request.current_process_id)
     target_sector = eligible_sectors[0]
     logger.info(f"Avançando pedido {request.id} para processo {next_proc.id} e setor {target_sector.name}")
-    request.current_process_id = next_proc.id
-    request.status = f"PENDING_{next_proc.name.upper()}_{target_sector.name.upper()}"
-    request.updated_at = datetime.now()
-    db.add(request)
-    db.commit()
-    record_history(db, request, request.status)
-    utils.schedule_sla_alert(request.id, target_sector.sla_days)
+    return RouteDecision(
+        "routed",
+        models.RequestStatus.PENDING_SECTOR,
+        next_proc.id,
+        sector_id=target_sector.id,
+        sla_days=target_sector.sla_days,
+    )
+
+
+def route_credit_request(db: Session, request: models.CreditRequest):
+    logger.info(f"Roteando pedido {request.id} (processo atual: {request.current_process_id})")
+    decision = plan_route(utils.get_process_graph(db), request, datetime.now())
+    if decision.outcome != "routed":
+        return update_request_status(db, request, decision.status)
+    # Prazo de SLA, pedido e histórico gravados no mesmo commit
+    utils.schedule_sla_alert(db, request.id, decision.status, decision.sla_days)
+    transition_request(db, request, decision.status, process_id=decision.process_id, sector_id=decision.sector_id)
     logger.info(f"Pedido {request.id} roteado com sucesso")
     return request
+
+
+def route_credit_requests(db: Session, request_ids: List[int], chunk_size: Optional[int] = None) -> List[dict]:
+    """
+    Roteia vários pedidos usando uma única fotografia do grafo. Os pedidos são
+    processados em lotes de `chunk_size`: um SELECT, INSERTs em massa do
+    histórico e dos prazos de SLA e um commit por lote. Retorna o resultado de cada pedido, na ordem recebida.
+    """
+    request_ids = list(dict.fromkeys(request_ids))
+    chunk_size = chunk_size or ROUTE_BATCH_CHUNK_SIZE
+    logger.info(f"Roteando {len(request_ids)} pedidos em lotes de {chunk_size}")
+    graph = utils.get_process_graph(db)
+    outcomes = {}
+    for start in range(0, len(request_ids), chunk_size):
+        outcomes.update(_route_chunk(db, graph, request_ids[start:start + chunk_size]))
+    return [outcomes[request_id] for request_id in request_ids]
+
+
+def _route_chunk(db: Session, graph: utils.ProcessGraph, request_ids: List[int]) -> Dict[int, dict]:
+    now = datetime.now()
+    requests = {
+        req.id: req
+        for req in db.query(models.CreditRequest).filter(models.CreditRequest.id.in_(request_ids))
+    }
+    outcomes = {}
+    history = []
+    alerts = []
+    for request_id in request_ids:
+        request = requests.get(request_id)
+        if request is None:
+            outcomes[request_id] = {"request_id": request_id, "outcome": "not_found"}
+            continue
+        try:
+            decision = plan_route(graph, request, now)
+        except Exception as e:
+            logger.error(f"Erro ao rotear pedido {request_id}: {e}")
+            outcomes[request_id] = {"request_id": request_id, "outcome": "error", "detail": str(e)}
+            continue
+        request.status = decision.status
+        request.current_process_id = decision.process_id
+        request.current_sector_id = decision.sector_id
+        request.updated_at = now
+        history.append({"request_id": request_id, "status": decision.status, "timestamp": now})
+        if decision.sla_days is not None:
+            alerts.append((request_id, decision.status, decision.sla_days))
+        outcomes[request_id] = {
+            "request_id": request_id,
+            "outcome": decision.outcome,
+            "status": decision.status,
+            "current_process_id": decision.process_id,
+            "current_sector_id": decision.sector_id,
+        }
+    try:
+        if history:
+            db.execute(insert(models.RequestHistory), history)
+        utils.schedule_sla_alerts(db, alerts, now)
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Erro ao gravar lote de {len(request_ids)} pedidos: {e}")
+        for request_id, outcome in outcomes.items():
+            if outcome["outcome"] != "not_found":
+                outcomes[request_id] = {"request_id": request_id, "outcome": "error", "detail": "Falha ao gravar o lote"}
+        return outcomes
+    logger.info(f"Lote roteado: {len(history)} de {len(request_ids)} pedidos atualizados")
+    return outcomes
@@ -1,63 +1,259 @@
 # SLA & Overdue handling (migrated from crud.py)
 from datetime import datetime, timedelta
-from sqlalchemy import and_
+from typing import Optional
+import os
+import threading
+from sqlalchemy import DateTime, String, cast, false, func, insert, literal, select, update
 from sqlalchemy.orm import Session
 import logging
 
 from bank_credit.app import models
-from bank_credit.app.utils import send_notification
-from .credit_request import update_request_status
+from bank_credit.app.views import notification as notification_view
 
 logger = logging.getLogger("bank_credit.views.sla")
 
-def check_overdue_requests(db: Session):
-    logger.info("Verificando pedidos vencidos para SLA...")
-    cutoff = datetime.now() - timedelta(days=20)
-    overdue = (
-        db.query(models.CreditRequest)
-        .filter(
-            and_(
-                models.CreditRequest.created_at < cutoff,
-                models.CreditRequest.status.notin_(["FINALIZED", "REJECTED_NO_SECTOR"]),
-            )
-        )
-        .all()
+# Prazos vencidos processados por transação pelo agendador
+SLA_ALERT_BATCH_SIZE = int(os.getenv("SLA_ALERT_BATCH_SIZE", "500"))
+
+# Pedidos abertos há mais que isso são finalizados automaticamente
+OVERDUE_AFTER = timedelta(days=20)
+OVERDUE_EXEMPT_STATUSES = [models.RequestStatus.FINALIZED, models.RequestStatus.REJECTED_NO_SECTOR]
+# Pedidos vencidos finalizados por transação
+OVERDUE_BATCH_SIZE = int(os.getenv("OVERDUE_BATCH_SIZE", "500"))
+
+class OverdueMetrics:
+    """
+    Progresso do finalizador de pedidos vencidos (exposto em GET /metrics/sla).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.runs = 0
+            self.chunks = 0
+            self.finalized_total = 0
+            self.running = False
+            self.last_run_started_at: Optional[datetime] = None
+            self.last_run_finished_at: Optional[datetime] = None
+            self.last_run_finalized = 0
+            self.last_run_complete = True
+            self.last_error: Optional[str] = None
+
+    def start_run(self, now: datetime):
+        with self._lock:
+            self.runs += 1
+            self.running = True
+            self.last_run_started_at = now
+            self.last_run_finalized = 0
+            self.last_error = None
+
+    def record_chunk(self, finalized: int):
+        with self._lock:
+            self.chunks += 1
+            self.finalized_total += finalized
+            self.last_run_finalized += finalized
+
+    def finish_run(self, complete: bool, error: Optional[str] = None):
+        with self._lock:
+            self.running = False
+            self.last_run_finished_at = datetime.now()
+            self.last_run_complete = complete
+            self.last_error = error
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "chunks": self.chunks,
+                "finalized_total": self.finalized_total,
+                "running": self.running,
+                "last_run_started_at": self.last_run_started_at,
+                "last_run_finished_at": self.last_run_finished_at,
+                "last_run_finalized": self.last_run_finalized,
+                "last_run_complete": self.last_run_complete,
+                "last_error": self.last_error,
+            }
+
+
+overdue_metrics = OverdueMetrics()
+
+
+def _finalize_overdue_chunk(db: Session, cutoff: datetime, now: datetime, limit: int) -> int:
+    """
+    Finaliza até `limit` pedidos vencidos em uma transação: UPDATE ... RETURNING,
+    INSERT em massa do histórico e das notificações e um commit.
+    """
+    CreditRequest = models.CreditRequest
+    overdue_ids = (
+        select(CreditRequest.id)
+        .where(CreditRequest.created_at < cutoff, CreditRequest.status.notin_(OVERDUE_EXEMPT_STATUSES))
+        .order_by(CreditRequest.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
     )
-    logger.debug(f"Pedidos vencidos encontrados: {len(overdue)}")
-    for req in overdue:
-        logger.info(f"Finalizando pedido {req.id} por prazo excedido")
-        update_request_status(db, req, "FINALIZED")
-        send_notification(
-            client_id=req.client_id,
-            subject="Pedido finalizado por prazo excedido",
-            message="Seu pedido foi finalizado automaticamente após 20 dias sem conclusão.",
+    finalized = db.execute(
+        update(CreditRequest)
+        .where(CreditRequest.id.in_(overdue_ids))
+        .values(status=models.RequestStatus.FINALIZED, current_sector_id=None, updated_at=now)
+        .returning(CreditRequest.id, CreditRequest.client_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if finalized:
+        db.execute(
+            insert(models.RequestHistory),
+            [{"request_id": request_id, "status": models.RequestStatus.FINALIZED, "timestamp": now} for request_id, _ in finalized],
         )
+        notifications = db.execute(
+            insert(models.Notification).returning(*notification_view.EVENT_COLUMNS),
+            [
+                {
+                    "client_id": client_id,
+                    "subject": "Pedido finalizado por prazo excedido",
+                    "message": f"Seu pedido foi finalizado automaticamente após {OVERDUE_AFTER.days} dias sem conclusão.",
+                    "read": False,
+                    "created_at": now,
+                }
+                for _, client_id in finalized
+            ],
+        ).all()
+        notification_view.add_unread(db, [client_id for _, client_id in finalized])
+    db.commit()
+    if finalized:
+        notification_view.publish_notifications(notifications)
+    return len(finalized)
 
-def check_sla_alerts(db: Session):
-    logger.info("Verificando alertas de SLA próximos do vencimento...")
+def check_overdue_requests(db: Session, batch_size: Optional[int] = None, max_chunks: Optional[int] = None) -> int:
+    """
+    Finaliza os pedidos abertos há mais de OVERDUE_AFTER, em lotes de `batch_size`
+    com um commit por lote. Cada lote já finalizado sai do filtro, então uma execução
+    interrompida (ou limitada por `max_chunks`) continua de onde parou na próxima chamada.
+    Retorna quantos pedidos foram finalizados.
+    """
+    logger.info("Verificando pedidos vencidos para SLA...")
+    batch_size = batch_size or OVERDUE_BATCH_SIZE
     now = datetime.now()
-    requests = (
-        db.query(models.CreditRequest)
-        .filter(
-            models.CreditRequest.current_process_id.isnot(None),
-            models.CreditRequest.status.like("PENDING_%"),
+    cutoff = now - OVERDUE_AFTER
+    overdue_metrics.start_run(now)
+    total = 0
+    chunks = 0
+    try:
+        while max_chunks is None or chunks < max_chunks:
+            finalized = _finalize_overdue_chunk(db, cutoff, now, batch_size)
+            chunks += 1
+            total += finalized
+            overdue_metrics.record_chunk(finalized)
+            logger.debug(f"Lote {chunks}: {finalized} pedidos finalizados por prazo excedido")
+            if finalized < batch_size:
+                overdue_metrics.finish_run(complete=True)
+                break
+        else:
+            overdue_metrics.finish_run(complete=False)
+    except Exception as e:
+        db.rollback()
+        overdue_metrics.finish_run(complete=False, error=str(e))
+        logger.error(f"Erro ao finalizar pedidos vencidos: {e}")
+        raise
+    logger.info(f"Pedidos finalizados por prazo excedido: {total}")
+    return total
+
+def get_sla_metrics() -> dict:
+    return {"overdue": overdue_metrics.snapshot()}
+
+def _add_days(db: Session, moment, days):
+    """
+    Expressão SQL para `moment + days dias`, calculada no banco.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return func.datetime(moment, cast(days, String) + " days", type_=DateTime)
+    return moment + func.make_interval(0, 0, 0, days)
+
+def check_sla_alerts(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Alerta os clientes cujos pedidos vencem o SLA do setor atual nas próximas 24h.
+    Uma única instrução INSERT ... SELECT: para cada setor, os pedidos PENDING_SECTOR
+    com updated_at em (agora - sla, agora - sla + 1 dia] são lidos por intervalo no
+    índice (status, current_sector_id, updated_at) e as notificações inseridas em massa.
+    Retorna quantos alertas foram criados.
+    """
+    logger.info("Verificando alertas de SLA próximos do vencimento...")
+    now = now or datetime.now()
+    CreditRequest, Sector = models.CreditRequest, models.Sector
+    alerts = (
+        select(
+            CreditRequest.client_id,
+            literal("Alerta de SLA próximo do vencimento"),
+            literal("Seu pedido #") + cast(CreditRequest.id, String) + " no setor " + Sector.name + " vencerá o SLA em breve.",
+            false(),
+            literal(now, DateTime),
+        )
+        .select_from(Sector)
+        .join(CreditRequest, CreditRequest.current_sector_id == Sector.id)
+        .where(
+            CreditRequest.status == models.RequestStatus.PENDING_SECTOR,
+            CreditRequest.updated_at > _add_days(db, literal(now, DateTime), -Sector.sla_days),
+            CreditRequest.updated_at <= _add_days(db, literal(now + timedelta(days=1), DateTime), -Sector.sla_days),
         )
+    )
+    notifications = db.execute(
+        insert(models.Notification)
+        .from_select(["client_id", "subject", "message", "read", "created_at"], alerts)
+        .returning(*notification_view.EVENT_COLUMNS)
+    ).all()
+    notification_view.add_unread(db, [notification.client_id for notification in notifications])
+    db.commit()
+    notification_view.publish_notifications(notifications)
+    logger.info(f"Alertas de SLA enviados: {len(notifications)}")
+    return len(notifications)
+
+def next_sla_deadline(db: Session) -> Optional[datetime]:
+    """
+    Próximo prazo de SLA ainda não disparado (usa o índice ix_sla_deadlines_pending).
+    """
+    return (
+        db.query(func.min(models.SlaDeadline.due_at))
+        .filter(models.SlaDeadline.fired_at.is_(None))
+        .scalar()
+    )
+
+def fire_due_sla_alerts(db: Session, now: Optional[datetime] = None, limit: int = SLA_ALERT_BATCH_SIZE) -> int:
+    """
+    Dispara até `limit` alertas de SLA vencidos em uma transação: uma consulta pelos
+    prazos vencidos, um INSERT em massa das notificações e um UPDATE marcando os prazos.
+    Pedidos que já mudaram de status desde o agendamento não geram alerta.
+    Retorna quantos prazos foram processados.
+    """
+    now = now or datetime.now()
+    Deadline = models.SlaDeadline
+    due = (
+        db.query(Deadline.id, Deadline.request_id, Deadline.status, Deadline.sla_days, models.CreditRequest.client_id, models.CreditRequest.status)
+        .join(models.CreditRequest, models.CreditRequest.id == Deadline.request_id)
+        .filter(Deadline.fired_at.is_(None), Deadline.due_at <= now)
+        .order_by(Deadline.due_at)
+        .limit(limit)
+        .with_for_update(of=Deadline, skip_locked=True)
         .all()
     )
-    logger.debug(f"Pedidos em andamento: {len(requests)}")
-    for req in requests:
-        proc = db.query(models.Process).get(req.current_process_id)
-        parts = req.status.split("_")
-        sector_name = parts[-1]
-        sector = db.query(models.Sector).filter(models.Sector.name == sector_name).first()
-        if not sector:
-            logger.warning(f"Setor {sector_name} não encontrado para pedido {req.id}")
-            continue
-        sla_deadline = req.updated_at + timedelta(days=sector.sla_days)
-        if now + timedelta(days=1) >= sla_deadline and now < sla_deadline:
-            logger.info(f"Enviando alerta de SLA para pedido {req.id} no setor {sector.name}")
-            send_notification(
-                client_id=req.client_id,
-                subject="Alerta de SLA próximo do vencimento",
-                message=f"Seu pedido #{req.id} no setor {sector.name} vencerá o SLA em breve.",
-            )
+    if not due:
+        return 0
+    notifications = [
+        {
+            "client_id": client_id,
+            "subject": "Alerta de SLA ultrapassado",
+            "message": f"Seu pedido #{request_id} ultrapassou o SLA de {sla_days} dias no setor.",
+            "read": False,
+            "created_at": now,
+        }
+        for _, request_id, status, sla_days, client_id, current_status in due
+        if current_status == status
+    ]
+    logger.info(f"Disparando {len(notifications)} alertas de SLA ({len(due)} prazos vencidos)")
+    if notifications:
+        notifications = db.execute(insert(models.Notification).returning(*notification_view.EVENT_COLUMNS), notifications).all()
+        notification_view.add_unread(db, [notification.client_id for notification in notifications])
+    db.execute(update(Deadline).where(Deadline.id.in_([row[0] for row in due])).values(fired_at=now))
+    db.commit()
+    notification_view.publish_notifications(notifications)
+    return len(due)
@@ -0,0 +1,76 @@
+# Status transitions: pedido, histórico e notificação em uma única transação
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy.orm import Session
+import logging
+
+from bank_credit.app import models, utils
+from bank_credit.app.views import notification as notification_view
+
+logger = logging.getLogger("bank_credit.views.transition")
+
+# Marca "não alterar" para o ponteiro de processo
+UNCHANGED = object()
+
+
+def next_process_id(db: Session, request: models.CreditRequest) -> Optional[int]:
+    """
+    Próximo processo do pedido pelo grafo em cache (None se estiver no último ou já finalizado).
+    """
+    if request.current_process_id is None:
+        return None
+    process = utils.get_process_graph(db).processes.get(request.current_process_id)
+    return process.next_process_id if process else None
+
+
+def resolve_requested_status(db: Session, request: models.CreditRequest, requested_status: str) -> Tuple[str, object]:
+    """
+    Traduz o status pedido no PATCH /requests/{id}/status em (status final, novo processo).
+    Aprovar avança para o próximo processo (status PENDING) ou conclui o pedido no último.
+    """
+    if requested_status == models.RequestStatus.APPROVED:
+        if request.current_process_id is None:
+            logger.debug(f"Pedido {request.id} já finalizado")
+            return request.status, UNCHANGED
+        next_id = next_process_id(db, request)
+        if next_id is not None:
+            logger.debug(f"Avançando processo de {request.current_process_id} para {next_id}")
+            return models.RequestStatus.PENDING, next_id
+        logger.debug(f"Finalizando processo, não há próximo processo para {request.current_process_id}")
+        return models.RequestStatus.APPROVED, None
+    return requested_status, UNCHANGED
+
+
+def transition_request(
+    db: Session,
+    request: models.CreditRequest,
+    new_status: str,
+    process_id=UNCHANGED,
+    sector_id: Optional[int] = None,
+    reason: Optional[str] = None,
+    notification: Optional[Tuple[str, str]] = None,
+) -> models.CreditRequest:
+    """
+    Aplica a mudança de status do pedido, o registro no histórico e, se informada,
+    a notificação (assunto, mensagem) ao cliente com um único flush e um único commit.
+    Depois do commit, a notificação vai para o stream do cliente. Sem `sector_id`, o
+    pedido sai da fila do setor.
+    """
+    logger.info(f"[transition_request] Pedido {request.id}: {request.status} -> {new_status}")
+    now = datetime.now()
+    request.status = new_status
+    request.updated_at = now
+    request.current_sector_id = sector_id
+    if process_id is not UNCHANGED:
+        request.current_process_id = process_id
+    db.add(request)
+    db.add(models.RequestHistory(request_id=request.id, status=new_status, timestamp=now, reason=reason))
+    notifications = []
+    if notification:
+        subject, message = notification
+        notifications.append(models.Notification(client_id=request.client_id, subject=subject, message=message, read=False, created_at=now))
+        db.add_all(notifications)
+    db.commit()
+    notification_view.publish_notifications(notifications)
+    logger.debug(f"[transition_request] Pedido {request.id} atualizado para {new_status}")
+    return request
@@ -1,20 +1,24 @@
 # Utility wrappers for endpoints (migrated from crud.py)
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import timedelta
 import networkx as nx
 from sqlalchemy.orm import Session
 from bank_credit.app import models, schemas
-from bank_credit.app.utils import build_process_graph
+from bank_credit.app.utils import ProcessGraph, get_process_graph
 import logging
 
 logger = logging.getLogger("bank_credit.views.utils")
 
 def get_process_graph_data(db: Session) -> nx.DiGraph:
     logger.debug("Obtendo grafo de processos")
-    G = build_process_graph(db)
+    G = get_process_graph(db).graph
     logger.debug(f"Grafo obtido: {G}")
     return G
 
+def get_process_graph_snapshot(db: Session) -> ProcessGraph:
+    logger.debug("Obtendo fotografia do grafo de processos (processos + setores)")
+    return get_process_graph(db)
+
 def get_request_status(db: Session, request_id: int) -> Optional[str]:
     logger.debug(f"Obtendo status do pedido {request_id}")
     from .credit_request import get_credit_request
@@ -24,20 +28,29 @@ def get_request_status(db: Session, request_id: int) -> Optional[str]:
 
 def get_estimated_time_to_completion(db: Session, request_id: int) -> Optional[timedelta]:
     logger.debug(f"Estimando tempo para conclusão do pedido {request_id}")
-    from .credit_request import get_credit_request
-    req = get_credit_request(db, request_id)
-    if not req or req.current_process_id is None:
-        logger.debug("Pedido não encontrado ou já finalizado")
-        return None
-    G = build_process_graph(db)
-    path = nx.shortest_path(G, source=req.current_process_id, target=None)  # may need custom logic
-    total = timedelta()
-    for pid in path:
-        proc = db.query(models.Process).get(pid)
-        sla = min([s.sla_days for s in proc.sectors] or [0])
-        total += timedelta(days=sla)
-    logger.debug(f"Tempo estimado: {total}")
-    return total
+    return get_estimated_times_to_completion(db, [request_id]).get(request_id)
+
+def get_estimated_times_to_completion(
+    db: Session, request_ids: List[int], client_id: Optional[int] = None
+) -> Dict[int, Optional[timedelta]]:
+    """
+    Estima o tempo restante de vários pedidos com uma única consulta,
+    consultando a tabela de SLA restante do grafo em cache.
+    Pedidos inexistentes (ou de outro cliente, se `client_id` for informado) ficam
+    fora do resultado; pedidos finalizados mapeiam para None.
+    """
+    logger.debug(f"Estimando tempo para conclusão de {len(request_ids)} pedidos")
+    if not request_ids:
+        return {}
+    graph = get_process_graph(db)
+    rows = db.query(models.CreditRequest.id, models.CreditRequest.current_process_id).filter(
+        models.CreditRequest.id.in_(set(request_ids))
+    )
+    if client_id is not None:
+        rows = rows.filter(models.CreditRequest.client_id == client_id)
+    etas = {request_id: graph.remaining_time(process_id) for request_id, process_id in rows}
+    logger.debug(f"Tempos estimados: {etas}")
+    return etas
 
 def get_request_history(db: Session, request_id: int) -> List[schemas.RequestHistory]:
     logger.debug(f"Obtendo histórico do pedido {request_id}")
@@ -0,0 +1,44 @@
+"""
+Arquiva linhas antigas de `notifications` e `request_history` nas tabelas de arquivo
+(notifications_archive e request_history_archive), conforme as políticas de retenção de
+views/retention.py. Pensado para rodar periodicamente (cron) fora do horário de pico.
+
+Uso:
+    archive --dry-run
+    archive --table notifications --notification-days 30 --batch-size 500
+"""
+import logging
+from argparse import ArgumentParser
+
+from bank_credit.app.database import SessionLocal
+from bank_credit.app.views import retention as retention_view
+
+logger = logging.getLogger("bank_credit.scripts.archive")
+
+
+def main(argv=None):
+    parser = ArgumentParser(description="Arquivamento de notificações e histórico de pedidos antigos")
+    parser.add_argument("--table", action="append", choices=["notifications", "request_history"], help="Tabela a arquivar (padrão: todas)")
+    parser.add_argument("--notification-days", type=int, default=retention_view.NOTIFICATION_RETENTION_DAYS, help="Idade mínima das notificações lidas arquivadas (0 desativa)")
+    parser.add_argument("--history-days", type=int, default=retention_view.REQUEST_HISTORY_RETENTION_DAYS, help="Idade mínima do histórico de pedidos encerrados arquivado (0 desativa)")
+    parser.add_argument("--batch-size", type=int, default=retention_view.RETENTION_BATCH_SIZE, help="Linhas movidas por transação")
+    parser.add_argument("--max-batches", type=int, default=None, help="Para depois de N lotes por tabela (a próxima execução continua)")
+    parser.add_argument("--dry-run", action="store_true", help="Só conta as linhas que seriam arquivadas")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s :: %(name)s :: %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+    policies = [
+        policy
+        for policy in retention_view.default_policies(args.notification_days, args.history_days)
+        if not args.table or policy.table in args.table
+    ]
+    with SessionLocal() as db:
+        if args.dry_run:
+            result = {policy.table: retention_view.count_eligible(db, policy) for policy in policies}
+        else:
+            result = retention_view.run_retention(db, policies, batch_size=args.batch_size, max_batches=args.max_batches)
+    for table, rows in result.items():
+        logger.info(f"{table}: {rows} linhas {'elegíveis' if args.dry_run else 'arquivadas'}")
+
+
+if __name__ == "__main__":
+    main()
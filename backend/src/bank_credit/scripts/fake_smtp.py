@@ -0,0 +1,180 @@
+"""
+Servidor SMTP falso para desenvolvimento, testes e benchmarks de envio de email.
+
+Aceita EHLO/HELO, AUTH (PLAIN e LOGIN, qualquer credencial), MAIL, RCPT, DATA, RSET,
+NOOP e QUIT, guarda as mensagens recebidas em memória e pode simular a latência de um
+servidor real (handshake e DATA) e destinatários recusados. Sem TLS: configure o cliente
+com MAIL_STARTTLS=false e MAIL_SSL_TLS=false.
+
+Uso:
+    fake-smtp --port 1025 --latency-ms 20
+"""
+import asyncio
+import logging
+import threading
+import time
+from argparse import ArgumentParser
+from dataclasses import dataclass, field
+from typing import List, Optional, Set
+
+logger = logging.getLogger("bank_credit.scripts.fake_smtp")
+
+
+@dataclass
+class ReceivedMessage:
+    mail_from: str
+    recipients: List[str]
+    data: bytes
+
+
+@dataclass
+class FakeSmtpServer:
+    host: str = "127.0.0.1"
+    port: int = 0
+    # Atraso simulado ao abrir a sessão (conexão + EHLO + AUTH) e a cada DATA
+    connect_latency: float = 0.0
+    data_latency: float = 0.0
+    # Destinatários respondidos com 550 no RCPT TO
+    reject: Set[str] = field(default_factory=set)
+    messages: List[ReceivedMessage] = field(default_factory=list)
+    connections: int = 0
+    # Conexões já encerradas (QUIT ou queda do cliente)
+    disconnections: int = 0
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def recipients(self) -> List[str]:
+        with self._lock:
+            return [rcpt for message in self.messages for rcpt in message.recipients]
+
+    def start(self) -> "FakeSmtpServer":
+        """
+        Sobe o servidor em uma thread própria (com seu event loop) e retorna quando ele já aceita conexões.
+        """
+        ready = threading.Event()
+
+        def _serve():
+            self._loop = asyncio.new_event_loop()
+            self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+            self._server.close()
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=_serve, name="fake-smtp", daemon=True)
+        self._thread.start()
+        ready.wait()
+        logger.info(f"[FakeSmtpServer] Ouvindo em {self.host}:{self.port}")
+        return self
+
+    def stop(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+
+    def __enter__(self) -> "FakeSmtpServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        with self._lock:
+            self.connections += 1
+        if self.connect_latency:
+            await asyncio.sleep(self.connect_latency)
+
+        async def reply(line: str):
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        await reply("220 fake-smtp ESMTP")
+        mail_from, recipients = "", []
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors="replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb in ("EHLO", "HELO"):
+                    writer.write(b"250-fake-smtp\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n")
+                    await writer.drain()
+                elif verb == "AUTH":
+                    parts = command.split()
+                    if parts[1].upper() == "LOGIN":
+                        # Pede o usuário (se não veio no comando) e depois a senha
+                        prompts = ["334 UGFzc3dvcmQ6"] if len(parts) > 2 else ["334 VXNlcm5hbWU6", "334 UGFzc3dvcmQ6"]
+                        for prompt in prompts:
+                            await reply(prompt)
+                            await reader.readline()
+                    elif len(parts) == 2:
+                        await reply("334 ")
+                        await reader.readline()
+                    await reply("235 2.7.0 Authentication successful")
+                elif verb == "MAIL":
+                    mail_from, recipients = command[10:].strip("<> "), []
+                    await reply("250 OK")
+                elif verb == "RCPT":
+                    rcpt = command[8:].strip("<> ")
+                    if rcpt in self.reject:
+                        await reply("550 5.1.1 Mailbox unavailable")
+                    else:
+                        recipients.append(rcpt)
+                        await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = []
+                    while (chunk := await reader.readline()) not in (b".\r\n", b".\n", b""):
+                        data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                    if self.data_latency:
+                        await asyncio.sleep(self.data_latency)
+                    with self._lock:
+                        self.messages.append(ReceivedMessage(mail_from, recipients, b"".join(data)))
+                    mail_from, recipients = "", []
+                    await reply("250 OK: queued")
+                elif verb == "RSET":
+                    mail_from, recipients = "", []
+                    await reply("250 OK")
+                elif verb == "NOOP":
+                    await reply("250 OK")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with self._lock:
+                self.disconnections += 1
+
+
+def main():
+    parser = ArgumentParser(description="Servidor SMTP falso (mensagens apenas contadas e logadas)")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Atraso simulado no handshake e em cada DATA")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s :: %(name)s :: %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+    latency = args.latency_ms / 1000
+    server = FakeSmtpServer(host=args.host, port=args.port, connect_latency=latency, data_latency=latency).start()
+    received = 0
+    try:
+        while True:
+            time.sleep(1)
+            if len(server.messages) != received:
+                received = len(server.messages)
+                logger.info(f"{received} mensagens recebidas em {server.connections} conexões")
+    except KeyboardInterrupt:
+        server.stop()
@@ -1,34 +1,54 @@
 import os
 import pytest
+
+# As tabelas de teste são criadas pelas fixtures; o lifespan não deve migrar o banco configurado
+os.environ.setdefault("DATABASE_AUTO_MIGRATE", "false")
+os.environ.setdefault("SLA_SCHEDULER_ENABLED", "false")
+os.environ.setdefault("OUTBOX_WORKER_ENABLED", "false")
+os.environ.setdefault("UNREAD_RECONCILER_ENABLED", "false")
+# Custo mínimo do bcrypt: os testes cobrem o fluxo, não a força do hash
+os.environ.setdefault("PASSWORD_BCRYPT_ROUNDS", "4")
+
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+import tempfile
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 from datetime import date, datetime, timedelta
 
 from faker import Faker
-from bank_credit.app.database import Base, get_db
+from bank_credit.app.database import Base, get_async_db, get_db
 from bank_credit.app.main import app
 from bank_credit.app.routers.auth import create_access_token
 from bank_credit.app.models import CreditRequest, Process, Sector, User, Client, Employee
 from bank_credit.app.views.auth import get_password_hash
+from bank_credit.app.utils import invalidate_process_graph
+from bank_credit.app.token_cache import token_cache
 
 # Configurar ambiente de teste
 os.environ["TESTING"] = "true"
 
 
-# Configuração do banco de dados de teste
+# Configuração do banco de dados de teste (arquivo temporário, compartilhado pelos engines sync e async)
+TEST_DATABASE_PATH = os.path.join(tempfile.mkdtemp(prefix="bank_credit_tests_"), "test.db")
 engine = create_engine(
-    "sqlite:///:memory:",
+    f"sqlite:///{TEST_DATABASE_PATH}",
     connect_args={"check_same_thread": False},
     poolclass=StaticPool
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DATABASE_PATH}", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
 
 
 @pytest.fixture(scope="function")
 def db():
     Base.metadata.create_all(bind=engine)
+    # O banco é recriado a cada teste; o grafo em cache do teste anterior não vale mais
+    invalidate_process_graph()
+    # Ids de usuário se repetem entre testes: tokens em cache de outro teste não valem
+    token_cache.clear()
     db = TestingSessionLocal()
     try:
         yield db
@@ -37,12 +57,61 @@ def db():
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(scope="function")
+def statements(db):
+    """
+    Lista com os SQLs executados no engine de teste enquanto o teste roda.
+    """
+    executed = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, "before_cursor_execute", _record)
+    yield executed
+    for target in (engine, async_engine.sync_engine):
+        event.remove(target, "before_cursor_execute", _record)
+
+
+@pytest.fixture(scope="function")
+def query_plans(db):
+    """
+    Função que retorna os planos (EXPLAIN QUERY PLAN) dos SQLs sobre `table` executados
+    no engine de teste enquanto o teste roda, como pares (sql, [passos do plano]).
+    """
+    executed = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and not statement.startswith("EXPLAIN"):
+            executed.append((statement, parameters))
+
+    def _plans(table):
+        plans = []
+        for statement, parameters in executed:
+            if f"FROM {table}" in statement or f"UPDATE {table}" in statement:
+                rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", tuple(parameters)).all()
+                plans.append((statement, [row[-1] for row in rows]))
+        return plans
+
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, "before_cursor_execute", _record)
+    yield _plans
+    for target in (engine, async_engine.sync_engine):
+        event.remove(target, "before_cursor_execute", _record)
+
+
 @pytest.fixture(scope="function")
 def test_app(db):
     def override_get_db():
         yield db
 
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as async_db:
+            yield async_db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -125,6 +194,13 @@ def employee(db):
     return employee
 
 
+@pytest.fixture(scope="function")
+def authorized_employee(test_app, employee):
+    token = create_access_token(data={"sub": employee.user.email})
+    test_app.headers = {**test_app.headers, "Authorization": f"Bearer {token}"}
+    return test_app
+
+
 @pytest.fixture(scope="function")
 def process(db):
     """
@@ -1,5 +1,13 @@
+import asyncio
+import threading
+import time
 from fastapi import status
+from passlib.context import CryptContext
 from bank_credit.app.models import User, Client, Employee
+from bank_credit.app.password_pool import PasswordPool
+from bank_credit.app.routers import auth as auth_router
+from bank_credit.app.views import auth as auth_view
+from bank_credit.app.token_cache import TokenCache, token_cache
 
 
 def test_register_user(test_app, db, faker):
@@ -179,3 +187,156 @@ def test_register_employee_user(test_app, db, faker):
     db_employee = db.query(Employee).filter(Employee.matricula == matricula).first()
     assert db_employee is not None
     assert db_employee.user_id == db_user.id
+
+
+def test_token_cache_skips_user_lookup(authorized_user, statements):
+    assert authorized_user.get("/notifications/unread-count").status_code == status.HTTP_200_OK
+    statements.clear()
+    assert authorized_user.get("/notifications/unread-count").status_code == status.HTTP_200_OK
+    assert not [sql for sql in statements if "FROM users" in sql]
+    assert token_cache.stats()["hits"] == 1
+
+
+def test_token_cache_invalidated_when_user_deactivated(authorized_user, db, client):
+    assert authorized_user.get("/notifications/").status_code == status.HTTP_200_OK
+    assert token_cache.stats()["size"] == 1
+    client.user.is_active = False
+    db.commit()
+    assert token_cache.stats()["size"] == 0
+    response = authorized_user.get("/notifications/")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Usuário inativo"
+
+
+def test_token_cache_expiry_and_lru(client):
+    cache = TokenCache(max_size=2, max_ttl=60)
+    cache.put("expired", {"sub": client.user.email, "exp": time.time() - 1}, client.user)
+    assert cache.get("expired") is None
+    for token in ("a", "b"):
+        cache.put(token, {"sub": client.user.email, "exp": time.time() + 3600}, client.user)
+    assert cache.get("a").user.id == client.user.id
+    cache.put("c", {"sub": client.user.email}, client.user)
+    # "b" era o menos usado
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.get("c").expires_at <= time.time() + 60
+    assert cache.invalidate_user(client.user.id) == 2
+    assert cache.stats()["size"] == 0
+
+
+def test_login_verifies_password_in_pool(test_app, client, monkeypatch):
+    pool = PasswordPool(workers=2, max_queue=4)
+    monkeypatch.setattr(auth_router, "password_pool", pool)
+    response = test_app.post("/auth/token", data={"username": client.user.email, "password": "test_password"})
+    assert response.status_code == status.HTTP_200_OK
+    metrics = pool.metrics()
+    assert metrics["completed"] == 1
+    assert metrics["running"] == 0 and metrics["queued"] == 0
+    pool.shutdown()
+
+
+def test_login_rejected_when_password_pool_full(test_app, client, monkeypatch):
+    pool = PasswordPool(workers=1, max_queue=0)
+    monkeypatch.setattr(auth_router, "password_pool", pool)
+    release = threading.Event()
+    busy = pool._submit(release.wait)
+    try:
+        response = test_app.post("/auth/token", data={"username": client.user.email, "password": "test_password"})
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["Retry-After"] == "1"
+        assert pool.metrics()["rejected"] == 1
+    finally:
+        release.set()
+        busy.result()
+        pool.shutdown()
+
+
+def test_password_pool_keeps_event_loop_responsive(monkeypatch):
+    def slow_verify(plain, hashed):
+        time.sleep(0.2)  # bcrypt simulado
+        return True
+
+    monkeypatch.setattr(auth_view, "verify_password", slow_verify)
+    pool = PasswordPool(workers=2, max_queue=10)
+
+    async def _storm():
+        lags = []
+
+        async def _ticker():
+            for _ in range(30):
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lags.append(time.perf_counter() - started - 0.01)
+
+        results = await asyncio.gather(_ticker(), *(pool.verify("x", "y") for _ in range(6)))
+        return lags, results[1:]
+
+    lags, results = asyncio.run(_storm())
+    pool.shutdown()
+    assert all(results)
+    # 6 verificações de 200ms em 2 workers levam ~600ms; o loop segue respondendo nesse tempo
+    assert max(lags) < 0.1
+    metrics = pool.metrics()
+    assert metrics["completed"] == 6
+    assert metrics["max_queued"] == 4
+
+
+def _employee_payload(faker, password):
+    return {
+        "matricula": faker.unique.bothify(text="EMP###"),
+        "cpf": faker.unique.cpf(),
+        "user": {
+            "full_name": faker.name(),
+            "phone": faker.msisdn()[0:11],
+            "email": faker.unique.email(),
+            "password": password,
+            "groups": [],
+        },
+    }
+
+
+def test_registration_hashes_password_once(test_app, db, faker, monkeypatch):
+    pool = PasswordPool(workers=1, max_queue=4)
+    monkeypatch.setattr(auth_router, "password_pool", pool)
+    hashed = []
+    original_hash = auth_view.get_password_hash
+    monkeypatch.setattr(auth_view, "get_password_hash", lambda password: hashed.append(password) or original_hash(password))
+    payload = _employee_payload(faker, "senha-original")
+    response = test_app.post("/auth/register/employee", json=payload)
+    assert response.status_code == status.HTTP_200_OK
+    # Um único bcrypt, sobre a senha em texto puro
+    assert hashed == ["senha-original"]
+    db_user = db.query(User).filter(User.email == payload["user"]["email"]).first()
+    assert auth_view.verify_password("senha-original", db_user.hashed_password)
+    pool.shutdown()
+    response = test_app.post("/auth/token", data={"username": payload["user"]["email"], "password": "senha-original"})
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_login_rehashes_outdated_password_hash(test_app, db, client):
+    outdated = CryptContext(schemes=["bcrypt"], bcrypt__rounds=auth_view.PASSWORD_BCRYPT_ROUNDS + 1).hash("test_password")
+    client.user.hashed_password = outdated
+    db.commit()
+    assert auth_view.pwd_context.needs_update(outdated)
+    response = test_app.post("/auth/token", data={"username": client.user.email, "password": "test_password"})
+    assert response.status_code == status.HTTP_200_OK
+    db.refresh(client.user)
+    rehashed = client.user.hashed_password
+    assert rehashed != outdated
+    assert not auth_view.pwd_context.needs_update(rehashed)
+    assert auth_view.verify_password("test_password", rehashed)
+    # Hash já atualizado: o próximo login não grava de novo
+    response = test_app.post("/auth/token", data={"username": client.user.email, "password": "test_password"})
+    assert response.status_code == status.HTTP_200_OK
+    db.refresh(client.user)
+    assert client.user.hashed_password == rehashed
+
+
+def test_login_with_wrong_password_does_not_rehash(test_app, db, client):
+    outdated = CryptContext(schemes=["bcrypt"], bcrypt__rounds=auth_view.PASSWORD_BCRYPT_ROUNDS + 1).hash("test_password")
+    client.user.hashed_password = outdated
+    db.commit()
+    response = test_app.post("/auth/token", data={"username": client.user.email, "password": "errada"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    db.refresh(client.user)
+    assert client.user.hashed_password == outdated
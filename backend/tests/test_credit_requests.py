@@ -2,7 +2,7 @@ import pytest
 from datetime import datetime, UTC, timedelta
 from bank_credit.app.models import Process
 from fastapi import status
-from bank_credit.app.models import RequestHistory, Process, Sector, User, Employee
+from bank_credit.app.models import RequestHistory, Process, Sector, User, Employee, Client
 from bank_credit.app.models import Sector, Employee, User
 
 
@@ -299,3 +299,446 @@ def test_reject_credit_request_due_to_timeout(authorized_user, db, processes):
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
     assert data["status"] == "REJECTED_TIMEOUT"
+
+
+@pytest.fixture(scope="function")
+def many_requests(db, client, process):
+    from bank_credit.app.models import CreditRequest
+    base = datetime.now()
+    requests = []
+    for i in range(25):
+        req = CreditRequest(
+            client_id=client.id,
+            amount=1000.0 * (i + 1),
+            purpose="Capital de giro",
+            term=30,
+            status="APPROVED" if i % 2 else "PENDING",
+            created_at=base,
+            updated_at=base - timedelta(minutes=i // 2),
+            deliver_date=base + timedelta(days=7),
+            current_process_id=process.id,
+        )
+        requests.append(req)
+    db.add_all(requests)
+    db.commit()
+    return requests
+
+
+def test_list_all_requests_keyset_pagination(authorized_employee, many_requests):
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 10}
+        if cursor:
+            params["cursor"] = cursor
+        response = authorized_employee.get("/requests/all", params=params)
+        assert response.status_code == status.HTTP_200_OK
+        page = response.json()
+        assert len(page) <= 10
+        seen.extend(r["id"] for r in page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == len(many_requests)
+    keys = [(r.updated_at, r.id) for r in sorted(many_requests, key=lambda r: (r.updated_at, r.id), reverse=True)]
+    assert seen == [k[1] for k in keys]
+
+
+def test_list_all_requests_without_limit_returns_everything(authorized_employee, many_requests, monkeypatch):
+    from bank_credit.app.views import credit_request as credit_view
+    monkeypatch.setattr(credit_view, "DEFAULT_PAGE_SIZE", 10)
+    response = authorized_employee.get("/requests/all")
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == len(many_requests)
+    assert "X-Next-Cursor" not in response.headers
+    # Com cursor e sem limit, as páginas seguintes têm o tamanho padrão
+    first = authorized_employee.get("/requests/all", params={"limit": 5})
+    next_page = authorized_employee.get("/requests/all", params={"cursor": first.headers["X-Next-Cursor"]})
+    assert len(next_page.json()) == 10
+
+
+def test_list_all_requests_filters(authorized_employee, many_requests):
+    response = authorized_employee.get(
+        "/requests/all",
+        params={"status": "APPROVED", "min_amount": 5000, "max_amount": 15000},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    expected = {r.id for r in many_requests if r.status == "APPROVED" and 5000 <= r.amount <= 15000}
+    assert {r["id"] for r in data} == expected
+
+
+def test_list_all_requests_ndjson_stream(authorized_employee, many_requests):
+    import json
+    response = authorized_employee.get("/requests/all", params={"format": "ndjson", "limit": 20})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines() if line]
+    assert len(lines) == 20
+    assert "X-Next-Cursor" in response.headers
+    next_page = authorized_employee.get("/requests/all", params={"cursor": response.headers["X-Next-Cursor"]})
+    assert len(next_page.json()) == 5
+
+
+def test_list_all_requests_invalid_cursor(authorized_employee, many_requests):
+    response = authorized_employee.get("/requests/all", params={"cursor": "invalido"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_list_all_requests_requires_employee(authorized_user):
+    response = authorized_user.get("/requests/all")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.fixture(scope="function")
+def requests_from_many_clients(db, faker, process):
+    from bank_credit.app.models import CreditRequest, Group
+    group = Group(name="Clientes")
+    db.add(group)
+    requests = []
+    for i in range(8):
+        user = User(
+            full_name=faker.name(),
+            phone=faker.msisdn()[0:11],
+            email=f"cliente{i}@empresa.com.br",
+            hashed_password="hash",
+            is_active=True,
+            created_at=datetime.now(),
+            groups=[group],
+        )
+        client = Client(
+            user=user,
+            cnpj=faker.unique.cnpj(),
+            nome_fantasia=faker.company(),
+            razao_social=faker.company_suffix(),
+            cnae_principal="6201-5/01",
+            cnae_principal_desc="Desenvolvimento de programas de computador sob encomenda",
+            natureza_juridica="2062",
+            natureza_juridica_desc="Sociedade Empresária Limitada",
+            logradouro=faker.street_name(),
+            numero=faker.building_number(),
+            cep=faker.postcode().replace("-", ""),
+            bairro=faker.bairro(),
+            municipio=faker.city(),
+            uf=faker.estado_sigla(),
+        )
+        for _ in range(3):
+            requests.append(
+                CreditRequest(
+                    client=client,
+                    amount=10000.0,
+                    purpose="Capital de giro",
+                    term=30,
+                    deliver_date=datetime.now() + timedelta(days=7),
+                    current_process_id=process.id,
+                )
+            )
+    db.add_all(requests)
+    db.commit()
+    db.expire_all()
+    return requests
+
+
+def test_list_all_requests_statement_bound(authorized_employee, db, requests_from_many_clients, statements):
+    response = authorized_employee.get("/requests/all")
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert len(data) == len(requests_from_many_clients)
+    assert all(r["client"]["user"]["groups"][0]["name"] == "Clientes" for r in data)
+    # Autenticação + página + carregamentos antecipados; não deve crescer com o número de pedidos
+    assert len(statements) <= 8, statements
+
+
+def test_get_request_detail_statement_bound(authorized_employee, db, requests_from_many_clients, statements):
+    request_id = requests_from_many_clients[0].id
+    response = authorized_employee.get(f"/requests/{request_id}")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["client"]["user"]["email"] == "cliente0@empresa.com.br"
+    assert len(statements) <= 8, statements
+
+
+def test_route_request_uses_process_graph(authorized_employee, db, client):
+    from bank_credit.app.models import CreditRequest
+    analysis = Process(name="Analise")
+    approval = Process(name="Aprovacao")
+    approval.sectors.append(Sector(name="Comite", limit=0.0, sla_days=3, require_all=False))
+    db.add_all([analysis, approval])
+    db.commit()
+    analysis.next_process_id = approval.id
+    req = CreditRequest(
+        client_id=client.id,
+        amount=20000.0,
+        purpose="Capital de giro",
+        term=30,
+        created_at=datetime.now(),
+        deliver_date=datetime.now() + timedelta(days=7),
+        current_process_id=analysis.id,
+    )
+    db.add(req)
+    db.commit()
+    response = authorized_employee.post(f"/requests/{req.id}/route")
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["current_process_id"] == approval.id
+    assert data["status"] == "PENDING_SECTOR"
+    assert data["current_sector_id"] == approval.sectors[0].id
+
+
+def _request_at(db, client, process_id):
+    from bank_credit.app.models import CreditRequest
+    req = CreditRequest(
+        client_id=client.id,
+        amount=10000.0,
+        purpose="Capital de giro",
+        term=30,
+        created_at=datetime.now(),
+        deliver_date=datetime.now() + timedelta(days=7),
+        current_process_id=process_id,
+    )
+    db.add(req)
+    db.commit()
+    return req
+
+
+def test_estimated_time_sums_remaining_sla(authorized_user, db, client, processes, sectors_and_employees):
+    setores, _ = sectors_and_employees
+    req = _request_at(db, client, processes[7].id)
+    response = authorized_user.get(f"/requests/{req.id}/estimated-time")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == sum(s.sla_days for s in setores[7:])
+
+
+def test_estimated_time_unavailable_when_finished(authorized_user, db, client, processes):
+    req = _request_at(db, client, None)
+    response = authorized_user.get(f"/requests/{req.id}/estimated-time")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_estimated_time_batch(authorized_user, db, client, processes, sectors_and_employees):
+    setores, _ = sectors_and_employees
+    first = _request_at(db, client, processes[0].id)
+    last = _request_at(db, client, processes[-1].id)
+    finished = _request_at(db, client, None)
+    response = authorized_user.post(
+        "/requests/estimated-time:batch",
+        json={"request_ids": [last.id, first.id, finished.id, 999999]},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [
+        {"request_id": last.id, "days": setores[-1].sla_days},
+        {"request_id": first.id, "days": sum(s.sla_days for s in setores)},
+        {"request_id": finished.id, "days": None},
+    ]
+
+
+def test_estimated_time_batch_hides_other_clients(authorized_user, db, faker, process):
+    other_user = User(
+        full_name=faker.name(),
+        phone=faker.phone_number(),
+        email="other@client.com",
+        hashed_password="x",
+        is_active=True,
+        created_at=datetime.now(),
+    )
+    db.add(other_user)
+    db.commit()
+    other_client = Client(user_id=other_user.id, cnpj=faker.cnpj())
+    db.add(other_client)
+    db.commit()
+    req = _request_at(db, other_client, process.id)
+    response = authorized_user.post("/requests/estimated-time:batch", json={"request_ids": [req.id]})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == []
+    assert authorized_user.get(f"/requests/{req.id}/estimated-time").status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.fixture(scope="function")
+def routing_flow(db, client):
+    from bank_credit.app.models import CreditRequest
+    analysis = Process(name="Analise")
+    approval = Process(name="Aprovacao")
+    approval.sectors.append(Sector(name="Comite", limit=1000.0, sla_days=3, require_all=False))
+    db.add_all([analysis, approval])
+    db.commit()
+    analysis.next_process_id = approval.id
+    requests = [
+        CreditRequest(
+            client_id=client.id,
+            amount=500.0 if i == 0 else 20000.0,
+            purpose="Capital de giro",
+            term=30,
+            status="PENDING",
+            created_at=datetime.now(),
+            updated_at=datetime.now(),
+            deliver_date=datetime.now() + timedelta(days=7),
+            current_process_id=approval.id if i == 1 else analysis.id,
+        )
+        for i in range(7)
+    ]
+    db.add_all(requests)
+    db.commit()
+    return analysis, approval, requests
+
+
+def test_route_batch_outcomes(authorized_employee, db, routing_flow, statements):
+    analysis, approval, requests = routing_flow
+    ids = [r.id for r in requests]
+    response = authorized_employee.post("/requests/route:batch", json={"request_ids": ids + [999999]})
+    assert response.status_code == status.HTTP_200_OK
+    outcomes = response.json()
+    assert [o["request_id"] for o in outcomes] == ids + [999999]
+    assert outcomes[0]["outcome"] == "rejected" and outcomes[0]["status"] == "REJECTED_NO_SECTOR"
+    assert outcomes[1]["outcome"] == "finalized"
+    assert all(o["outcome"] == "routed" and o["current_process_id"] == approval.id for o in outcomes[2:7])
+    assert outcomes[7]["outcome"] == "not_found"
+    history_inserts = [s for s in statements if s.startswith("INSERT INTO request_history")]
+    assert len(history_inserts) == 1
+    assert db.query(RequestHistory).filter(RequestHistory.request_id.in_(ids)).count() == len(ids)
+
+
+def test_route_batch_commits_once_per_chunk(authorized_employee, db, routing_flow, monkeypatch):
+    from sqlalchemy import event
+    from bank_credit.app.views import routing as routing_view
+    monkeypatch.setattr(routing_view, "ROUTE_BATCH_CHUNK_SIZE", 3)
+    commits = []
+
+    def _count(session):
+        commits.append(session)
+
+    event.listen(db, "after_commit", _count)
+    try:
+        response = authorized_employee.post(
+            "/requests/route:batch", json={"request_ids": [r.id for r in routing_flow[2]]}
+        )
+    finally:
+        event.remove(db, "after_commit", _count)
+    assert response.status_code == status.HTTP_200_OK
+    assert len(commits) == 3
+
+
+def test_list_all_requests_by_sector(authorized_employee, db, routing_flow):
+    analysis, approval, requests = routing_flow
+    authorized_employee.post("/requests/route:batch", json={"request_ids": [r.id for r in requests]})
+    comite = approval.sectors[0]
+    response = authorized_employee.get("/requests/all", params={"status": "PENDING_SECTOR", "sector_id": comite.id})
+    assert response.status_code == status.HTTP_200_OK
+    assert sorted(r["id"] for r in response.json()) == sorted(r.id for r in requests[2:])
+
+
+def test_route_batch_by_filter(authorized_employee, db, routing_flow):
+    analysis, approval, requests = routing_flow
+    response = authorized_employee.post(
+        "/requests/route:batch", json={"filter": {"process_id": analysis.id, "min_amount": 1000}}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert sorted(o["request_id"] for o in response.json()) == sorted(r.id for r in requests[2:])
+
+
+def test_route_batch_validation_and_permissions(authorized_user, routing_flow):
+    ids = [r.id for r in routing_flow[2]]
+    assert authorized_user.post("/requests/route:batch", json={"request_ids": ids}).status_code == status.HTTP_403_FORBIDDEN
+    assert authorized_user.post("/requests/route:batch", json={}).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_create_credit_request_with_complete_checklist(db, client, process):
+    from bank_credit.app.schemas import CreditRequestCreate
+    from bank_credit.app.views.credit_request import create_credit_request
+    req_in = CreditRequestCreate(
+        amount=10000.0,
+        deliver_date=datetime.now() + timedelta(days=7),
+        term=30,
+        purpose="Capital de giro",
+        checklist=[True, True],
+    )
+    req = create_credit_request(db, client, req_in)
+    db.expire_all()
+    assert req.status == "CHECKLIST_OK"
+    assert req.purpose == "Capital de giro"
+    assert req.term == 30
+
+
+@pytest.fixture
+def commits(db):
+    from sqlalchemy import event
+    counted = []
+
+    def _count(session):
+        counted.append(session)
+
+    event.listen(db, "after_commit", _count)
+    yield counted
+    event.remove(db, "after_commit", _count)
+
+
+def test_update_status_single_commit(authorized_user, db, client, processes, commits):
+    req = _request_at(db, client, processes[0].id)
+    commits.clear()
+    response = authorized_user.patch(f"/requests/{req.id}/status", json={"status": "REJECTED", "reason": "Renda insuficiente"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == "REJECTED"
+    assert len(commits) == 1
+    history = db.query(RequestHistory).filter_by(request_id=req.id).one()
+    assert history.reason == "Renda insuficiente"
+    from bank_credit.app.models import EmailOutbox, Notification
+    assert db.query(Notification).filter_by(client_id=client.id).count() == 1
+    # O email ao cliente entra na outbox no mesmo commit da mudança de status
+    email = db.query(EmailOutbox).one()
+    assert email.recipient == client.user.email
+    assert email.status == "PENDING"
+
+
+def test_update_status_publishes_stream_event(authorized_user, db, client, processes, monkeypatch):
+    from bank_credit.app.event_broker import event_broker
+    published = []
+    monkeypatch.setattr(event_broker, "publish", lambda client_id, type, data: published.append((client_id, type, data)))
+    req = _request_at(db, client, processes[0].id)
+    response = authorized_user.patch(f"/requests/{req.id}/status", json={"status": "REJECTED", "reason": "Renda insuficiente"})
+    assert response.status_code == status.HTTP_200_OK
+    # A notificação da mudança de status e o evento de status, ambos para o cliente
+    [(notification_client_id, notification_type, notification), (client_id, type, data)] = published
+    assert (notification_client_id, notification_type) == (client.id, "notification")
+    assert notification["subject"] == f"Your credit request #{req.id} was rejected"
+    assert (client_id, type) == (client.id, "request_status")
+    assert data["request_id"] == req.id
+    assert data["status"] == "REJECTED" and data["reason"] == "Renda insuficiente"
+    assert data["notification"]["subject"] == f"Your credit request #{req.id} was rejected"
+
+
+def test_update_status_approve_advances_in_single_commit(authorized_user, db, client, processes, commits):
+    req = _request_at(db, client, processes[0].id)
+    commits.clear()
+    response = authorized_user.patch(f"/requests/{req.id}/status", json={"status": "APPROVED"})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["status"] == "PENDING"
+    assert data["current_process_id"] == processes[1].id
+    assert len(commits) == 1
+
+
+def test_update_status_rejects_unknown_status(authorized_user, db, client, processes):
+    req = _request_at(db, client, processes[0].id)
+    response = authorized_user.patch(f"/requests/{req.id}/status", json={"status": "WHATEVER"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_update_status_rejects_pending_sector(authorized_user, db, client, processes, commits):
+    req = _request_at(db, client, processes[0].id)
+    commits.clear()
+    response = authorized_user.patch(f"/requests/{req.id}/status", json={"status": "PENDING_SECTOR"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert commits == []
+    db.refresh(req)
+    assert req.status != "PENDING_SECTOR"
+
+
+def test_route_and_view_transitions_single_commit(db, client, processes, commits):
+    from bank_credit.app.views import credit_request as credit_view, routing as routing_view
+    req = _request_at(db, client, processes[0].id)
+    commits.clear()
+    routing_view.route_credit_request(db, req)
+    assert len(commits) == 1
+    routed_to = processes.index(next(p for p in processes if p.id == req.current_process_id))
+    credit_view.update_request_status(db, req, "APPROVED")
+    assert len(commits) == 2
+    assert req.current_process_id == processes[routed_to + 1].id
+    assert db.query(RequestHistory).filter_by(request_id=req.id).count() == 2
@@ -0,0 +1,174 @@
+import asyncio
+import pytest
+from email import message_from_bytes
+from fastapi_mail import ConnectionConfig
+from jinja2 import ChoiceLoader, DictLoader, FileSystemLoader
+from bank_credit.app.email import MailDispatcher
+from bank_credit.app.email_templates import DEFAULT_TEMPLATES_DIR, EmailTemplates
+from bank_credit.scripts.fake_smtp import FakeSmtpServer
+
+
+@pytest.fixture
+def smtp_server():
+    with FakeSmtpServer() as server:
+        yield server
+
+
+def _dispatcher(server, **kwargs):
+    settings = ConnectionConfig(
+        MAIL_USERNAME="user",
+        MAIL_PASSWORD="secret",
+        MAIL_FROM="noreply@example.com",
+        MAIL_FROM_NAME="Sistema de Crédito",
+        MAIL_PORT=server.port,
+        MAIL_SERVER=server.host,
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=True,
+    )
+    return MailDispatcher(settings, **kwargs)
+
+
+def _send(dispatcher, emails):
+    async def _run():
+        try:
+            return await dispatcher.send(emails)
+        finally:
+            await dispatcher.close()
+
+    return asyncio.run(_run())
+
+
+def test_dispatcher_reuses_pooled_connections(smtp_server):
+    dispatcher = _dispatcher(smtp_server, pool_size=2)
+    emails = [(f"user{i}@example.com", f"Pedido #{i}", f"<p>{i}</p>") for i in range(10)]
+
+    async def _run():
+        first = await dispatcher.send(emails)
+        second = await dispatcher.send(emails)
+        await dispatcher.close()
+        return first + second
+
+    assert asyncio.run(_run()) == [None] * 20
+    assert smtp_server.connections == 2
+    assert dispatcher.connections_opened == 2
+    assert len(smtp_server.messages) == 20
+    assert sorted(smtp_server.recipients) == sorted([to for to, _, _ in emails] * 2)
+
+
+def test_dispatcher_closes_connections_from_previous_loop(smtp_server):
+    import time
+    dispatcher = _dispatcher(smtp_server, pool_size=1)
+    emails = [("a@example.com", "Oi", "<p>1</p>")]
+
+    # Cada asyncio.run é um loop novo; o primeiro termina sem fechar o pool
+    assert asyncio.run(dispatcher.send(emails)) == [None]
+    stale = list(dispatcher._idle)
+    assert _send(dispatcher, emails) == [None]
+    assert len(stale) == 1
+    assert smtp_server.connections == 2
+    deadline = time.monotonic() + 5
+    while smtp_server.disconnections < 2:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_dispatcher_groups_identical_emails(smtp_server):
+    dispatcher = _dispatcher(smtp_server, max_recipients=3)
+    emails = [(f"user{i}@example.com", "Alerta de SLA", "<p>igual</p>") for i in range(7)]
+    emails.append(("other@example.com", "Outro assunto", "<p>diferente</p>"))
+
+    assert _send(dispatcher, emails) == [None] * 8
+    # 7 iguais em blocos de 3 (3 mensagens) + 1 diferente
+    assert sorted(len(m.recipients) for m in smtp_server.messages) == [1, 1, 3, 3]
+    grouped = next(m for m in smtp_server.messages if len(m.recipients) == 3)
+    assert message_from_bytes(grouped.data)["To"] == "undisclosed-recipients:;"
+    single = next(m for m in smtp_server.messages if m.recipients == ["other@example.com"])
+    assert message_from_bytes(single.data)["To"] == "other@example.com"
+
+
+def test_dispatcher_reports_refused_recipients(smtp_server):
+    smtp_server.reject.add("bad@example.com")
+    dispatcher = _dispatcher(smtp_server)
+    emails = [(to, "Aviso", "<p>igual</p>") for to in ("a@example.com", "bad@example.com", "c@example.com")]
+
+    errors = _send(dispatcher, emails)
+    assert errors[0] is None and errors[2] is None
+    assert errors[1].code == 550
+    assert smtp_server.recipients == ["a@example.com", "c@example.com"]
+
+
+def test_dispatcher_rate_limit(smtp_server):
+    dispatcher = _dispatcher(smtp_server, pool_size=4, rate_limit=50)
+    emails = [(f"user{i}@example.com", f"Pedido #{i}", "<p>x</p>") for i in range(10)]
+
+    async def _run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await dispatcher.send(emails)
+        elapsed = loop.time() - started
+        await dispatcher.close()
+        return elapsed
+
+    # 10 mensagens a 50/s: a última sai pelo menos 9 intervalos de 20ms depois da primeira
+    assert asyncio.run(_run()) >= 0.17
+
+
+def test_dispatcher_connection_failure_fails_batch():
+    dispatcher = MailDispatcher(
+        ConnectionConfig(
+            MAIL_USERNAME="user",
+            MAIL_PASSWORD="secret",
+            MAIL_FROM="noreply@example.com",
+            MAIL_PORT=1,
+            MAIL_SERVER="127.0.0.1",
+            MAIL_STARTTLS=False,
+            MAIL_SSL_TLS=False,
+            USE_CREDENTIALS=False,
+            TIMEOUT=2,
+        )
+    )
+    errors = asyncio.run(dispatcher.send([("a@example.com", "Oi", "<p>1</p>"), ("b@example.com", "Oi", "<p>2</p>")]))
+    assert all(error is not None for error in errors)
+
+
+def test_templates_render_localized_status_email():
+    templates = EmailTemplates()
+    assert templates.precompile() >= 6
+    subject, body = templates.render("credit_request_status", request_id=7, status="APPROVED", reason=None)
+    assert subject == "Atualização da Solicitação de Crédito #7"
+    assert "<strong>Aprovado</strong>" in body
+    assert "Motivo" not in body
+    subject, body = templates.render("credit_request_status", "en", request_id=7, status="REJECTED", reason="Renda insuficiente")
+    assert subject == "Credit request #7 updated"
+    assert "<strong>Rejected</strong>" in body
+    assert "Reason: Renda insuficiente" in body
+
+
+def test_templates_fall_back_to_default_locale_and_escape():
+    templates = EmailTemplates()
+    subject, body = templates.render("welcome", "fr", username="<script>alert(1)</script>")
+    assert subject == "Bem-vindo ao Sistema de Crédito Bancário"
+    assert "&lt;script&gt;" in body
+    assert "<script>" not in body
+
+
+def test_templates_render_cache():
+    templates = EmailTemplates()
+    for _ in range(100):
+        templates.render("credit_request_status", request_id=1, status="PENDING", reason=None)
+    info = templates.cache_info()
+    assert (info.hits, info.misses) == (99, 1)
+    # Contextos não "hasheáveis" são renderizados sem cache
+    templates.render("welcome", username=["a", "b"])
+    assert templates.cache_info().misses == 1
+
+
+def test_templates_custom_loader_overrides_defaults():
+    custom = DictLoader({
+        "pt_BR/welcome.html": '{% set subject = "Olá, " ~ username %}<p>Conta criada.</p>',
+    })
+    templates = EmailTemplates(loader=ChoiceLoader([custom, FileSystemLoader(DEFAULT_TEMPLATES_DIR)]))
+    assert templates.render("welcome", username="Ana") == ("Olá, Ana", "<p>Conta criada.</p>")
+    subject, _ = templates.render("credit_request_status", request_id=1, status="PENDING", reason=None)
+    assert subject == "Atualização da Solicitação de Crédito #1"
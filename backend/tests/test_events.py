@@ -0,0 +1,162 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import date
+
+import pytest
+from fastapi import status
+
+from bank_credit.app.event_broker import EventBroker, event_broker
+from bank_credit.app.models import User
+from bank_credit.app.routers import notification as notification_router
+from bank_credit.app.utils import send_notification
+
+
+def _parse(body: str):
+    """
+    Eventos de um corpo SSE como (id, tipo, dados); comentários (heartbeat) são ignorados.
+    """
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields.get("id"), fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_broker_fans_out_per_client():
+    broker = EventBroker()
+
+    async def _run():
+        first, second = broker.subscribe(1), broker.subscribe(1)
+        other = broker.subscribe(2)
+        event = await asyncio.to_thread(broker.publish, 1, "notification", {"subject": "Oi"})
+        received = [await asyncio.wait_for(s.queue.get(), 1) for s in (first, second)]
+        assert other.queue.empty()
+        assert broker.metrics()["connections"] == 3
+        broker.unsubscribe(first)
+        broker.unsubscribe(second)
+        broker.unsubscribe(other)
+        return event, received
+
+    event, received = asyncio.run(_run())
+    assert received == [event, event]
+    assert broker.metrics() == {"clients": 0, "connections": 0, "published": 1, "delivered": 2, "history": 1}
+
+
+def test_broker_resumes_from_last_event_id():
+    broker = EventBroker(history_size=3)
+
+    async def _run():
+        events = [broker.publish(1, "notification", {"n": i}) for i in range(3)]
+        broker.publish(2, "notification", {"n": "outro cliente"})
+        resumed = broker.subscribe(1, last_event_id=events[0].id)
+        # O 1º evento saiu do histórico: quem parou antes dele precisa recarregar o estado
+        stale = broker.subscribe(1, last_event_id=events[0].id - 1)
+        return events, resumed, stale
+
+    events, resumed, stale = asyncio.run(_run())
+    assert resumed.backlog == events[1:] and not resumed.resync
+    assert stale.resync
+    # Ids continuam crescendo em uma nova instância (ex.: após reinício)
+    assert EventBroker().publish(1, "notification", {}).id > events[-1].id
+
+
+def test_broker_closes_slow_subscription(monkeypatch):
+    from bank_credit.app import event_broker as broker_module
+    monkeypatch.setattr(broker_module, "EVENT_QUEUE_SIZE", 2)
+    broker = EventBroker()
+
+    async def _run():
+        subscription = broker.subscribe(1)
+        for i in range(4):
+            broker.publish(1, "notification", {"n": i})
+        await asyncio.sleep(0)
+        items = [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+        broker.publish(1, "notification", {"n": 4})
+        return subscription, items
+
+    subscription, items = asyncio.run(_run())
+    assert subscription.closed
+    assert [item.data["n"] for item in items[:-1]] == [0, 1] and items[-1] is None
+    assert broker.metrics()["connections"] == 0
+
+
+def test_event_stream_sends_heartbeat():
+    broker = EventBroker()
+
+    async def _run():
+        subscription = broker.subscribe(1)
+        stream = notification_router._event_stream(subscription, heartbeat_seconds=0.01)
+        chunks = [await anext(stream) for _ in range(2)]
+        broker.publish(1, "notification", {"subject": "Oi"})
+        chunks.append(await anext(stream))
+        await stream.aclose()
+        return chunks
+
+    chunks = asyncio.run(_run())
+    assert chunks[0].startswith("retry: ")
+    assert chunks[1] == ": heartbeat\n\n"
+    assert chunks[2].startswith("id: ") and "event: notification" in chunks[2]
+
+
+@pytest.fixture
+def stream_client(db, faker, request):
+    # Um usuário sem cliente antes: o cliente de teste fica com user.id != client.id
+    db.add(User(
+        full_name=faker.name(),
+        phone=faker.msisdn()[0:11],
+        email=faker.unique.email(),
+        hashed_password="x",
+        is_active=True,
+        is_superuser=False,
+        created_at=date.today(),
+    ))
+    db.commit()
+    client = request.getfixturevalue("client")
+    assert client.user.id != client.id
+    return client
+
+
+def test_stream_endpoint_pushes_and_resumes(stream_client, authorized_user, db):
+    bodies = []
+
+    def _listen(headers=None):
+        response = authorized_user.get("/notifications/stream", headers=headers or {})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/event-stream")
+        bodies.append(response.text)
+
+    def _wait_for_subscriber():
+        deadline = time.monotonic() + 5
+        while event_broker.metrics()["connections"] == 0:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+    listener = threading.Thread(target=_listen)
+    listener.start()
+    _wait_for_subscriber()
+    created = authorized_user.post("/notifications/", json={"subject": "Pelo stream", "message": "Mensagem"}).json()
+    send_notification(db, stream_client.id, "Pendências", "Documentos pendentes")
+    event_broker.close_all()
+    listener.join(5)
+    events = _parse(bodies[0])
+    assert [(type, data["subject"]) for _, type, data in events] == [
+        ("notification", "Pelo stream"),
+        ("notification", "Pendências"),
+    ]
+    assert events[0][2]["id"] == created["id"]
+
+    # Reconexão: recebe o que veio depois do Last-Event-ID
+    listener = threading.Thread(target=_listen, kwargs={"headers": {"Last-Event-ID": events[0][0]}})
+    listener.start()
+    _wait_for_subscriber()
+    event_broker.close_all()
+    listener.join(5)
+    assert [data["subject"] for _, _, data in _parse(bodies[1])] == ["Pendências"]
+
+
+def test_stream_endpoint_requires_client(authorized_employee):
+    response = authorized_employee.get("/notifications/stream")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -35,3 +35,96 @@ def test_visualize_process_graph(authorized_user, db, process):
     assert "edges" in data
     assert any(node["id"] == process.id for node in data["nodes"])
     assert any(node["label"] == "Test Process" for node in data["nodes"])
+
+
+def test_process_graph_cache_is_reused(db, process, statements):
+    from bank_credit.app.utils import get_process_graph
+
+    first = get_process_graph(db)
+    executed = len(statements)
+    second = get_process_graph(db)
+    assert second is first
+    assert len(statements) == executed
+    assert [s.name for s in first.sectors[process.id]] == ["Test Sector"]
+
+
+def test_process_graph_cache_invalidated_on_change(db, process):
+    from bank_credit.app.utils import get_process_graph
+
+    first = get_process_graph(db)
+    next_process = Process(name="Next Process")
+    db.add(next_process)
+    db.commit()
+    process.next_process_id = next_process.id
+    db.commit()
+    second = get_process_graph(db)
+    assert second.version > first.version
+    assert second.successors(process.id) == [next_process.id]
+
+
+def test_process_graph_cache_invalidated_on_sector_approval_change(db, process):
+    from bank_credit.app.utils import get_process_graph
+
+    get_process_graph(db)
+    sector = Sector(name="Other Sector", limit=0.0, sla_days=5, require_all=False)
+    process.sectors.append(sector)
+    db.commit()
+    names = [s.name for s in get_process_graph(db).sectors[process.id]]
+    assert sorted(names) == ["Other Sector", "Test Sector"]
+
+
+def test_process_graph_etag_returns_not_modified(authorized_user, db, process):
+    response = authorized_user.get("/graph/")
+    etag = response.headers["ETag"]
+    cached = authorized_user.get("/graph/", headers={"If-None-Match": etag})
+    assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+    visualize = authorized_user.get("/graph/visualize", headers={"If-None-Match": f"W/{etag}"})
+    assert visualize.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+def test_process_graph_etag_changes_with_graph(authorized_user, db, process):
+    etag = authorized_user.get("/graph/").headers["ETag"]
+    db.add(Process(name="Another Process"))
+    db.commit()
+    response = authorized_user.get("/graph/", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+    assert any(node["name"] == "Another Process" for node in response.json()["nodes"])
+
+
+def test_process_graph_endpoint_served_from_cache(authorized_user, db, process, statements):
+    def graph_queries():
+        return [s for s in statements if "FROM processes" in s or "FROM sectors" in s]
+
+    authorized_user.get("/graph/")
+    before = len(graph_queries())
+    authorized_user.get("/graph/")
+    authorized_user.get("/graph/visualize")
+    assert len(graph_queries()) == before
+
+
+def test_remaining_sla_days_follows_critical_path(db):
+    from bank_credit.app.utils import get_process_graph
+
+    def make(name, sla_days):
+        proc = Process(name=name)
+        proc.sectors.append(Sector(name=f"Sector {name}", limit=0.0, sla_days=sla_days, require_all=False))
+        db.add(proc)
+        return proc
+
+    first, second, third = make("A", 2), make("B", 3), make("C", 5)
+    loop_a, loop_b = make("Loop A", 1), make("Loop B", 1)
+    db.commit()
+    first.next_process_id = second.id
+    second.next_process_id = third.id
+    loop_a.next_process_id = loop_b.id
+    loop_b.next_process_id = loop_a.id
+    db.commit()
+
+    remaining = get_process_graph(db).remaining_sla_days
+    assert remaining[first.id] == 10
+    assert remaining[second.id] == 8
+    assert remaining[third.id] == 5
+    assert loop_a.id not in remaining and loop_b.id not in remaining
@@ -1,8 +1,11 @@
 import pytest
-from datetime import datetime, UTC
+from datetime import datetime, timedelta, UTC
 from fastapi import status
-from bank_credit.app.models import Notification, User, Client, Employee
-from sqlalchemy import not_
+from bank_credit.app.models import EmailOutbox, Notification, NotificationCounter, User, Client, Employee
+from bank_credit.app.unread_reconciler import UnreadReconciler
+from bank_credit.app.views import notification as notification_view
+from sqlalchemy import insert, not_, text
+from sqlalchemy.orm import sessionmaker
 
 
 @pytest.fixture
@@ -63,7 +66,10 @@ def test_create_notification(authorized_user, db):
     assert data["subject"] == "New Test Notification"
     assert data["message"] == "This is a test notification with email"
     assert not data["read"]
-    # O email será "enviado" em background no ambiente de teste
+    # O email fica na outbox, gravado na mesma transação da notificação
+    email = db.query(EmailOutbox).one()
+    assert email.subject == "New Test Notification"
+    assert email.status == "PENDING"
 
 
 def test_get_notifications(authorized_user, db, test_notification):
@@ -167,3 +173,163 @@ def test_delete_notification(authorized_user, test_notification, db):
 def test_delete_nonexistent_notification(authorized_user):
     response = authorized_user.delete("/notifications/999")
     assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_notification_endpoints_use_indexes(authorized_user, db, client, query_plans):
+    # Outros clientes com muitas notificações: sem índice, as consultas varreriam todas
+    now = datetime.now()
+    db.execute(
+        insert(Notification),
+        [
+            {
+                "client_id": client.user.id + (i % 50),
+                "subject": f"Aviso {i}",
+                "message": "Mensagem",
+                "read": i % 3 != 0,
+                "created_at": now,
+            }
+            for i in range(5000)
+        ],
+    )
+    db.commit()
+    db.execute(text("ANALYZE"))
+    assert authorized_user.get("/notifications/").status_code == status.HTTP_200_OK
+    first_page = authorized_user.get("/notifications/summary", params={"limit": 5})
+    assert authorized_user.get(
+        "/notifications/summary", params={"limit": 5, "cursor": first_page.headers["X-Next-Cursor"]}
+    ).status_code == status.HTTP_200_OK
+    assert authorized_user.get("/notifications/", params={"unread_only": True}).status_code == status.HTTP_200_OK
+    assert authorized_user.get("/notifications/unread-count").status_code == status.HTTP_200_OK
+    assert authorized_user.patch("/notifications/read-all").status_code == status.HTTP_200_OK
+    plans = query_plans("notifications")
+    # Listagens e read-all; unread-count lê o contador materializado
+    assert len(plans) >= 5
+    for statement, steps in plans:
+        assert not [step for step in steps if step.startswith("SCAN notifications")], (statement, steps)
+        assert not [step for step in steps if "TEMP B-TREE" in step], (statement, steps)
+        assert [step for step in steps if "ix_notifications_client" in step], (statement, steps)
+    counter_plans = query_plans("notification_counters")
+    assert counter_plans
+    for statement, steps in counter_plans:
+        assert all("PRIMARY KEY" in step for step in steps), (statement, steps)
+
+
+def test_unread_counter_follows_notification_changes(authorized_user, db, client, statements):
+    def unread_count():
+        response = authorized_user.get("/notifications/unread-count")
+        assert response.status_code == status.HTTP_200_OK
+        return response.json()["count"]
+
+    created = [
+        authorized_user.post("/notifications/", json={"subject": f"Aviso {i}", "message": "Mensagem"}).json()
+        for i in range(3)
+    ]
+    assert unread_count() == 3
+    authorized_user.patch(f"/notifications/{created[0]['id']}/read")
+    # Marcar de novo como lida não desconta outra vez
+    authorized_user.patch(f"/notifications/{created[0]['id']}/read")
+    assert unread_count() == 2
+    authorized_user.delete(f"/notifications/{created[1]['id']}")
+    assert unread_count() == 1
+    authorized_user.delete(f"/notifications/{created[0]['id']}")
+    assert unread_count() == 1
+    authorized_user.post("/notifications/", json={"subject": "Aviso", "message": "Mensagem"})
+    authorized_user.patch("/notifications/read-all")
+    statements.clear()
+    assert unread_count() == 0
+    # O badge não conta as notificações: lê o contador pela chave primária
+    assert not [sql for sql in statements if "FROM notifications" in sql]
+    assert db.get(NotificationCounter, client.user.id).unread == 0
+
+
+def test_reconcile_unread_counters(db, client):
+    now = datetime.now()
+    other = client.user.id + 1
+    db.execute(
+        insert(Notification),
+        [
+            {"client_id": client_id, "subject": "Aviso", "message": "Mensagem", "read": read, "created_at": now}
+            for client_id, read in [(client.user.id, False), (client.user.id, False), (client.user.id, True), (other, False)]
+        ],
+    )
+    # Inserção em massa sem ajustar o contador e um contador de um cliente sem não lidas
+    db.add(NotificationCounter(client_id=other + 1, unread=4))
+    db.commit()
+
+    assert notification_view.reconcile_unread_counters(db) == 3
+    counters = {counter.client_id: counter.unread for counter in db.query(NotificationCounter)}
+    assert counters == {client.user.id: 2, other: 1, other + 1: 0}
+    assert notification_view.reconcile_unread_counters(db) == 0
+
+
+def test_unread_reconciler_run_once(db, client):
+    db.add(Notification(client_id=client.user.id, subject="Aviso", message="Mensagem", read=False, created_at=datetime.now()))
+    db.commit()
+    db.query(NotificationCounter).delete()
+    db.commit()
+    reconciler = UnreadReconciler(session_factory=sessionmaker(bind=db.get_bind()), interval_seconds=60)
+    assert reconciler.run_once() == 1
+    assert reconciler.run_once() == 0
+    metrics = reconciler.metrics()
+    assert metrics["runs"] == 2 and metrics["repaired_total"] == 1
+    assert db.get(NotificationCounter, client.user.id).unread == 1
+
+
+@pytest.fixture
+def notification_history(db, client):
+    # Mesmo created_at em pares: a ordem entre eles vem do id
+    start = datetime.now() - timedelta(hours=1)
+    db.execute(
+        insert(Notification),
+        [
+            {
+                "client_id": client.user.id,
+                "subject": f"Aviso {i}",
+                "message": f"Mensagem {i}",
+                "read": i % 2 == 0,
+                "created_at": start + timedelta(minutes=i // 2),
+            }
+            for i in range(7)
+        ],
+    )
+    db.commit()
+    return start
+
+
+def test_get_notifications_paginates_by_cursor(authorized_user, notification_history):
+    subjects, cursor = [], None
+    for _ in range(4):
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = authorized_user.get("/notifications/", params=params)
+        assert response.status_code == status.HTTP_200_OK
+        subjects += [n["subject"] for n in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert subjects == [f"Aviso {i}" for i in reversed(range(7))]
+    assert cursor is None
+
+
+def test_get_notifications_filters(authorized_user, notification_history):
+    response = authorized_user.get("/notifications/", params={"unread_only": True})
+    assert [n["subject"] for n in response.json()] == ["Aviso 5", "Aviso 3", "Aviso 1"]
+    since = notification_history + timedelta(minutes=1, seconds=30)
+    response = authorized_user.get("/notifications/", params={"since": since.isoformat()})
+    assert [n["subject"] for n in response.json()] == ["Aviso 6", "Aviso 5", "Aviso 4"]
+
+
+def test_get_notifications_summary_omits_message(authorized_user, notification_history, statements):
+    statements.clear()
+    response = authorized_user.get("/notifications/summary", params={"limit": 2})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [n["subject"] for n in data] == ["Aviso 6", "Aviso 5"]
+    assert all("message" not in n for n in data)
+    assert response.headers["X-Next-Cursor"]
+    # O corpo das mensagens nem é lido do banco
+    assert not [sql for sql in statements if "FROM notifications" in sql and "notifications.message" in sql]
+
+
+def test_get_notifications_invalid_cursor(authorized_user):
+    response = authorized_user.get("/notifications/", params={"cursor": "invalido"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
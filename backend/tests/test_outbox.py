@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy.orm import sessionmaker
+from bank_credit.app import email as email_service
+from bank_credit.app.models import EmailOutbox
+from bank_credit.app.outbox_worker import OutboxWorker
+from bank_credit.app.views import outbox as outbox_view
+
+
+@pytest.fixture
+def worker(db):
+    return OutboxWorker(session_factory=sessionmaker(bind=db.get_bind()))
+
+
+class SentBatches(list):
+    fail: set
+
+
+@pytest.fixture
+def sent_batches(monkeypatch):
+    """
+    Substitui o envio SMTP: registra cada lote e falha para os destinatários em `fail`.
+    """
+    batches = SentBatches()
+    batches.fail = set()
+
+    async def _send(emails):
+        batches.append(emails)
+        return [RuntimeError("550 mailbox unavailable") if to in batches.fail else None for to, _, _ in emails]
+
+    monkeypatch.setattr(email_service, "send_email_batch", _send)
+    return batches
+
+
+def _enqueue(db, *recipients):
+    for recipient in recipients:
+        outbox_view.enqueue_email(db, recipient, f"Assunto {recipient}", "<p>corpo</p>")
+    db.commit()
+
+
+def test_drain_sends_batch_over_one_call(db, worker, sent_batches):
+    _enqueue(db, "a@example.com", "b@example.com", "c@example.com")
+    assert asyncio.run(worker.drain_once()) == 3
+    assert len(sent_batches) == 1
+    assert [to for to, _, _ in sent_batches[0]] == ["a@example.com", "b@example.com", "c@example.com"]
+    db.expire_all()
+    emails = db.query(EmailOutbox).all()
+    assert {e.status for e in emails} == {"SENT"}
+    assert all(e.attempts == 1 and e.sent_at is not None for e in emails)
+    assert asyncio.run(worker.drain_once()) == 0
+
+
+def test_failed_email_retries_with_backoff_then_dead(db, worker, sent_batches, monkeypatch):
+    monkeypatch.setattr(outbox_view, "OUTBOX_MAX_ATTEMPTS", 3)
+    sent_batches.fail.add("bad@example.com")
+    _enqueue(db, "ok@example.com", "bad@example.com")
+    now = datetime.now()
+
+    assert asyncio.run(worker.drain_once(now)) == 1
+    db.expire_all()
+    bad = db.query(EmailOutbox).filter_by(recipient="bad@example.com").one()
+    assert bad.status == "PENDING"
+    assert bad.attempts == 1
+    assert bad.last_error == "550 mailbox unavailable"
+    assert bad.next_attempt_at == now + outbox_view.backoff_delay(1)
+
+    # Antes do backoff nada é reenviado
+    assert asyncio.run(worker.drain_once(now)) == 0
+    assert len(sent_batches) == 1
+
+    later = now + timedelta(days=1)
+    asyncio.run(worker.drain_once(later))
+    db.expire_all()
+    assert bad.attempts == 2
+    assert bad.next_attempt_at == later + outbox_view.backoff_delay(2)
+
+    asyncio.run(worker.drain_once(later + timedelta(days=1)))
+    db.expire_all()
+    assert bad.status == "DEAD"
+    assert bad.attempts == 3
+    assert outbox_view.next_email_due(db) is None
+    assert worker.metrics()["outbox"] == {"PENDING": 0, "SENDING": 0, "SENT": 1, "DEAD": 1}
+
+
+def test_connection_failure_reschedules_whole_batch(db, worker, monkeypatch):
+    async def _down(emails):
+        raise ConnectionError("smtp down")
+
+    monkeypatch.setattr(email_service, "send_email_batch", _down)
+    _enqueue(db, "a@example.com", "b@example.com")
+    assert asyncio.run(worker.drain_once()) == 0
+    db.expire_all()
+    emails = db.query(EmailOutbox).all()
+    assert {(e.status, e.attempts, e.last_error) for e in emails} == {("PENDING", 1, "smtp down")}
+    assert worker.failed_total == 2
+
+
+def test_expired_lease_is_claimed_again(db):
+    _enqueue(db, "a@example.com")
+    now = datetime.now()
+    assert len(outbox_view.claim_due_emails(db, now)) == 1
+    # Reservado: outro worker não pega o mesmo email
+    assert outbox_view.claim_due_emails(db, now) == []
+    expired = now + timedelta(seconds=outbox_view.OUTBOX_LEASE_SECONDS + 1)
+    assert [e.recipient for e in outbox_view.claim_due_emails(db, expired)] == ["a@example.com"]
+
@@ -0,0 +1,120 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi import status
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+from bank_credit.app.models import (
+    CreditRequest,
+    Notification,
+    NotificationArchive,
+    NotificationCounter,
+    RequestHistory,
+    RequestHistoryArchive,
+)
+from bank_credit.app.views import notification as notification_view
+from bank_credit.app.views import retention as retention_view
+from bank_credit.scripts import archive as archive_script
+
+
+@pytest.fixture
+def old_notifications(db, client):
+    now = datetime.now()
+    rows = [
+        # (lida, dias atrás)
+        *[(True, 120)] * 5,
+        *[(False, 120)] * 2,
+        *[(True, 10)] * 2,
+    ]
+    db.execute(
+        insert(Notification),
+        [
+            {
+                "client_id": client.user.id,
+                "subject": f"Aviso {i}",
+                "message": f"Mensagem {i}",
+                "read": read,
+                "created_at": now - timedelta(days=days),
+            }
+            for i, (read, days) in enumerate(rows)
+        ],
+    )
+    db.commit()
+    notification_view.reconcile_unread_counters(db)
+    return now
+
+
+@pytest.fixture
+def closed_request(db, client, process):
+    old = datetime.now() - timedelta(days=400)
+
+    def make(status):
+        req = CreditRequest(
+            client_id=client.id,
+            amount=1000.0,
+            purpose="Capital de giro",
+            term=30,
+            status=status,
+            created_at=old,
+            deliver_date=old + timedelta(days=7),
+            current_process_id=process.id,
+        )
+        req.history = [
+            RequestHistory(status="PENDING", timestamp=old),
+            RequestHistory(status=status, timestamp=old + timedelta(days=1)),
+            RequestHistory(status=status, timestamp=datetime.now()),
+        ]
+        return req
+
+    closed, open_ = make("FINALIZED"), make("PENDING_SECTOR")
+    db.add_all([closed, open_])
+    db.commit()
+    return closed, open_
+
+
+def test_archive_read_notifications_in_batches(db, client, old_notifications, statements):
+    policy, = retention_view.default_policies(notification_days=90, request_history_days=0)
+    executed = len(statements)
+
+    assert retention_view.archive_policy(db, policy, batch_size=2, now=old_notifications) == 5
+    assert len([s for s in statements[executed:] if s.startswith("DELETE FROM notifications")]) == 3
+    remaining = db.query(Notification).filter_by(client_id=client.user.id).all()
+    assert sorted((n.read, n.subject) for n in remaining) == [
+        (False, "Aviso 5"), (False, "Aviso 6"), (True, "Aviso 7"), (True, "Aviso 8")
+    ]
+    archived = db.query(NotificationArchive).order_by(NotificationArchive.id).all()
+    assert [n.subject for n in archived] == [f"Aviso {i}" for i in range(5)]
+    assert all(n.message and n.archived_at == old_notifications for n in archived)
+    # Só lidas foram arquivadas: o contador de não lidas continua certo
+    assert db.get(NotificationCounter, client.user.id).unread == 2
+    assert notification_view.reconcile_unread_counters(db) == 0
+    assert retention_view.archive_policy(db, policy, now=old_notifications) == 0
+
+
+def test_archive_resumes_after_max_batches(db, old_notifications):
+    policy, = retention_view.default_policies(notification_days=90, request_history_days=0)
+    assert retention_view.archive_policy(db, policy, batch_size=2, max_batches=1) == 2
+    assert retention_view.count_eligible(db, policy) == 3
+    assert retention_view.archive_policy(db, policy, batch_size=2) == 3
+    assert db.query(NotificationArchive).count() == 5
+
+
+def test_archive_closed_request_history(authorized_user, db, closed_request):
+    closed, open_ = closed_request
+    assert retention_view.run_retention(db, retention_view.default_policies(notification_days=0)) == {"request_history": 2}
+    assert {h.request_id for h in db.query(RequestHistoryArchive)} == {closed.id}
+    assert db.query(RequestHistory).filter_by(request_id=open_.id).count() == 3
+
+    # O histórico do pedido continua completo, com as entradas arquivadas
+    response = authorized_user.get(f"/requests/{closed.id}/history")
+    assert response.status_code == status.HTTP_200_OK
+    assert [h["status"] for h in response.json()] == ["FINALIZED", "FINALIZED", "PENDING"]
+
+
+def test_archive_cli(db, old_notifications, closed_request, monkeypatch):
+    monkeypatch.setattr(archive_script, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    archive_script.main(["--dry-run"])
+    assert db.query(NotificationArchive).count() == 0
+
+    archive_script.main(["--table", "notifications", "--batch-size", "2"])
+    assert db.query(NotificationArchive).count() == 5
+    assert db.query(RequestHistoryArchive).count() == 0
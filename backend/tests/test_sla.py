@@ -0,0 +1,241 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy.orm import sessionmaker
+from bank_credit.app.models import CreditRequest, Notification, NotificationCounter, Process, Sector, SlaDeadline
+from bank_credit.app.sla_scheduler import SlaScheduler
+from bank_credit.app.utils import schedule_sla_alerts
+from bank_credit.app.views import routing as routing_view
+from bank_credit.app.views import sla as sla_view
+
+
+@pytest.fixture
+def published(monkeypatch):
+    from bank_credit.app.event_broker import event_broker
+    events = []
+    monkeypatch.setattr(event_broker, "publish", lambda client_id, type, data: events.append((client_id, type, data)))
+    return events
+
+
+@pytest.fixture
+def pending_requests(db, client, process):
+    requests = [
+        CreditRequest(
+            client_id=client.id,
+            amount=1000.0,
+            purpose="Capital de giro",
+            term=30,
+            status="PENDING_SECTOR",
+            created_at=datetime.now(),
+            deliver_date=datetime.now() + timedelta(days=7),
+            current_process_id=process.id,
+        )
+        for _ in range(5)
+    ]
+    db.add_all(requests)
+    db.commit()
+    return requests
+
+
+def test_route_persists_sla_deadline(db, client):
+    analysis = Process(name="Analise")
+    approval = Process(name="Aprovacao")
+    approval.sectors.append(Sector(name="Comite", limit=0.0, sla_days=3, require_all=False))
+    db.add_all([analysis, approval])
+    db.commit()
+    analysis.next_process_id = approval.id
+    req = CreditRequest(
+        client_id=client.id,
+        amount=500.0,
+        purpose="Capital de giro",
+        term=30,
+        created_at=datetime.now(),
+        deliver_date=datetime.now() + timedelta(days=7),
+        current_process_id=analysis.id,
+    )
+    db.add(req)
+    db.commit()
+    routing_view.route_credit_request(db, req)
+    assert req.status == "PENDING_SECTOR"
+    assert req.current_sector_id == approval.sectors[0].id
+    deadline = db.query(SlaDeadline).filter_by(request_id=req.id).one()
+    assert deadline.status == "PENDING_SECTOR"
+    assert deadline.sla_days == 3
+    assert abs(deadline.due_at - (req.updated_at + timedelta(days=3))) < timedelta(seconds=5)
+    assert deadline.fired_at is None
+
+
+def test_schedule_replaces_previous_deadline(db, pending_requests):
+    req = pending_requests[0]
+    schedule_sla_alerts(db, [(req.id, req.status, 2)])
+    schedule_sla_alerts(db, [(req.id, req.status, 5)])
+    db.commit()
+    deadlines = db.query(SlaDeadline).filter_by(request_id=req.id).all()
+    assert [d.sla_days for d in deadlines] == [5]
+
+
+def test_fire_due_sla_alerts(db, pending_requests, published):
+    past = datetime.now() - timedelta(days=3)
+    due, stale, future = pending_requests[:3]
+    schedule_sla_alerts(db, [(due.id, due.status, 1), (stale.id, stale.status, 1)], now=past)
+    schedule_sla_alerts(db, [(future.id, future.status, 10)], now=past)
+    stale.status = "REJECTED"
+    db.commit()
+
+    assert sla_view.fire_due_sla_alerts(db) == 2
+    notifications = db.query(Notification).all()
+    assert [n.message for n in notifications] == [f"Seu pedido #{due.id} ultrapassou o SLA de 1 dias no setor."]
+    assert [(client_id, type, data["id"]) for client_id, type, data in published] == [
+        (due.client_id, "notification", notifications[0].id)
+    ]
+    assert sla_view.fire_due_sla_alerts(db) == 0
+    assert sla_view.next_sla_deadline(db) == past + timedelta(days=10)
+
+
+def test_scheduler_fires_in_batches(db, pending_requests, monkeypatch):
+    monkeypatch.setattr(sla_view, "SLA_ALERT_BATCH_SIZE", 2)
+    schedule_sla_alerts(db, [(r.id, r.status, 1) for r in pending_requests], now=datetime.now() - timedelta(days=2))
+    db.commit()
+    scheduler = SlaScheduler(session_factory=sessionmaker(bind=db.get_bind()), poll_seconds=30)
+    assert scheduler.run_once() == len(pending_requests)
+    assert db.query(Notification).count() == len(pending_requests)
+    assert db.query(SlaDeadline).filter(SlaDeadline.fired_at.is_(None)).count() == 0
+    assert scheduler.fired_total == len(pending_requests)
+
+
+def test_scheduler_sleeps_until_next_deadline(db, pending_requests):
+    scheduler = SlaScheduler(session_factory=sessionmaker(bind=db.get_bind()), poll_seconds=30)
+    assert scheduler.seconds_until_next() == 30
+    now = datetime.now()
+    schedule_sla_alerts(db, [(pending_requests[0].id, pending_requests[0].status, 0)], now=now + timedelta(seconds=10))
+    db.commit()
+    assert 9 <= scheduler.seconds_until_next(now) <= 10
+
+
+def test_scheduler_start_stop(db):
+    scheduler = SlaScheduler(session_factory=sessionmaker(bind=db.get_bind()), poll_seconds=30)
+    scheduler.start()
+    thread = scheduler._thread
+    scheduler.start()
+    assert scheduler._thread is thread
+    scheduler.stop()
+    assert not thread.is_alive()
+
+
+def test_check_sla_alerts_single_statement(db, client, statements, published):
+    analysis = Process(name="Análise")
+    analysis.sectors.append(Sector(name="Crédito", limit=0.0, sla_days=3, require_all=False))
+    db.add(analysis)
+    db.commit()
+    now = datetime.now()
+
+    def make(status, updated_days_ago, sector_id=None):
+        return CreditRequest(
+            client_id=client.id,
+            amount=1000.0,
+            purpose="Capital de giro",
+            term=30,
+            status=status,
+            created_at=now - timedelta(days=5),
+            updated_at=now - timedelta(days=updated_days_ago),
+            deliver_date=now + timedelta(days=7),
+            current_process_id=analysis.id,
+            current_sector_id=sector_id,
+        )
+
+    sector = analysis.sectors[0]
+    due_soon = make("PENDING_SECTOR", 2.5, sector.id)
+    not_yet = make("PENDING_SECTOR", 1, sector.id)
+    overdue = make("PENDING_SECTOR", 4, sector.id)
+    other_status = make("PENDING_DOCS", 2.5)
+    db.add_all([due_soon, not_yet, overdue, other_status])
+    db.commit()
+    executed = len(statements)
+
+    assert sla_view.check_sla_alerts(db, now) == 1
+    # O INSERT ... SELECT das notificações, seguido só do ajuste do contador de não lidas
+    inserts = [s for s in statements[executed:] if s.lstrip().startswith(("INSERT", "SELECT"))]
+    assert inserts[-2].startswith("INSERT INTO notifications")
+    assert inserts[-1].startswith("INSERT INTO notification_counters")
+    assert len([s for s in statements[executed:] if "credit_requests" in s]) == 1
+    notification = db.query(Notification).one()
+    assert notification.client_id == client.id
+    assert notification.message == f"Seu pedido #{due_soon.id} no setor Crédito vencerá o SLA em breve."
+    assert notification.read is False
+    assert db.get(NotificationCounter, client.id).unread == 1
+    [(client_id, type, data)] = published
+    assert (client_id, type, data["id"]) == (client.id, "notification", notification.id)
+    assert data["message"] == notification.message
+
+
+@pytest.fixture
+def overdue_requests(db, client, process):
+    old = datetime.now() - timedelta(days=30)
+    requests = [
+        CreditRequest(
+            client_id=client.id,
+            amount=1000.0,
+            purpose="Capital de giro",
+            term=30,
+            status=status,
+            created_at=old,
+            updated_at=old,
+            deliver_date=old + timedelta(days=7),
+            current_process_id=process.id,
+        )
+        for status in ["PENDING"] * 5 + ["PENDING_SECTOR", "FINALIZED", "REJECTED_NO_SECTOR"]
+    ]
+    recent = CreditRequest(
+        client_id=client.id,
+        amount=1000.0,
+        purpose="Capital de giro",
+        term=30,
+        status="PENDING",
+        created_at=datetime.now(),
+        deliver_date=datetime.now() + timedelta(days=7),
+        current_process_id=process.id,
+    )
+    db.add_all(requests + [recent])
+    db.commit()
+    return requests, recent
+
+
+def test_check_overdue_requests_in_chunks(db, overdue_requests, statements, published):
+    from bank_credit.app.models import RequestHistory
+    requests, recent = overdue_requests
+    sla_view.overdue_metrics.reset()
+
+    assert sla_view.check_overdue_requests(db, batch_size=4) == 6
+    updates = [s for s in statements if s.startswith("UPDATE credit_requests")]
+    assert len(updates) == 2
+    assert all("RETURNING" in s for s in updates)
+    db.expire_all()
+    assert {r.id for r in requests if r.status == "FINALIZED"} == {r.id for r in requests[:6]} | {requests[6].id}
+    assert requests[7].status == "REJECTED_NO_SECTOR"
+    assert recent.status == "PENDING"
+    assert db.query(RequestHistory).count() == 6
+    assert db.query(Notification).count() == 6
+    assert sorted(data["id"] for _, _, data in published) == sorted(n.id for n in db.query(Notification))
+    metrics = sla_view.overdue_metrics.snapshot()
+    assert metrics["finalized_total"] == 6 and metrics["chunks"] == 2 and metrics["last_run_complete"]
+
+
+def test_check_overdue_requests_resumes(db, overdue_requests):
+    sla_view.overdue_metrics.reset()
+    assert sla_view.check_overdue_requests(db, batch_size=2, max_chunks=2) == 4
+    assert sla_view.overdue_metrics.snapshot()["last_run_complete"] is False
+    assert sla_view.check_overdue_requests(db, batch_size=2) == 2
+    assert sla_view.overdue_metrics.snapshot()["last_run_complete"] is True
+    assert sla_view.check_overdue_requests(db, batch_size=2) == 0
+
+
+def test_sla_metrics_endpoint(authorized_employee):
+    response = authorized_employee.get("/metrics/sla")
+    assert response.status_code == 200
+    assert set(response.json()) == {"overdue", "scheduler"}
+
+
+@pytest.mark.parametrize("path", ["/metrics/database", "/metrics/sla", "/metrics/outbox", "/metrics/auth", "/metrics/notifications"])
+def test_metrics_require_employee(test_app, authorized_user, path):
+    assert authorized_user.get(path).status_code == 403
+    test_app.headers.pop("Authorization")
+    assert test_app.get(path).status_code == 401